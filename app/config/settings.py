@@ -1,7 +1,160 @@
+import json
+import os
+from dotenv import load_dotenv
+
+# Load environment variables before any setting is read
+load_dotenv()
+
 class Settings:
     APP_NAME = "Semantic Kernel FastAPI"
     DEBUG = True
     HOST = "127.0.0.1"
     PORT = 8000
 
+    # Shared Azure AI agent clients and credential
+    AGENT_TOKEN_SCOPE = os.getenv("AGENT_TOKEN_SCOPE", "https://ai.azure.com/.default")
+    AGENT_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("AGENT_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+
+    # Agent definition cache used by /agent/chat
+    AGENT_DEFINITION_CACHE_TTL_SECONDS = float(os.getenv("AGENT_DEFINITION_CACHE_TTL_SECONDS", "300"))
+    AGENT_DEFINITION_CACHE_REFRESH_AHEAD_RATIO = float(os.getenv("AGENT_DEFINITION_CACHE_REFRESH_AHEAD_RATIO", "0.8"))
+
+    # Name index used by AzureAIAgentFactory
+    AGENT_NAME_INDEX_RECONCILE_SECONDS = float(os.getenv("AGENT_NAME_INDEX_RECONCILE_SECONDS", "600"))
+
+    # Thread pool for calls without an async SDK equivalent
+    BLOCKING_EXECUTOR_MAX_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_MAX_WORKERS", "16"))
+
+    # Shared outbound HTTP client (weather.gov)
+    HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+    HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST", "20"))
+    HTTP_CLIENT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CLIENT_TIMEOUT_SECONDS", "15"))
+    HTTP_CLIENT_MAX_RETRIES = int(os.getenv("HTTP_CLIENT_MAX_RETRIES", "2"))
+    HTTP_CLIENT_BACKOFF_SECONDS = float(os.getenv("HTTP_CLIENT_BACKOFF_SECONDS", "0.5"))
+    HTTP_CLIENT_USER_AGENT = os.getenv("HTTP_CLIENT_USER_AGENT", "app")
+
+    # Weather plugin
+    WEATHER_API_BASE_URL = os.getenv("WEATHER_API_BASE_URL", "https://api.weather.gov")
+    WEATHER_POINTS_CACHE_PRECISION = int(os.getenv("WEATHER_POINTS_CACHE_PRECISION", "2"))
+    WEATHER_POINTS_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_POINTS_CACHE_TTL_SECONDS", "86400"))
+    WEATHER_POINTS_CACHE_MAX_SIZE = int(os.getenv("WEATHER_POINTS_CACHE_MAX_SIZE", "4096"))
+    WEATHER_FORECAST_CACHE_DEFAULT_TTL_SECONDS = float(os.getenv("WEATHER_FORECAST_CACHE_DEFAULT_TTL_SECONDS", "900"))
+    WEATHER_FORECAST_CACHE_MAX_SIZE = int(os.getenv("WEATHER_FORECAST_CACHE_MAX_SIZE", "1024"))
+
+    # Geocoding in front of the get_lat_long LLM prompt
+    GEOCODER_GAZETTEER_PATH = os.getenv("GEOCODER_GAZETTEER_PATH")
+    GEOCODER_CACHE_MAX_SIZE = int(os.getenv("GEOCODER_CACHE_MAX_SIZE", "4096"))
+
+    # Prompt registry
+    PROMPT_RELOAD_CHECK_SECONDS = float(os.getenv("PROMPT_RELOAD_CHECK_SECONDS", "2"))
+
+    # Document ingestion for /agent/chat-docs
+    DOCUMENT_UPLOAD_CONCURRENCY = int(os.getenv("DOCUMENT_UPLOAD_CONCURRENCY", "8"))
+    DOCUMENT_INDEX_POLL_INTERVAL_SECONDS = float(os.getenv("DOCUMENT_INDEX_POLL_INTERVAL_SECONDS", "1"))
+
+    # Content-addressed reuse of uploaded documents and vector stores
+    DOCUMENT_REGISTRY_TTL_SECONDS = float(os.getenv("DOCUMENT_REGISTRY_TTL_SECONDS", "3600"))
+    DOCUMENT_REGISTRY_REAP_INTERVAL_SECONDS = float(os.getenv("DOCUMENT_REGISTRY_REAP_INTERVAL_SECONDS", "60"))
+    # How long a chat thread keeps its vector store pinned after its last request
+    DOCUMENT_REGISTRY_THREAD_TTL_SECONDS = float(os.getenv("DOCUMENT_REGISTRY_THREAD_TTL_SECONDS", "86400"))
+
+    # Blob storage; the README shows the connection string for a local Azurite instance
+    AZURE_BLOB_CONNECTION_STRING = os.getenv("AZURE_BLOB_CONNECTION_STRING")
+    AZURE_BLOB_CONTAINER_NAME = os.getenv("AZURE_BLOB_CONTAINER_NAME")
+
+    # Blob transfers
+    BLOB_TRANSFER_CHUNK_SIZE_BYTES = int(os.getenv("BLOB_TRANSFER_CHUNK_SIZE_BYTES", str(4 * 1024 * 1024)))
+    BLOB_TRANSFER_MAX_CONCURRENCY = int(os.getenv("BLOB_TRANSFER_MAX_CONCURRENCY", "2"))
+    BLOB_TRANSFER_SPOOL_MAX_BYTES = int(os.getenv("BLOB_TRANSFER_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # Thread to vector store mapping used when files are attached to existing threads
+    THREAD_VECTOR_STORE_CACHE_TTL_SECONDS = float(os.getenv("THREAD_VECTOR_STORE_CACHE_TTL_SECONDS", "86400"))
+    THREAD_VECTOR_STORE_CACHE_MAX_SIZE = int(os.getenv("THREAD_VECTOR_STORE_CACHE_MAX_SIZE", "10000"))
+
+    # Warm pool of pre-provisioned agents, per agent configuration
+    AGENT_POOL_MIN_SIZE = int(os.getenv("AGENT_POOL_MIN_SIZE", "2"))
+    AGENT_POOL_MAX_SIZE = int(os.getenv("AGENT_POOL_MAX_SIZE", "10"))
+    AGENT_POOL_IDLE_TTL_SECONDS = float(os.getenv("AGENT_POOL_IDLE_TTL_SECONDS", "600"))
+    AGENT_POOL_REAP_INTERVAL_SECONDS = float(os.getenv("AGENT_POOL_REAP_INTERVAL_SECONDS", "60"))
+
+    # Background jobs for long agent runs
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "100"))
+    JOB_STORE_MAX_JOBS = int(os.getenv("JOB_STORE_MAX_JOBS", "1000"))
+    JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+    JOB_STORE_SQLITE_PATH = os.getenv("JOB_STORE_SQLITE_PATH")
+    # Jobs send a heartbeat while queued or running; jobs whose heartbeat is older than JOB_STALE_AFTER_SECONDS,
+    # e.g. after a worker process crashed, are marked failed. Event streams re-read the store every poll interval
+    JOB_HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("JOB_HEARTBEAT_INTERVAL_SECONDS", "10"))
+    JOB_STALE_AFTER_SECONDS = float(os.getenv("JOB_STALE_AFTER_SECONDS", "60"))
+    JOB_EVENTS_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_INTERVAL_SECONDS", "1"))
+    # Job callbacks must resolve to public addresses unless JOB_WEBHOOK_ALLOW_PRIVATE_ADDRESSES is set (for receivers on
+    # an internal network); JOB_WEBHOOK_ALLOWED_HOSTS further restricts them to the listed hosts
+    JOB_WEBHOOK_ALLOWED_HOSTS = [host.strip() for host in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()]
+    JOB_WEBHOOK_ALLOW_PRIVATE_ADDRESSES = os.getenv("JOB_WEBHOOK_ALLOW_PRIVATE_ADDRESSES", "false").lower() == "true"
+
+    # Admission control: per-key limits (defaults for keys without their own) and per-endpoint concurrency
+    API_KEYS_FILE = os.getenv("API_KEYS_FILE")
+    ADMISSION_DEFAULT_RATE_PER_SECOND = float(os.getenv("ADMISSION_DEFAULT_RATE_PER_SECOND", "5"))
+    ADMISSION_DEFAULT_BURST = int(os.getenv("ADMISSION_DEFAULT_BURST", "10"))
+    ADMISSION_DEFAULT_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_DEFAULT_MAX_IN_FLIGHT", "8"))
+    ADMISSION_ENDPOINT_LIMITS = json.loads(os.getenv("ADMISSION_ENDPOINT_LIMITS", "{}"))
+
+    # Retries, timeouts and circuit breaking for calls to backend dependencies
+    RESILIENCE_MAX_ATTEMPTS = int(os.getenv("RESILIENCE_MAX_ATTEMPTS", "3"))
+    RESILIENCE_BASE_DELAY_SECONDS = float(os.getenv("RESILIENCE_BASE_DELAY_SECONDS", "0.5"))
+    RESILIENCE_MAX_DELAY_SECONDS = float(os.getenv("RESILIENCE_MAX_DELAY_SECONDS", "10"))
+    RESILIENCE_MAX_RETRY_AFTER_SECONDS = float(os.getenv("RESILIENCE_MAX_RETRY_AFTER_SECONDS", "30"))
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+    CHAT_COMPLETION_TIMEOUT_SECONDS = float(os.getenv("CHAT_COMPLETION_TIMEOUT_SECONDS", "120"))
+    AGENT_RUN_TIMEOUT_SECONDS = float(os.getenv("AGENT_RUN_TIMEOUT_SECONDS", "300"))
+    AGENT_RUN_POLL_INTERVAL_SECONDS = float(os.getenv("AGENT_RUN_POLL_INTERVAL_SECONDS", "1"))
+    BLOB_OPERATION_TIMEOUT_SECONDS = float(os.getenv("BLOB_OPERATION_TIMEOUT_SECONDS", "300"))
+
+    # Opt-in cache of /weather answers; entries never outlive the forecasts they were built from
+    WEATHER_RESPONSE_CACHE_ENABLED = os.getenv("WEATHER_RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    WEATHER_RESPONSE_CACHE_MAX_SIZE = int(os.getenv("WEATHER_RESPONSE_CACHE_MAX_SIZE", "1024"))
+    WEATHER_RESPONSE_CACHE_MAX_TTL_SECONDS = float(os.getenv("WEATHER_RESPONSE_CACHE_MAX_TTL_SECONDS", "900"))
+
+    # /weather/batch runs at most this many questions at once and accepts at most this many per batch
+    WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "8"))
+    WEATHER_BATCH_MAX_ITEMS = int(os.getenv("WEATHER_BATCH_MAX_ITEMS", "500"))
+
+    # Logging: written as JSON (or "text") by a background thread; LOG_LEVELS sets per-logger levels, e.g.
+    # "app.services=DEBUG,azure=WARNING", and records below INFO are sampled at LOG_DEBUG_SAMPLE_RATE
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_LEVELS = {name.strip(): level.strip().upper() for name, _, level in (item.partition("=") for item in os.getenv("LOG_LEVELS", "azure=WARNING,semantic_kernel=WARNING,httpx=WARNING").split(",")) if name.strip() and level.strip()}
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+    LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+
+    # Metrics: instrument name patterns to export (everything else is dropped) and how often to export
+    METRICS_INCLUDE = [pattern.strip() for pattern in os.getenv("METRICS_INCLUDE", "semantic_kernel*,app.*").split(",") if pattern.strip()]
+    METRICS_EXPORT_INTERVAL_MILLIS = int(os.getenv("METRICS_EXPORT_INTERVAL_MILLIS", "5000"))
+
+    # Telemetry: TELEMETRY_EXPORTER is "azure_monitor", "console" or "none" (no telemetry SDK at all); unset, it is
+    # "azure_monitor" when APPLICATIONINSIGHTS_CONNECTION_STRING is set and "none" otherwise
+    TELEMETRY_EXPORTER = os.getenv("TELEMETRY_EXPORTER", "").lower()
+    # New traces are sampled at TRACE_SAMPLE_RATE, at most TRACE_MAX_PER_SECOND a second (0: no limit); with
+    # TRACE_EXPORT_ERRORS, unsampled traces are recorded and exported anyway if a span in them fails, which gives up
+    # most of what sampling saves, since every span is then created and buffered
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    TRACE_MAX_PER_SECOND = float(os.getenv("TRACE_MAX_PER_SECOND", "0"))
+    TRACE_EXPORT_ERRORS = os.getenv("TRACE_EXPORT_ERRORS", "false").lower() == "true"
+    TRACE_ERROR_BUFFER_MAX_TRACES = int(os.getenv("TRACE_ERROR_BUFFER_MAX_TRACES", "1000"))
+    # Batching of exported spans and log records: spans beyond the queue size are dropped
+    TRACE_EXPORT_BATCH_SIZE = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", "512"))
+    TRACE_EXPORT_MAX_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_MAX_QUEUE_SIZE", "2048"))
+    TRACE_EXPORT_DELAY_MILLIS = int(os.getenv("TRACE_EXPORT_DELAY_MILLIS", "5000"))
+    TRACE_EXPORT_TIMEOUT_MILLIS = int(os.getenv("TRACE_EXPORT_TIMEOUT_MILLIS", "30000"))
+    LOG_EXPORT_BATCH_SIZE = int(os.getenv("LOG_EXPORT_BATCH_SIZE", "512"))
+    LOG_EXPORT_MAX_QUEUE_SIZE = int(os.getenv("LOG_EXPORT_MAX_QUEUE_SIZE", "2048"))
+    LOG_EXPORT_DELAY_MILLIS = int(os.getenv("LOG_EXPORT_DELAY_MILLIS", "5000"))
+    LOG_EXPORT_TIMEOUT_MILLIS = int(os.getenv("LOG_EXPORT_TIMEOUT_MILLIS", "30000"))
+
+    # Create the agent services in the background after startup instead of on their first request
+    SERVICE_WARMUP_ENABLED = os.getenv("SERVICE_WARMUP_ENABLED", "true").lower() == "true"
+
 settings = Settings()
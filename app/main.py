@@ -1,83 +1,89 @@
+import time
+_started_at = time.perf_counter()
+
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from .config.settings import settings
+from .routes.admission import AdmissionMiddleware
 from .routes.agent_endpoints import router as workflow_router
+from .routes.dependencies import warm_services
 from .routes.default_endpoints import router as status_router
+from .routes.job_endpoints import router as job_router
+from .services.agent_client_pool import agent_client_pool
+from .services.agent_pool import agent_pool
+from .services.blob_storage import blob_storage
+from .services.job_runner import job_runner
+from .services.document_registry import document_registry
+from .services.geocoding import geocoder
+from .utils.blocking_executor import blocking_executor
+from .utils.http_client import http_client
+from .utils.startup_profile import startup_profile
+from .utils.structured_logging import configure_logging
+from .utils.telemetry_config import configure_telemetry
 import logging
-from azure.monitor.opentelemetry.exporter import (
-    AzureMonitorLogExporter,
-    AzureMonitorMetricExporter,
-    AzureMonitorTraceExporter,
-)
-from azure.monitor.opentelemetry import configure_azure_monitor
-from opentelemetry._logs import set_logger_provider
-from opentelemetry.metrics import set_meter_provider
-from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
-from opentelemetry.sdk._logs.export import BatchLogRecordProcessor, ConsoleLogExporter
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
-from opentelemetry.sdk.metrics.view import DropAggregation, View
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from opentelemetry.semconv.resource import ResourceAttributes
-from opentelemetry.trace import set_tracer_provider
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
 
 from dotenv import load_dotenv
 import os
 
+startup_profile.record("imports", time.perf_counter() - _started_at)
 load_dotenv()
+configure_logging()
 ai_connection_string = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
-resource = Resource.create({ResourceAttributes.SERVICE_NAME: "demo-ai-flows-python"})
-
-# Setup logging functions
-# configure_azure_monitor()
-
-# Instrumenting the requests library for OpenTelemetry tracing
-RequestsInstrumentor().instrument()
-def configure_tracer(exporter):
-    tracer_provider = TracerProvider(resource=resource)
-    tracer_provider.add_span_processor(BatchSpanProcessor(exporter))
-    set_tracer_provider(tracer_provider)
 
-def configure_logger(exporter):
-    logger_provider = LoggerProvider(resource=resource)
-    logger_provider.add_log_record_processor(BatchLogRecordProcessor(exporter))
-    set_logger_provider(logger_provider)
+# Tracing, log export and metrics as configured by TELEMETRY_EXPORTER and the TRACE_* / LOG_EXPORT_* settings
+with startup_profile.step("telemetry"):
+    telemetry_enabled = configure_telemetry(ai_connection_string)
 
-    handler = LoggingHandler()
-    #handler.addFilter(logging.Filter("semantic_kernel"))
-    logger = logging.getLogger()
-    logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
+async def warm_up():
+    """
+    Loads the geocoding gazetteer, opens the agent clients (fetching a token) and starts warming the agent pool, then,
+    with SERVICE_WARMUP_ENABLED, creates the agent services, so none of this holds up startup or the first /status.
+    """
+    try:
+        with startup_profile.step("warmup"):
+            await geocoder.open()
+            await agent_client_pool.open()
+            await agent_pool.open()
+            if settings.SERVICE_WARMUP_ENABLED:
+                await warm_services()
+    except Exception as e:
+        logging.getLogger(__name__).warning("Warm-up failed: %s", e)
+    startup_profile.report("Warm-up finished")
 
-def configure_metric(exporter):
-    meter_provider = MeterProvider(
-        metric_readers=[PeriodicExportingMetricReader(exporter, export_interval_millis=5000)],
-        resource=resource,
-        views=[
-            View(instrument_name="*", aggregation=DropAggregation()),
-            View(instrument_name="semantic_kernel*"),
-        ],
-    )
-    set_meter_provider(meter_provider)
-
-# Initialization logging based on connection string
-if ai_connection_string:
-    configure_tracer(AzureMonitorTraceExporter(connection_string=ai_connection_string))
-    configure_logger(AzureMonitorLogExporter(connection_string=ai_connection_string))
-    configure_metric(AzureMonitorMetricExporter(connection_string=ai_connection_string))
-else:
-    configure_tracer(ConsoleSpanExporter())
-    #configure_logger(ConsoleLogExporter())
-    #configure_metric(ConsoleMetricExporter())
+# Open the shared clients on startup and release them on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_profile.step("lifespan"):
+        await blob_storage.open()
+        job_runner.start()
+        warm_up_task = asyncio.create_task(warm_up())
+    startup_profile.report("Ready to serve")
+    yield
+    warm_up_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await warm_up_task
+    await job_runner.stop()
+    await agent_pool.close()
+    await document_registry.close()
+    await agent_client_pool.close()
+    await blob_storage.close()
+    await http_client.close()
+    blocking_executor.shutdown()
 
 # FastAPI app setup
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(workflow_router)
 app.include_router(status_router)
+app.include_router(job_router)
+
+# Concurrency and per-API-key rate limits for the agent endpoints
+app.add_middleware(AdmissionMiddleware)
 
 # Add OpenTelemetry instrumentation
-FastAPIInstrumentor.instrument_app(app)
+if telemetry_enabled:
+    FastAPIInstrumentor.instrument_app(app)
 
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import Any, List
 
 @dataclass
 class Source:
@@ -31,6 +31,26 @@ class RequestResult:
     thread_id: str = None
     code_content: str = None # Add new field for code content
 
+@dataclass
+class StreamEvent:
+    """A typed event sent to clients of the streaming endpoints."""
+    type: str
+    data: dict = field(default_factory=dict)
+
+@dataclass
+class JobInfo:
+    """The state of a background job; `result` is set once the job has completed. Only the API key named `api_key_name` may read it."""
+    id: str
+    operation: str
+    status: str
+    created_at: str
+    started_at: str = None
+    finished_at: str = None
+    result: Any = None
+    error: str = None
+    callback_url: str = None
+    api_key_name: str = None
+
 @dataclass
 class ChatMessage:
     role: str
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.config.settings import settings
+
+PROMPTS_DIR = Path(__file__).resolve().parent
+
+# Template variables use the Semantic Kernel syntax, e.g. {{$location}}
+TEMPLATE_VARIABLE_PATTERN = re.compile(r"\{\{\s*\$(\w+)\s*\}\}")
+
+
+@dataclass
+class Prompt:
+    """A prompt file held in memory, with its content hash as version and its template pre-compiled."""
+    name: str
+    path: Path
+    content: str
+    mtime_ns: int
+    version: str = ""
+    variables: tuple[str, ...] = ()
+    _parts: list = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        self.version = hashlib.sha256(self.content.encode("utf-8")).hexdigest()[:12]
+        # Split the template once into literal text and variable names, so rendering is a single join
+        self._parts = TEMPLATE_VARIABLE_PATTERN.split(self.content)
+        self.variables = tuple(dict.fromkeys(self._parts[1::2]))
+
+    def render(self, **values: str) -> str:
+        """Substitutes template variables; a prompt without variables is returned as is."""
+        if not self.variables:
+            return self.content
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise ValueError(f"Missing values for prompt '{self.name}' variables: {', '.join(missing)}")
+        return "".join(part if i % 2 == 0 else str(values[part]) for i, part in enumerate(self._parts))
+
+
+class PromptRegistry:
+    """
+    PromptRegistry discovers every prompt file under `app/prompts` at startup and serves them from memory.
+    A file is re-read only when its modification time changes; modification times are checked at most
+    once per PROMPT_RELOAD_CHECK_SECONDS per prompt (0 checks on every access, a negative value never).
+    """
+    def __init__(self, directory: Path, reload_check_seconds: float):
+        self.directory = directory
+        self.reload_check_seconds = reload_check_seconds
+        self._prompts: dict[str, Prompt] = {}
+        self._checked_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.discover()
+
+    def discover(self) -> None:
+        for path in sorted(self.directory.iterdir()):
+            if path.is_file() and path.suffix not in (".py", ".pyc") and not path.name.startswith("."):
+                self._load(path.name, path)
+
+    def get(self, name: str) -> Prompt:
+        prompt = self._prompts.get(name)
+        if prompt is None:
+            # Pick up prompt files added after startup
+            path = self.directory / name
+            if not path.is_file():
+                raise RuntimeError(f"Prompt '{name}' not found in '{self.directory}'.")
+            return self._load(name, path)
+
+        if self.reload_check_seconds >= 0:
+            now = time.monotonic()
+            if now - self._checked_at.get(name, 0) >= self.reload_check_seconds:
+                self._checked_at[name] = now
+                try:
+                    mtime_ns = os.stat(prompt.path).st_mtime_ns
+                except FileNotFoundError:
+                    raise RuntimeError(f"Prompt '{name}' not found at path '{prompt.path}'.")
+                if mtime_ns != prompt.mtime_ns:
+                    prompt = self._load(name, prompt.path)
+        return prompt
+
+    def read(self, name: str) -> str:
+        return self.get(name).content
+
+    def versions(self) -> dict[str, str]:
+        return {name: prompt.version for name, prompt in self._prompts.items()}
+
+    def _load(self, name: str, path: Path) -> Prompt:
+        with self._lock:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with open(path, "r", encoding="utf-8") as file:
+                content = file.read()
+            prompt = Prompt(name=name, path=path, content=content, mtime_ns=mtime_ns)
+            self._prompts[name] = prompt
+            self._checked_at[name] = time.monotonic()
+            return prompt
+
+
+prompt_registry = PromptRegistry(PROMPTS_DIR, reload_check_seconds=settings.PROMPT_RELOAD_CHECK_SECONDS)
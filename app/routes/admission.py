@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from opentelemetry import metrics
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config.settings import settings
+from app.routes.auth import ApiKeyLimits, ApiKeyRegistry, api_key_registry
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+
+admission_queue_depth = meter.create_up_down_counter("app.admission.queue_depth", description="Requests waiting for an endpoint slot")
+admission_in_flight = meter.create_up_down_counter("app.admission.in_flight", description="Admitted requests still being served")
+admission_wait = meter.create_histogram("app.admission.wait", unit="s", description="Time admitted requests waited for an endpoint slot")
+admission_rejections = meter.create_counter("app.admission.rejections", description="Requests rejected by admission control")
+
+
+@dataclass
+class EndpointLimits:
+    """At most `max_concurrency` requests run at once; up to `max_queue` more wait up to `max_wait_seconds` for a slot."""
+    max_concurrency: int
+    max_queue: int = 0
+    max_wait_seconds: float = 10.0
+
+
+# Agent runs are the expensive endpoints; override or extend with ADMISSION_ENDPOINT_LIMITS, e.g.
+# {"/agent/chat-docs": {"max_concurrency": 2, "max_queue": 4, "max_wait_seconds": 5}}
+DEFAULT_ENDPOINT_LIMITS = {
+    "/agent/chat-docs": EndpointLimits(max_concurrency=4, max_queue=8),
+    "/agent/chat-direct": EndpointLimits(max_concurrency=8, max_queue=16),
+    "/agent/chat": EndpointLimits(max_concurrency=16, max_queue=32),
+    "/agent/chat/stream": EndpointLimits(max_concurrency=16, max_queue=32),
+    "/agent/weather": EndpointLimits(max_concurrency=16, max_queue=32),
+    "/weather/batch": EndpointLimits(max_concurrency=2, max_queue=4),
+    "/jobs/agent/chat-direct": EndpointLimits(max_concurrency=32, max_queue=32),
+    "/jobs/agent/chat-docs": EndpointLimits(max_concurrency=8, max_queue=16),
+}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class _KeyState:
+    limits: ApiKeyLimits
+    bucket: TokenBucket
+    in_flight: int = 0
+
+
+@dataclass
+class _EndpointState:
+    limits: EndpointLimits
+    running: int = 0
+    waiters: list = field(default_factory=list)
+
+
+class AdmissionController:
+    """
+    Decides whether a request may start. Requests from a limited API key, to any route, must fit within the key's
+    token-bucket rate and in-flight cap (otherwise 429); each endpoint in the endpoint table then runs at most
+    `max_concurrency` requests and queues a bounded number of waiters (otherwise, or when the wait times out, 503).
+    Every rejection carries a Retry-After hint.
+    """
+    def __init__(self, registry: ApiKeyRegistry, endpoint_limits: dict[str, EndpointLimits]):
+        self.registry = registry
+        self._endpoints = {path.rstrip("/"): _EndpointState(limits) for path, limits in endpoint_limits.items()}
+        self._keys: dict[str, _KeyState] = {}
+
+    def endpoint_for(self, path: str) -> Optional[str]:
+        path = path.rstrip("/")
+        return path if path in self._endpoints else None
+
+    async def admit(self, path: str, api_key: Optional[str]) -> Optional["_Admission"]:
+        """Admits a request, or returns None when no limit applies to it; raises AdmissionRejected otherwise."""
+        endpoint = self.endpoint_for(path)
+        key_state = self._key_state(api_key)
+        if endpoint is None and key_state is None:
+            return None
+        # Paths outside the endpoint table share one label, keeping metric cardinality bounded
+        label = endpoint or "other"
+        limits = self.registry.get(api_key)
+        key_name = limits.name if limits else "anonymous"
+        try:
+            if key_state is not None:
+                self._check_key(key_state)
+                key_state.in_flight += 1
+            try:
+                if endpoint is not None:
+                    await self._enter_endpoint(endpoint)
+            except BaseException:
+                if key_state is not None:
+                    key_state.in_flight -= 1
+                raise
+        except AdmissionRejected as e:
+            admission_rejections.add(1, {"endpoint": label, "reason": e.reason, "api_key": key_name})
+            raise
+        admission_in_flight.add(1, {"endpoint": label})
+        return _Admission(self, endpoint, key_state)
+
+    def _key_state(self, api_key: Optional[str]) -> Optional[_KeyState]:
+        # Unknown keys are left for get_api_key to reject; without auth, or for an unlimited key, there is no per-key limit
+        limits = self.registry.get(api_key)
+        if limits is None or not limits.limited:
+            return None
+        state = self._keys.get(api_key)
+        if state is None:
+            state = self._keys[api_key] = _KeyState(limits, TokenBucket(limits.rate_per_second, limits.burst))
+        return state
+
+    def _check_key(self, state: _KeyState) -> None:
+        if state.in_flight >= state.limits.max_in_flight:
+            raise AdmissionRejected(429, "key_in_flight", f"Too many concurrent requests for API key '{state.limits.name}'.", retry_after=1)
+        wait = state.bucket.try_take()
+        if wait > 0:
+            raise AdmissionRejected(429, "key_rate", f"Rate limit exceeded for API key '{state.limits.name}'.", retry_after=wait)
+
+    async def _enter_endpoint(self, endpoint: str) -> None:
+        state = self._endpoints[endpoint]
+        limits = state.limits
+        if state.running < limits.max_concurrency and not state.waiters:
+            state.running += 1
+            admission_wait.record(0, {"endpoint": endpoint})
+            return
+        if len(state.waiters) >= limits.max_queue:
+            raise AdmissionRejected(503, "queue_full", f"Too many requests waiting for '{endpoint}'.", retry_after=limits.max_wait_seconds)
+
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append(waiter)
+        admission_queue_depth.add(1, {"endpoint": endpoint})
+        started_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=limits.max_wait_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended; pass it on
+                self._leave_endpoint(endpoint)
+            else:
+                waiter.cancel()
+                state.waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise AdmissionRejected(503, "queue_timeout", f"Timed out waiting for '{endpoint}'.", retry_after=limits.max_wait_seconds)
+        finally:
+            admission_queue_depth.add(-1, {"endpoint": endpoint})
+        admission_wait.record(time.perf_counter() - started_at, {"endpoint": endpoint})
+
+    def _leave_endpoint(self, endpoint: str) -> None:
+        state = self._endpoints[endpoint]
+        # Hand the slot directly to the oldest waiter so newcomers cannot overtake the queue
+        while state.waiters:
+            waiter = state.waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        state.running -= 1
+
+
+class _Admission:
+    def __init__(self, controller: AdmissionController, endpoint: Optional[str], key_state: Optional[_KeyState]):
+        self._controller = controller
+        self._endpoint = endpoint
+        self._key_state = key_state
+
+    def release(self) -> None:
+        if self._endpoint is not None:
+            self._controller._leave_endpoint(self._endpoint)
+        if self._key_state is not None:
+            self._key_state.in_flight -= 1
+        admission_in_flight.add(-1, {"endpoint": self._endpoint or "other"})
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the AdmissionController to every HTTP request. The slot is held until the response
+    has been sent, so streamed responses count against the limits for as long as they stream.
+    """
+    def __init__(self, app: ASGIApp, controller: Optional["AdmissionController"] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        api_key = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-api-key":
+                api_key = value.decode("latin-1")
+                break
+        try:
+            admission = await self.controller.admit(scope["path"], api_key)
+        except AdmissionRejected as e:
+            logger.info("Rejected request to %s (%s)", scope["path"], e.reason)
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(max(1, math.ceil(min(e.retry_after, 3600))))},
+            )
+            await response(scope, receive, send)
+            return
+        if admission is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+
+def load_endpoint_limits() -> dict[str, EndpointLimits]:
+    limits = dict(DEFAULT_ENDPOINT_LIMITS)
+    for path, overrides in settings.ADMISSION_ENDPOINT_LIMITS.items():
+        if overrides is None:
+            limits.pop(path, None)
+        else:
+            limits[path] = EndpointLimits(**overrides)
+    return limits
+
+
+admission_controller = AdmissionController(api_key_registry, load_endpoint_limits())
@@ -1,38 +1,43 @@
-from fastapi import APIRouter, UploadFile, Form, status, Depends
+from fastapi import APIRouter, UploadFile, Form, status, Depends, Request
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 from pydantic import BaseModel
+from app.config.settings import settings
 from app.models.api_models import ChatRequest, ChatThreadRequest, AgentCreateRequest
-from app.services.weather_agent_service import WeatherAgentService
-from app.services.chat_agent_service import ChatAgentService
-from app.services.chat_agent_service_direct import ChatAgentServiceDirect
-from app.services.azure_ai_agent_factory import AzureAIAgentFactory
 from app.routes.auth import get_api_key
+from app.routes.dependencies import get_agent_factory, get_chat_agent_service, get_chat_agent_service_direct, get_weather_service
+from app.routes.streaming import negotiate_stream_format, stream_events
+from app.utils.file_utils import save_uploaded_files
 import asyncio
-import aiofiles
-import os
-import uuid
 router = APIRouter()
 
-weather_service = WeatherAgentService()
-chat_agent_service = ChatAgentService()
-chat_agent_service_direct = ChatAgentServiceDirect()
-azure_ai_agent_factory = AzureAIAgentFactory()
-
 class WorkflowInput(BaseModel):
     data: str
 
 
 @router.post("/weather")
-async def run_weather_workflow(input_data: ChatRequest, api_key: Optional[str] = Depends(get_api_key)):
+async def run_weather_workflow(input_data: ChatRequest, request: Request, api_key: Optional[str] = Depends(get_api_key), weather_service = Depends(get_weather_service)):
     """
-    POST endpoint for executing a weather workflow.
+    POST endpoint for executing a weather workflow. When WEATHER_RESPONSE_CACHE_ENABLED is set, repeated questions
+    are answered from the response cache; send `Cache-Control: no-cache` to bypass (and refresh) it.
     """
-    result = await weather_service.run_weather(input_data)
+    bypass_cache = "no-cache" in request.headers.get("Cache-Control", "").lower()
+    result = await weather_service.run_weather(input_data, bypass_cache=bypass_cache)
     return {"result": result}
 
+@router.post("/weather/batch")
+async def run_weather_batch(input_data: List[ChatRequest], request: Request, api_key: Optional[str] = Depends(get_api_key), weather_service = Depends(get_weather_service)):
+    """
+    POST endpoint for running many weather workflows concurrently. Streams one NDJSON line per request as it
+    finishes ("result" or "error", with the request's index), followed by a "done" line.
+    """
+    if len(input_data) > settings.WEATHER_BATCH_MAX_ITEMS:
+        return JSONResponse(status_code = status.HTTP_400_BAD_REQUEST, content = { 'message' : f"A batch may contain at most {settings.WEATHER_BATCH_MAX_ITEMS} requests." })
+    bypass_cache = "no-cache" in request.headers.get("Cache-Control", "").lower()
+    return stream_events(weather_service.run_weather_batch(input_data, bypass_cache=bypass_cache), "ndjson", operation="weather_batch")
+
 @router.post("/agent/weather")
-async def run_weather_workflow(input_data: ChatThreadRequest, api_key: Optional[str] = Depends(get_api_key)):
+async def run_weather_workflow(input_data: ChatThreadRequest, api_key: Optional[str] = Depends(get_api_key), weather_service = Depends(get_weather_service)):
     """
     POST endpoint for executing a weather workflow.
     """
@@ -40,15 +45,24 @@ async def run_weather_workflow(input_data: ChatThreadRequest, api_key: Optional[
     return {"result": result}
 
 @router.post("/agent/chat")
-async def run_weather_workflow(input_data: ChatThreadRequest, api_key: Optional[str] = Depends(get_api_key)):
+async def run_weather_workflow(input_data: ChatThreadRequest, api_key: Optional[str] = Depends(get_api_key), chat_agent_service = Depends(get_chat_agent_service)):
     """
     POST endpoint for executing a weather workflow.
     """
     result = await chat_agent_service.run_chat_sk(input_data)
     return {"result": result}
 
+@router.post("/agent/chat/stream")
+async def run_chat_stream(request: Request, input_data: ChatThreadRequest, format: Optional[str] = None, api_key: Optional[str] = Depends(get_api_key), chat_agent_service = Depends(get_chat_agent_service)):
+    """
+    POST endpoint for executing a chat agent run, streaming events as server-sent events (default)
+    or NDJSON (`?format=ndjson` or `Accept: application/x-ndjson`).
+    """
+    stream_format = negotiate_stream_format(request, format)
+    return stream_events(chat_agent_service.stream_chat_sk(input_data), stream_format, operation="agent_chat")
+
 @router.post("/agent/chat-direct")
-async def run_weather_workflow(input_data: ChatThreadRequest, api_key: Optional[str] = Depends(get_api_key)):
+async def run_weather_workflow(input_data: ChatThreadRequest, api_key: Optional[str] = Depends(get_api_key), chat_agent_service_direct = Depends(get_chat_agent_service_direct)):
     """
     POST endpoint for executing a weather workflow.
     """
@@ -62,18 +76,13 @@ class Message(BaseModel):
 async def chat_docs(
     files: List[UploadFile],
     query: str = Form(...),
-    api_key: Optional[str] = Depends(get_api_key)
+    api_key: Optional[str] = Depends(get_api_key),
+    chat_agent_service_direct = Depends(get_chat_agent_service_direct)
 ):
     message = Message(query=query)
     
-    temp_dir = os.path.join(os.getcwd(), str(uuid.uuid4()))
-    os.makedirs(temp_dir, exist_ok=True)
-    
     try:
-        for file in files:
-            async with aiofiles.open(os.path.join(temp_dir, file.filename), 'wb') as out_file:
-                content = await file.read() 
-                await out_file.write(content) 
+        temp_dir = await save_uploaded_files(files)
     except Exception as e:
         return JSONResponse(status_code = status.HTTP_400_BAD_REQUEST, content = { 'message' : str(e) })
         
@@ -81,7 +90,7 @@ async def chat_docs(
     return {"result": result}
 
 @router.post("/agent/chat/create")
-async def run_weather_workflow(input_data: AgentCreateRequest, api_key: Optional[str] = Depends(get_api_key)):
+async def run_weather_workflow(input_data: AgentCreateRequest, api_key: Optional[str] = Depends(get_api_key), azure_ai_agent_factory = Depends(get_agent_factory)):
     """
     POST endpoint for executing a weather workflow.
     """
@@ -1,9 +1,13 @@
+import json
 import os
+from dataclasses import dataclass
 from fastapi import HTTPException, Depends, status
 from fastapi.security import APIKeyHeader
 from typing import Optional
 from dotenv import load_dotenv
 
+from app.config.settings import settings
+
 # Load environment variables
 load_dotenv()
 
@@ -11,17 +15,58 @@ load_dotenv()
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
+@dataclass
+class ApiKeyLimits:
+    """Admission limits for one API key; `name` identifies the key in metrics and logs, and `limited=False` exempts it."""
+    name: str
+    rate_per_second: float = settings.ADMISSION_DEFAULT_RATE_PER_SECOND
+    burst: int = settings.ADMISSION_DEFAULT_BURST
+    max_in_flight: int = settings.ADMISSION_DEFAULT_MAX_IN_FLIGHT
+    limited: bool = True
+
+
+class ApiKeyRegistry:
+    """
+    Known API keys and their admission limits, loaded from the JSON file at API_KEYS_FILE:
+    {"keys": [{"key": "...", "name": "tenant-a", "rate_per_second": 2, "burst": 5, "max_in_flight": 4}]}
+    The single API_KEY environment variable is still honoured and, as before per-key limits existed, is not limited
+    unless the same key is also listed in the file.
+    """
+    def __init__(self, keys: dict[str, ApiKeyLimits]):
+        self._keys = keys
+
+    @classmethod
+    def from_environment(cls) -> "ApiKeyRegistry":
+        keys: dict[str, ApiKeyLimits] = {}
+        if settings.API_KEYS_FILE:
+            with open(settings.API_KEYS_FILE, encoding="utf-8") as file:
+                for entry in json.load(file).get("keys", []):
+                    key = entry.pop("key")
+                    keys[key] = ApiKeyLimits(**entry)
+        if os.getenv("API_KEY"):
+            keys.setdefault(os.getenv("API_KEY"), ApiKeyLimits(name="default", limited=False))
+        return cls(keys)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._keys)
+
+    def get(self, api_key: Optional[str]) -> Optional[ApiKeyLimits]:
+        return self._keys.get(api_key) if api_key else None
+
+
+api_key_registry = ApiKeyRegistry.from_environment()
+
+
 async def get_api_key(api_key: Optional[str] = Depends(api_key_header)):
     """
-    Dependency to enforce API key authentication when the API_KEY environment variable is set.
+    Dependency to enforce API key authentication when API keys are configured.
     
-    If API_KEY environment variable is present, all requests must include a matching
-    X-API-Key header. If the environment variable is not set, authentication is bypassed.
+    If the API_KEY environment variable or an API_KEYS_FILE registry is present, all requests must include
+    a registered X-API-Key header. If neither is set, authentication is bypassed.
     """
-    expected_api_key = os.getenv("API_KEY")
-    
-    # Skip authentication if API_KEY environment variable is not set
-    if not expected_api_key:
+    # Skip authentication if no API keys are configured
+    if not api_key_registry.enabled:
         return None  # No authentication required
     
     # Check for X-API-Key header
@@ -32,7 +77,7 @@ async def get_api_key(api_key: Optional[str] = Depends(api_key_header)):
         )
     
     # Validate the API key
-    if api_key != expected_api_key:
+    if api_key_registry.get(api_key) is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
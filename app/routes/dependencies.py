@@ -0,0 +1,62 @@
+import importlib
+import logging
+import time
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+
+from app.utils.blocking_executor import run_blocking
+from app.utils.startup_profile import startup_profile
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """
+    LazyService is a FastAPI dependency that provides one application-lifetime service. The service's module, and
+    with it Semantic Kernel and the Azure SDKs, is imported on the blocking executor the first time the service is
+    needed rather than when the app starts, and a service that cannot be constructed (e.g. missing configuration)
+    fails only the endpoints that use it, with 503. Construction is retried on the next request.
+    """
+    def __init__(self, name: str, module: str, class_name: str):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self._instance: Optional[Any] = None
+
+    async def __call__(self) -> Any:
+        try:
+            return await self.get()
+        except Exception as e:
+            logger.warning("The %s service is not available: %s", self.name, e)
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"The {self.name} service is not available: {e}")
+
+    async def get(self) -> Any:
+        if self._instance is None:
+            started_at = time.perf_counter()
+            service_module = await run_blocking(importlib.import_module, self.module)
+            # Constructed on the event loop: some services schedule background work when created
+            if self._instance is None:
+                self._instance = getattr(service_module, self.class_name)()
+                startup_profile.record(f"service.{self.name}", time.perf_counter() - started_at)
+        return self._instance
+
+    async def warm(self) -> None:
+        try:
+            await self.get()
+        except Exception as e:
+            logger.warning("Could not create the %s service ahead of its first request: %s", self.name, e)
+
+
+get_weather_service = LazyService("weather", "app.services.weather_agent_service", "WeatherAgentService")
+get_chat_agent_service = LazyService("chat_agent", "app.services.chat_agent_service", "ChatAgentService")
+get_chat_agent_service_direct = LazyService("chat_agent_direct", "app.services.chat_agent_service_direct", "ChatAgentServiceDirect")
+get_agent_factory = LazyService("agent_factory", "app.services.azure_ai_agent_factory", "AzureAIAgentFactory")
+
+services = [get_weather_service, get_chat_agent_service, get_chat_agent_service_direct, get_agent_factory]
+
+
+async def warm_services() -> None:
+    """Creates every service in turn, so the first requests after startup do not pay for the imports."""
+    for service in services:
+        await service.warm()
@@ -0,0 +1,102 @@
+from fastapi import APIRouter, UploadFile, Form, HTTPException, Request, status, Depends
+from fastapi.responses import JSONResponse
+from typing import Any, Awaitable, Callable, List, Optional
+from app.models.api_models import ChatThreadRequest, RequestResult
+from app.routes.auth import api_key_registry, get_api_key
+from app.routes.dependencies import get_chat_agent_service_direct
+from app.routes.streaming import negotiate_stream_format, stream_events
+from app.services.job_runner import JobQueueFullError, job_runner
+from app.utils.blocking_executor import run_blocking
+from app.utils.file_utils import save_uploaded_files
+import shutil
+
+router = APIRouter()
+
+# The direct chat service answers with these rather than raising when a run fails
+_ERROR_PREFIXES = ("Error: ", "Run failed: ", "annotation error: ")
+
+
+def _failing_on_error(run: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+    """Wraps a job's operation so an error answer fails the job instead of completing it."""
+    async def run_job() -> Any:
+        result = await run()
+        content = result.content if isinstance(result, RequestResult) else result
+        if isinstance(content, str) and content.startswith(_ERROR_PREFIXES):
+            raise RuntimeError(content)
+        return result
+    return run_job
+
+
+def _api_key_name(api_key: Optional[str]) -> Optional[str]:
+    limits = api_key_registry.get(api_key) if api_key else None
+    return limits.name if limits else None
+
+
+async def _get_owned_job(job_id: str, api_key: Optional[str]):
+    """Returns the job, answering 404 for a job submitted with another API key as for one that does not exist."""
+    job = await job_runner.get(job_id)
+    if job is None or job.api_key_name != _api_key_name(api_key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+    return job
+
+
+def _accepted(job) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}", "events_url": f"/jobs/{job.id}/events"},
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+@router.post("/jobs/agent/chat-direct")
+async def submit_chat_direct(input_data: ChatThreadRequest, callback_url: Optional[str] = None, api_key: Optional[str] = Depends(get_api_key), chat_agent_service_direct = Depends(get_chat_agent_service_direct)):
+    """
+    Queues /agent/chat-direct as a background job and returns its id immediately.
+    """
+    try:
+        job = await job_runner.submit("agent_chat_direct", _failing_on_error(lambda: chat_agent_service_direct.run_chat_direct(input_data)), callback_url=callback_url, api_key_name=_api_key_name(api_key))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return _accepted(job)
+
+
+@router.post("/jobs/agent/chat-docs")
+async def submit_chat_docs(
+    files: List[UploadFile],
+    query: str = Form(...),
+    callback_url: Optional[str] = Form(None),
+    api_key: Optional[str] = Depends(get_api_key),
+    chat_agent_service_direct = Depends(get_chat_agent_service_direct)
+):
+    """
+    Queues /agent/chat-docs as a background job and returns its id immediately; the job removes the uploaded files.
+    """
+    try:
+        temp_dir = await save_uploaded_files(files)
+    except Exception as e:
+        return JSONResponse(status_code = status.HTTP_400_BAD_REQUEST, content = { 'message' : str(e) })
+
+    try:
+        job = await job_runner.submit("agent_chat_docs", _failing_on_error(lambda: chat_agent_service_direct.run_chat_docs(query, temp_dir)), callback_url=callback_url, api_key_name=_api_key_name(api_key))
+    except (ValueError, JobQueueFullError) as e:
+        await run_blocking(shutil.rmtree, temp_dir, ignore_errors=True)
+        status_code = status.HTTP_400_BAD_REQUEST if isinstance(e, ValueError) else status.HTTP_503_SERVICE_UNAVAILABLE
+        raise HTTPException(status_code=status_code, detail=str(e))
+    return _accepted(job)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, api_key: Optional[str] = Depends(get_api_key)):
+    return await _get_owned_job(job_id, api_key)
+
+
+@router.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str, request: Request, format: Optional[str] = None, api_key: Optional[str] = Depends(get_api_key)):
+    """
+    Streams the job's status changes (queued, running, completed or failed) as SSE or NDJSON until it finishes.
+    """
+    await _get_owned_job(job_id, api_key)
+    stream_format = negotiate_stream_format(request, format)
+    return stream_events(job_runner.events(job_id), stream_format, operation="job_events")
@@ -0,0 +1,53 @@
+import json
+import time
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from opentelemetry import metrics
+
+from app.models.api_models import StreamEvent
+
+meter = metrics.get_meter(__name__)
+
+time_to_first_byte = meter.create_histogram("app.stream.time_to_first_byte", unit="s", description="Time from request arrival to the first streamed event")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def negotiate_stream_format(request: Request, format: Optional[str] = None) -> str:
+    """Picks "ndjson" or "sse" from an explicit `format` value, falling back to the Accept header (default SSE)."""
+    if format in ("ndjson", "sse"):
+        return format
+    return "ndjson" if NDJSON_MEDIA_TYPE in request.headers.get("accept", "") else "sse"
+
+
+def encode_event(event: StreamEvent, stream_format: str) -> str:
+    payload = jsonable_encoder(event.data)
+    if stream_format == "ndjson":
+        return json.dumps({"type": event.type, **payload}) + "\n"
+    return f"event: {event.type}\ndata: {json.dumps(payload)}\n\n"
+
+
+def stream_events(events: AsyncIterator[StreamEvent], stream_format: str, operation: str) -> StreamingResponse:
+    """
+    Wraps an event iterator in a StreamingResponse encoded as SSE or NDJSON. Time to first byte is recorded
+    per operation, and a failure part-way through is sent as a final "error" event instead of cutting the stream.
+    """
+    started_at = time.perf_counter()
+
+    async def body() -> AsyncIterator[str]:
+        first = True
+        try:
+            async for event in events:
+                if first:
+                    time_to_first_byte.record(time.perf_counter() - started_at, {"operation": operation})
+                    first = False
+                yield encode_event(event, stream_format)
+        except Exception as e:
+            yield encode_event(StreamEvent(type="error", data={"message": str(e)}), stream_format)
+
+    media_type = NDJSON_MEDIA_TYPE if stream_format == "ndjson" else SSE_MEDIA_TYPE
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,166 @@
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from opentelemetry import metrics
+from azure.core.credentials import AccessToken
+
+from app.config.settings import settings
+from app.utils.blocking_executor import run_blocking
+
+if TYPE_CHECKING:
+    from azure.ai.projects.aio import AIProjectClient
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+pool_hits = meter.create_counter("app.agent_client_pool.hits", description="Requests served by an already open pooled client")
+pool_misses = meter.create_counter("app.agent_client_pool.misses", description="Requests that had to open a pooled client")
+token_refreshes = meter.create_counter("app.credential.token_refreshes", description="Access tokens fetched from the underlying credential")
+
+
+class _TokenCache:
+    """
+    Keeps the most recent access token per scope set and decides when it is due for refresh.
+    Requests with claims or a tenant override are never cached, as they are challenge specific.
+    """
+    def __init__(self, refresh_margin_seconds: int):
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._tokens: dict[tuple, AccessToken] = {}
+
+    @staticmethod
+    def key(scopes: tuple, claims: Optional[str], tenant_id: Optional[str], enable_cae: bool) -> Optional[tuple]:
+        if claims or tenant_id:
+            return None
+        return (scopes, enable_cae)
+
+    def get(self, key: Optional[tuple]) -> tuple[Optional[AccessToken], bool]:
+        """Returns the cached token, if it has not expired, and whether it is within the refresh margin."""
+        token = self._tokens.get(key) if key else None
+        now = time.time()
+        if token is None or token.expires_on <= now:
+            return None, True
+        return token, token.expires_on - self.refresh_margin_seconds <= now
+
+    def put(self, key: Optional[tuple], scopes: tuple, token: AccessToken) -> None:
+        token_refreshes.add(1, {"scope": scopes[0] if scopes else ""})
+        if key:
+            self._tokens[key] = token
+
+
+class CachedTokenCredential:
+    """
+    Async credential wrapper that caches tokens, so concurrent requests share one token fetch instead of each
+    probing the credential chain. Within `refresh_margin_seconds` of expiry the cached token is still returned
+    while a single background task fetches the next one; callers only wait on the credential when there is no
+    unexpired token.
+    """
+    def __init__(self, credential, refresh_margin_seconds: int):
+        self._credential = credential
+        self._cache = _TokenCache(refresh_margin_seconds)
+        self._lock = asyncio.Lock()
+        self._refreshes: dict[tuple, asyncio.Task] = {}
+
+    async def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None, enable_cae: bool = False, **kwargs: Any) -> AccessToken:
+        key = _TokenCache.key(scopes, claims, tenant_id, enable_cae)
+        token, refresh_due = self._cache.get(key)
+        if token:
+            if refresh_due and key not in self._refreshes:
+                task = asyncio.create_task(self._refresh(key, scopes, enable_cae, kwargs))
+                self._refreshes[key] = task
+                task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+            return token
+        async with self._lock:
+            token, _ = self._cache.get(key)
+            if token is None:
+                token = await self._credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, enable_cae=enable_cae, **kwargs)
+                self._cache.put(key, scopes, token)
+        return token
+
+    async def _refresh(self, key: tuple, scopes: tuple, enable_cae: bool, kwargs: dict) -> None:
+        try:
+            async with self._lock:
+                token, refresh_due = self._cache.get(key)
+                if token is None or refresh_due:
+                    self._cache.put(key, scopes, await self._credential.get_token(*scopes, enable_cae=enable_cae, **kwargs))
+        except Exception as e:
+            # The cached token stays in use; the next request inside the margin tries again
+            logger.warning("Could not refresh access token in the background: %s", e)
+
+    async def close(self) -> None:
+        for task in list(self._refreshes.values()):
+            task.cancel()
+        await asyncio.gather(*self._refreshes.values(), return_exceptions=True)
+        await self._credential.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+class AgentClientPool:
+    """
+    AgentClientPool owns the application-lifetime Azure AI agent clients and the credential they share.
+    Clients are opened on first use (or eagerly by `open` at startup) and reused by every request until `close`.
+    """
+    def __init__(self):
+        self.endpoint = os.getenv("AZURE_AI_AGENT_ENDPOINT")
+        self._credential: Optional[CachedTokenCredential] = None
+        self._client: Optional["AIProjectClient"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def credential(self) -> CachedTokenCredential:
+        """The shared async credential; also used by other Azure clients that need an async token credential."""
+        with self._lock:
+            if self._credential is None:
+                from azure.identity.aio import DefaultAzureCredential
+                self._credential = CachedTokenCredential(DefaultAzureCredential(), settings.AGENT_TOKEN_REFRESH_MARGIN_SECONDS)
+            return self._credential
+
+    def get_client(self) -> "AIProjectClient":
+        """
+        Returns the shared async project client, also used by the Semantic Kernel `AzureAIAgent`. Semantic Kernel and
+        the project SDK are imported on the first call rather than at startup.
+        """
+        credential = self.credential
+        with self._lock:
+            if self._client is None:
+                pool_misses.add(1, {"client": "agents"})
+                from semantic_kernel.agents import AzureAIAgent
+                self._client = AzureAIAgent.create_client(credential=credential, endpoint=self.endpoint)
+            else:
+                pool_hits.add(1, {"client": "agents"})
+            return self._client
+
+    async def open(self) -> None:
+        """Opens the async client and warms the token cache so the first request skips the credential chain probe."""
+        if not self.endpoint:
+            logger.warning("AZURE_AI_AGENT_ENDPOINT is not set; agent clients will be opened on first use.")
+            return
+        # Load the SDKs on the blocking executor; get_client would otherwise import them on the event loop
+        for module in ("azure.identity.aio", "semantic_kernel.agents"):
+            await run_blocking(importlib.import_module, module)
+        self.get_client()
+        try:
+            await self.credential.get_token(settings.AGENT_TOKEN_SCOPE)
+        except Exception as e:
+            logger.warning("Could not pre-fetch agent access token: %s", e)
+
+    async def close(self) -> None:
+        with self._lock:
+            client, credential = self._client, self._credential
+            self._client, self._credential = None, None
+        if client:
+            await client.close()
+        if credential:
+            await credential.close()
+
+
+agent_client_pool = AgentClientPool()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+from azure.ai.agents.models import Agent
+
+from app.config.settings import settings
+from app.services.agent_client_pool import agent_client_pool
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class AgentDefinitionCache:
+    """
+    AgentDefinitionCache keeps agent definitions fetched from the Azure AI agent service, keyed by agent id.
+    Entries live for `AGENT_DEFINITION_CACHE_TTL_SECONDS`; once an entry is older than the refresh-ahead
+    ratio of its TTL it is still served, and a background task re-fetches it so callers never wait on a stale entry.
+    A fetch that was in flight when `invalidate` was called does not store its (possibly stale) result.
+    """
+    def __init__(self, ttl_seconds: float, refresh_ahead_ratio: float, max_size: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_after_seconds = ttl_seconds * refresh_ahead_ratio
+        self._cache = TTLCache("agent_definitions", max_size=max_size, ttl_seconds=ttl_seconds)
+        self._fetches: dict[str, asyncio.Task] = {}
+        self._refresh_tasks: dict[str, asyncio.Task] = {}
+        # Bumped by invalidate() while a fetch is in flight; kept only until the agent's fetches finish
+        self._generations: dict[str, int] = {}
+
+    async def get(self, agent_id: str) -> Agent:
+        if self.ttl_seconds <= 0:
+            return await self._fetch(agent_id)
+
+        entry = self._cache.get_entry(agent_id)
+        if entry:
+            if entry.age >= self.refresh_after_seconds:
+                self._schedule_refresh(agent_id)
+            return entry.value
+
+        # Collapse concurrent misses for the same agent into a single upstream call
+        task = self._fetches.get(agent_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(agent_id))
+            self._fetches[agent_id] = task
+            task.add_done_callback(lambda done: self._finished(agent_id, self._fetches, done))
+        # Shielded so one caller giving up does not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    def invalidate(self, agent_id: str) -> None:
+        """Evicts `agent_id`, e.g. after the agent has been created or updated, so the next call re-fetches it."""
+        self._cache.invalidate(agent_id)
+        if agent_id in self._fetches or agent_id in self._refresh_tasks:
+            self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+        # Callers arriving from now on start a new fetch instead of joining the stale one
+        self._fetches.pop(agent_id, None)
+        task = self._refresh_tasks.pop(agent_id, None)
+        if task:
+            task.cancel()
+
+    def clear(self) -> None:
+        self._cache.clear()
+        for agent_id in set(self._fetches) | set(self._refresh_tasks):
+            self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+        self._fetches.clear()
+        for task in self._refresh_tasks.values():
+            task.cancel()
+        self._refresh_tasks.clear()
+
+    async def _fetch_and_store(self, agent_id: str) -> Agent:
+        generation = self._generations.get(agent_id, 0)
+        definition = await self._fetch(agent_id)
+        if self._generations.get(agent_id, 0) == generation:
+            self._cache.set(agent_id, definition)
+        return definition
+
+    def _finished(self, agent_id: str, tasks: dict[str, asyncio.Task], task: asyncio.Task) -> None:
+        if tasks.get(agent_id) is task:
+            del tasks[agent_id]
+        if not task.cancelled():
+            task.exception()  # retrieved here so a fetch every caller gave up on is not reported as unhandled
+        if agent_id not in self._fetches and agent_id not in self._refresh_tasks:
+            self._generations.pop(agent_id, None)
+
+    async def _fetch(self, agent_id: str) -> Agent:
+        client = agent_client_pool.get_client()
+        return await client.agents.get_agent(agent_id=agent_id)
+
+    def _schedule_refresh(self, agent_id: str) -> None:
+        if agent_id in self._refresh_tasks:
+            return
+        task = asyncio.create_task(self._refresh(agent_id))
+        self._refresh_tasks[agent_id] = task
+        task.add_done_callback(lambda done: self._finished(agent_id, self._refresh_tasks, done))
+
+    async def _refresh(self, agent_id: str) -> None:
+        try:
+            await self._fetch_and_store(agent_id)
+        except Exception as e:
+            # Keep serving the current entry until it expires; the next request will retry the refresh
+            logger.warning("Background refresh of agent definition %s failed: %s", agent_id, e)
+
+
+agent_definition_cache = AgentDefinitionCache(
+    ttl_seconds=settings.AGENT_DEFINITION_CACHE_TTL_SECONDS,
+    refresh_ahead_ratio=settings.AGENT_DEFINITION_CACHE_REFRESH_AHEAD_RATIO,
+)
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from azure.ai.agents.models import Agent, CodeInterpreterTool
+from azure.core.exceptions import ResourceNotFoundError
+from opentelemetry import metrics
+
+from app.config.settings import settings
+from app.services.agent_client_pool import agent_client_pool
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+
+pool_idle = meter.create_up_down_counter("app.agent_pool.idle", description="Provisioned agents waiting in the pool")
+pool_leased = meter.create_up_down_counter("app.agent_pool.leased", description="Pooled agents currently leased to requests")
+pool_lease_wait = meter.create_histogram("app.agent_pool.lease_wait", unit="s", description="Time requests waited to lease a pooled agent")
+pool_created = meter.create_counter("app.agent_pool.created", description="Agents created by the pool")
+pool_deleted = meter.create_counter("app.agent_pool.deleted", description="Agents deleted by the pool")
+
+
+@dataclass(frozen=True)
+class AgentTemplate:
+    """One agent configuration; agents created from the same template are interchangeable between requests."""
+    name: str
+    model: str
+    instructions: str
+    code_interpreter: bool = False
+
+
+@dataclass
+class _IdleAgent:
+    agent: Agent
+    idle_since: float = field(default_factory=time.monotonic)
+
+
+class _TemplatePool:
+    def __init__(self, template: AgentTemplate):
+        self.template = template
+        self.idle: deque[_IdleAgent] = deque()
+        self.size = 0
+        self.available = asyncio.Condition()
+
+
+class AgentPool:
+    """
+    AgentPool keeps agents provisioned per AgentTemplate so requests lease one instead of creating and deleting
+    an agent each time. Every registered template is warmed with AGENT_POOL_MIN_SIZE agents at startup; the pool
+    grows on demand up to AGENT_POOL_MAX_SIZE, after which requests wait for a release. Idle agents above the
+    minimum are deleted once idle for AGENT_POOL_IDLE_TTL_SECONDS, and all pooled agents are deleted on shutdown.
+    """
+    def __init__(self, min_size: int, max_size: int, idle_ttl_seconds: float, reap_interval_seconds: float):
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.reap_interval_seconds = reap_interval_seconds
+        self._pools: dict[AgentTemplate, _TemplatePool] = {}
+        self._reap_task: Optional[asyncio.Task] = None
+        self._warm_tasks: set[asyncio.Task] = set()
+        self._opened = False
+
+    def register(self, template: AgentTemplate) -> None:
+        """Registers a template to be warmed; templates registered after startup are warmed immediately."""
+        if template not in self._pools:
+            self._pools[template] = _TemplatePool(template)
+            if self._opened and agent_client_pool.endpoint:
+                self._start_warming(self._pools[template])
+
+    async def acquire(self, template: AgentTemplate) -> Agent:
+        self.register(template)
+        pool = self._pools[template]
+        started_at = time.perf_counter()
+        async with pool.available:
+            while not pool.idle and pool.size >= self.max_size:
+                await pool.available.wait()
+            if pool.idle:
+                agent = pool.idle.popleft().agent
+                pool_idle.add(-1, {"pool": template.name})
+            else:
+                pool.size += 1
+                agent = None
+
+        if agent is None:
+            try:
+                agent = await self._create(template)
+            except Exception:
+                await self._shrink(pool)
+                raise
+        pool_lease_wait.record(time.perf_counter() - started_at, {"pool": template.name})
+        pool_leased.add(1, {"pool": template.name})
+        return agent
+
+    async def release(self, template: AgentTemplate, agent: Agent, error: Optional[BaseException] = None) -> None:
+        """Returns a leased agent; it is discarded when the pool is closed or the agent no longer exists upstream."""
+        pool = self._pools[template]
+        pool_leased.add(-1, {"pool": template.name})
+        if not self._opened or isinstance(error, ResourceNotFoundError):
+            await self._delete(agent, template)
+            await self._shrink(pool)
+            return
+        async with pool.available:
+            pool.idle.append(_IdleAgent(agent))
+            pool_idle.add(1, {"pool": template.name})
+            pool.available.notify()
+
+    async def open(self) -> None:
+        """Starts warming registered templates in the background, so startup does not wait on agent creation."""
+        self._opened = True
+        if agent_client_pool.endpoint:
+            for pool in self._pools.values():
+                self._start_warming(pool)
+        if self.reap_interval_seconds > 0:
+            self._reap_task = asyncio.create_task(self._reap_loop())
+
+    async def close(self) -> None:
+        self._opened = False
+        if self._reap_task:
+            self._reap_task.cancel()
+            self._reap_task = None
+        # Warming stops; agents it creates from here on are deleted instead of pooled
+        warm_tasks = list(self._warm_tasks)
+        for task in warm_tasks:
+            task.cancel()
+        await asyncio.gather(*warm_tasks, return_exceptions=True)
+        for pool in self._pools.values():
+            while pool.idle:
+                idle = pool.idle.popleft()
+                pool_idle.add(-1, {"pool": pool.template.name})
+                await self._delete(idle.agent, pool.template)
+                pool.size -= 1
+
+    async def reap(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        for pool in self._pools.values():
+            expired: list[Agent] = []
+            async with pool.available:
+                # Oldest idle agents are at the front; keep at least min_size provisioned
+                while pool.idle and pool.size > self.min_size and pool.idle[0].idle_since <= cutoff:
+                    expired.append(pool.idle.popleft().agent)
+                    pool_idle.add(-1, {"pool": pool.template.name})
+                    pool.size -= 1
+                pool.available.notify(len(expired))
+            for agent in expired:
+                await self._delete(agent, pool.template)
+
+    def _start_warming(self, pool: _TemplatePool) -> None:
+        task = asyncio.create_task(self._warm(pool))
+        self._warm_tasks.add(task)
+        task.add_done_callback(self._warm_tasks.discard)
+
+    async def _warm(self, pool: _TemplatePool) -> None:
+        async with pool.available:
+            missing = max(0, self.min_size - pool.size)
+            pool.size += missing
+        creations = asyncio.gather(*(self._create(pool.template) for _ in range(missing)), return_exceptions=True)
+        try:
+            results = await asyncio.shield(creations)
+        except asyncio.CancelledError:
+            # The pool is closing: wait for the agents already being created, so they are deleted rather than leaked
+            for result in await creations:
+                if not isinstance(result, BaseException):
+                    await self._delete(result, pool.template)
+            pool.size -= missing
+            raise
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("Could not pre-create agent for pool '%s': %s", pool.template.name, result)
+                await self._shrink(pool)
+            elif not self._opened:
+                await self._delete(result, pool.template)
+                await self._shrink(pool)
+            else:
+                async with pool.available:
+                    pool.idle.append(_IdleAgent(result))
+                    pool_idle.add(1, {"pool": pool.template.name})
+                    pool.available.notify()
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reap_interval_seconds)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning("Agent pool reaping failed: %s", e)
+
+    async def _shrink(self, pool: _TemplatePool) -> None:
+        async with pool.available:
+            pool.size -= 1
+            pool.available.notify()
+
+    async def _create(self, template: AgentTemplate) -> Agent:
+        client = agent_client_pool.get_client()
+        tools = CodeInterpreterTool() if template.code_interpreter else None
+        agent = await client.agents.create_agent(
+            model=template.model,
+            name=template.name,
+            instructions=template.instructions,
+            tools=tools.definitions if tools else None,
+            tool_resources=tools.resources if tools else None,
+        )
+        pool_created.add(1, {"pool": template.name})
+        logger.info("Created pooled agent %s for pool '%s'", agent.id, template.name)
+        return agent
+
+    async def _delete(self, agent: Agent, template: AgentTemplate) -> None:
+        try:
+            await agent_client_pool.get_client().agents.delete_agent(agent.id)
+            pool_deleted.add(1, {"pool": template.name})
+        except Exception as e:
+            logger.warning("Could not delete pooled agent %s: %s", agent.id, e)
+
+
+agent_pool = AgentPool(
+    min_size=settings.AGENT_POOL_MIN_SIZE,
+    max_size=settings.AGENT_POOL_MAX_SIZE,
+    idle_ttl_seconds=settings.AGENT_POOL_IDLE_TTL_SECONDS,
+    reap_interval_seconds=settings.AGENT_POOL_REAP_INTERVAL_SECONDS,
+)
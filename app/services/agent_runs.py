@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import re
+
+from azure.ai.agents.models import RunStatus, ThreadRun
+from azure.ai.projects.aio import AIProjectClient
+
+from app.config.settings import settings
+from app.utils.resilience import Dependency, RetryPolicy, TransientError
+
+logger = logging.getLogger(__name__)
+
+# Run errors the agent service reports for throttling and its own failures; worth another run on the same thread
+TRANSIENT_RUN_ERROR_CODES = {"rate_limit_exceeded", "server_error"}
+
+ACTIVE_RUN_STATUSES = {RunStatus.QUEUED, RunStatus.IN_PROGRESS, RunStatus.CANCELLING}
+
+agent_service = Dependency("agent_service", RetryPolicy(attempt_timeout_seconds=settings.AGENT_RUN_TIMEOUT_SECONDS))
+
+
+async def process_run(project_client: AIProjectClient, thread_id: str, agent_id: str) -> ThreadRun:
+    """
+    Runs the agent on the thread until the run finishes, like `runs.create_and_process`. Runs that fail with a
+    rate-limit or server error are retried as new runs (after the wait the error message asks for), and a run
+    that exceeds AGENT_RUN_TIMEOUT_SECONDS is cancelled and retried. Other failed runs are returned as they are.
+    """
+    async def attempt() -> ThreadRun:
+        run = await project_client.agents.runs.create(thread_id=thread_id, agent_id=agent_id)
+        try:
+            while run.status in ACTIVE_RUN_STATUSES:
+                await asyncio.sleep(settings.AGENT_RUN_POLL_INTERVAL_SECONDS)
+                run = await project_client.agents.runs.get(thread_id=thread_id, run_id=run.id)
+        except asyncio.CancelledError:
+            # Timed out: stop the run so the thread is free for the next attempt
+            await asyncio.shield(_cancel_run(project_client, thread_id, run.id))
+            raise
+
+        error = run.last_error
+        if run.status == RunStatus.FAILED and error and error.code in TRANSIENT_RUN_ERROR_CODES:
+            match = re.search(r"(\d+) seconds?", error.message or "")
+            raise TransientError(f"Run failed: {error.code}: {error.message}", retry_after=float(match.group(1)) if match else None)
+        return run
+
+    return await agent_service.call(attempt)
+
+
+async def _cancel_run(project_client: AIProjectClient, thread_id: str, run_id: str) -> None:
+    try:
+        await project_client.agents.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception as e:
+        logger.warning("Could not cancel run %s: %s", run_id, e)
@@ -1,8 +1,17 @@
-from azure.identity import DefaultAzureCredential
-from azure.identity.aio import DefaultAzureCredential
-from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings
+import asyncio
+import logging
+import time
+from typing import Optional
 
+from azure.ai.agents.models import Agent
+from semantic_kernel.agents import AzureAIAgentSettings
+
+from app.config.settings import settings
 from app.models.api_models import AgentCreateRequest
+from app.services.agent_client_pool import agent_client_pool
+from app.services.agent_definition_cache import agent_definition_cache
+
+logger = logging.getLogger(__name__)
 
 
 class AzureAIAgentFactory:
@@ -11,22 +20,70 @@ class AzureAIAgentFactory:
         # Semantic kernel loads the .env file automatically, so we don't need to do it here.
         self.ai_agent_settings = AzureAIAgentSettings.create()
 
+        # Name -> agent index, filled lazily from list_agents and reconciled every AGENT_NAME_INDEX_RECONCILE_SECONDS
+        self._agents_by_name: dict[str, Agent] = {}
+        self._index_loaded_at: Optional[float] = None
+        self._index_lock = asyncio.Lock()
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._created_during_load: set[str] = set()
+        # In-flight creates keyed by name, so concurrent requests for one name share a single upstream create
+        self._pending_creates: dict[str, asyncio.Task] = {}
+
     async def run_create_azure_ai_agent(self, request: AgentCreateRequest) -> str:
-        creds = DefaultAzureCredential()
-        async with (AzureAIAgent.create_client(credential=creds) as client,):
-            # First, check if an agent with this name already exists
-            try:
-                # List all agents and check if one with the requested name exists
-                agents_pager = client.agents.list_agents()
-                async for agent in agents_pager:
-                    if agent.name == request.name:
-                        # Agent with this name already exists, return it
-                        return agent
-            except Exception as e:
-                # If listing fails, continue with creation
-                print(f"Warning: Could not list existing agents: {e}")
-            
-            # No existing agent found, create a new one
-            agent_definition = await client.agents.create_agent(model=request.model, name=request.name, instructions=request.instructions)
-            
-        return agent_definition
\ No newline at end of file
+        # First, check if an agent with this name already exists
+        await self._ensure_index()
+        agent = self._agents_by_name.get(request.name)
+        if agent:
+            # Agent with this name already exists, return it
+            return agent
+
+        # No existing agent found, create a new one (or join a create already in flight for this name)
+        task = self._pending_creates.get(request.name)
+        if task is None:
+            task = asyncio.create_task(self._create_agent(request))
+            self._pending_creates[request.name] = task
+            task.add_done_callback(lambda _: self._pending_creates.pop(request.name, None))
+        return await asyncio.shield(task)
+
+    async def _create_agent(self, request: AgentCreateRequest) -> Agent:
+        client = agent_client_pool.get_client()
+        agent_definition = await client.agents.create_agent(model=request.model, name=request.name, instructions=request.instructions)
+        self._agents_by_name[request.name] = agent_definition
+        self._created_during_load.add(request.name)
+        # Drop any cached definition so /agent/chat picks up the new agent
+        agent_definition_cache.invalidate(agent_definition.id)
+        return agent_definition
+
+    async def _ensure_index(self) -> None:
+        if self._index_loaded_at is None:
+            async with self._index_lock:
+                if self._index_loaded_at is None:
+                    await self._load_index()
+        elif time.monotonic() - self._index_loaded_at >= settings.AGENT_NAME_INDEX_RECONCILE_SECONDS:
+            # Serve from the current index and reconcile with the service in the background
+            if self._reconcile_task is None or self._reconcile_task.done():
+                self._reconcile_task = asyncio.create_task(self._reconcile_index())
+
+    async def _reconcile_index(self) -> None:
+        async with self._index_lock:
+            await self._load_index()
+
+    async def _load_index(self) -> None:
+        client = agent_client_pool.get_client()
+        self._created_during_load.clear()
+        try:
+            # List all agents once and index them by name
+            agents_by_name: dict[str, Agent] = {}
+            async for agent in client.agents.list_agents():
+                if agent.name:
+                    agents_by_name.setdefault(agent.name, agent)
+        except Exception as e:
+            # If listing fails, continue with creation and retry the listing on the next call
+            logger.warning("Could not list existing agents: %s", e)
+            return
+
+        # Keep agents created while the listing was in progress
+        for name in self._created_during_load:
+            agents_by_name.setdefault(name, self._agents_by_name[name])
+        self._agents_by_name = agents_by_name
+        self._index_loaded_at = time.monotonic()
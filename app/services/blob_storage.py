@@ -0,0 +1,115 @@
+import time
+from typing import IO, Optional
+
+from azure.core import MatchConditions
+from azure.storage.blob import BlobProperties
+from azure.storage.blob.aio import BlobClient, BlobServiceClient
+from opentelemetry import metrics
+
+from app.config.settings import settings
+from app.utils.resilience import Dependency, RetryPolicy
+
+meter = metrics.get_meter(__name__)
+
+blob_operation_duration = meter.create_histogram("app.blob.duration", unit="s", description="Duration of blob storage operations")
+blob_operation_throughput = meter.create_histogram("app.blob.throughput", unit="By/s", description="Bytes per second moved by blob uploads and downloads")
+
+
+class BlobStorage:
+    """
+    BlobStorage owns the application's single async BlobServiceClient, so every request reuses its pooled
+    connections instead of building a client per call. Transfers are split into BLOB_TRANSFER_CHUNK_SIZE_BYTES
+    blocks moved BLOB_TRANSFER_MAX_CONCURRENCY at a time, and each operation records its latency and throughput.
+    The SDK's own retries are turned off: operations go through the "blob_storage" resilience Dependency instead.
+    Works against a local Azurite instance with Azurite's well-known development connection string (see README).
+    """
+    def __init__(self, connection_string: Optional[str], container_name: Optional[str], chunk_size: int, max_concurrency: int):
+        self.connection_string = connection_string
+        self.container_name = container_name
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self._service_client: Optional[BlobServiceClient] = None
+        self.dependency = Dependency("blob_storage", RetryPolicy(attempt_timeout_seconds=settings.BLOB_OPERATION_TIMEOUT_SECONDS))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.connection_string)
+
+    def get_service_client(self) -> BlobServiceClient:
+        if not self.connection_string:
+            raise ValueError("Missing required environment variable AZURE_BLOB_CONNECTION_STRING for Azure Blob Storage.")
+        if self._service_client is None:
+            self._service_client = BlobServiceClient.from_connection_string(
+                self.connection_string,
+                max_single_get_size=self.chunk_size,
+                max_chunk_get_size=self.chunk_size,
+                max_single_put_size=self.chunk_size,
+                max_block_size=self.chunk_size,
+                retry_total=0,
+            )
+        return self._service_client
+
+    def get_blob_client(self, blob_name: str) -> BlobClient:
+        if not self.container_name:
+            raise ValueError("Missing required environment variable AZURE_BLOB_CONTAINER_NAME for Azure Blob Storage.")
+        return self.get_service_client().get_blob_client(container=self.container_name, blob=blob_name)
+
+    async def get_properties(self, blob_name: str) -> BlobProperties:
+        started_at = time.perf_counter()
+        properties = await self.dependency.call(self.get_blob_client(blob_name).get_blob_properties)
+        blob_operation_duration.record(time.perf_counter() - started_at, {"operation": "get_properties"})
+        return properties
+
+    async def download_to(self, blob_name: str, stream: IO[bytes], etag: Optional[str] = None) -> int:
+        """Downloads the blob into a seekable `stream` in parallel chunks; with `etag` the blob must not have changed since."""
+        started_at = time.perf_counter()
+        conditions = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag else {}
+        start = stream.tell()
+
+        async def attempt() -> int:
+            # A retried download starts over from where the first attempt began writing
+            stream.seek(start)
+            stream.truncate()
+            downloader = await self.get_blob_client(blob_name).download_blob(max_concurrency=self.max_concurrency, **conditions)
+            return await downloader.readinto(stream)
+
+        size = await self.dependency.call(attempt)
+        self._record("download", started_at, size)
+        return size
+
+    async def upload_from(self, blob_name: str, stream: IO[bytes], length: Optional[int] = None) -> str:
+        """Uploads `stream` as the blob in parallel blocks, overwriting any existing blob, and returns the blob URL."""
+        started_at = time.perf_counter()
+        blob_client = self.get_blob_client(blob_name)
+        start = stream.tell()
+
+        async def attempt() -> None:
+            stream.seek(start)
+            await blob_client.upload_blob(stream, length=length, overwrite=True, max_concurrency=self.max_concurrency)
+
+        await self.dependency.call(attempt)
+        self._record("upload", started_at, length)
+        return blob_client.url
+
+    async def open(self) -> None:
+        if self.enabled:
+            self.get_service_client()
+
+    async def close(self) -> None:
+        if self._service_client is not None:
+            await self._service_client.close()
+            self._service_client = None
+
+    def _record(self, operation: str, started_at: float, size: Optional[int]) -> None:
+        duration = time.perf_counter() - started_at
+        blob_operation_duration.record(duration, {"operation": operation})
+        if size and duration > 0:
+            blob_operation_throughput.record(size / duration, {"operation": operation})
+
+
+blob_storage = BlobStorage(
+    connection_string=settings.AZURE_BLOB_CONNECTION_STRING,
+    container_name=settings.AZURE_BLOB_CONTAINER_NAME,
+    chunk_size=settings.BLOB_TRANSFER_CHUNK_SIZE_BYTES,
+    max_concurrency=settings.BLOB_TRANSFER_MAX_CONCURRENCY,
+)
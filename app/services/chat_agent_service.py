@@ -1,20 +1,35 @@
+import logging
 import os
 import uuid
+from typing import AsyncIterator
 from dotenv import load_dotenv
 from opentelemetry import trace
-from azure.ai.projects import AIProjectClient
-from app.models.api_models import ChatThreadRequest, RequestResult, Source, FileReference
-
-from azure.storage.blob import BlobServiceClient
+from app.models.api_models import ChatThreadRequest, ExecutionDiagnostics, RequestResult, Source, FileReference, StreamEvent
 
 from semantic_kernel.contents import ChatMessageContent, FunctionCallContent, StreamingChatMessageContent, StreamingAnnotationContent, StreamingFileReferenceContent, ImageContent, FileReferenceContent
 from semantic_kernel.agents import AzureAIAgent, AzureAIAgentThread
 
-from azure.identity.aio import DefaultAzureCredential
 from azure.ai.agents.models import FileSearchTool, FileSearchTool
-from azure.identity import DefaultAzureCredential
 
+from app.config.settings import settings
+from app.services.agent_client_pool import agent_client_pool
+from app.services.agent_definition_cache import agent_definition_cache
+from app.services.blob_storage import blob_storage
+from app.services.document_registry import document_registry
+from app.utils.cache import TTLCache
 from app.utils.file_utils import download_and_process_file, create_chat_message_content
+from app.utils.telemetry import FirstTokenTimer, phase, record_token_usage
+
+logger = logging.getLogger(__name__)
+
+# Thread id -> vector store id, written whenever this service attaches a vector store to a thread
+thread_vector_stores = TTLCache(
+    "thread_vector_stores",
+    max_size=settings.THREAD_VECTOR_STORE_CACHE_MAX_SIZE,
+    ttl_seconds=settings.THREAD_VECTOR_STORE_CACHE_TTL_SECONDS,
+)
+# A thread the registry has unpinned may find its vector store deleted, so look it up again next time
+document_registry.on_thread_released(thread_vector_stores.invalidate)
 
 class ChatAgentService:
     def __init__(self):
@@ -22,13 +37,20 @@ class ChatAgentService:
         load_dotenv()
 
         self.agent_id = os.getenv("AZURE_AI_AGENT_ID")
-        blob_connection_string = os.getenv("AZURE_BLOB_CONNECTION_STRING")
-        self.blob_service_client = None
-        if blob_connection_string:
-            self.blob_service_client = BlobServiceClient.from_connection_string(blob_connection_string)
         pass
 
     async def run_chat_sk(self, request: ChatThreadRequest) -> str:
+        request_result = None
+        async for event in self.stream_chat_sk(request):
+            if event.type == "done":
+                request_result = event.data["result"]
+        return request_result
+
+    async def stream_chat_sk(self, request: ChatThreadRequest) -> AsyncIterator[StreamEvent]:
+        """
+        Runs the chat agent and yields typed events as they arrive: text deltas, function calls, annotations,
+        file references and code interpreter output, followed by a "done" event carrying the full result.
+        """
         tracer = trace.get_tracer(__name__)
         with tracer.start_as_current_span("Agent: Chat") as current_span:
             # Validate the request object
@@ -37,141 +59,169 @@ class ChatAgentService:
             user_message = request.message
 
             # Check if a file was specified in the request
-            file_content = None
             ai_project_file = None
-            if request.file and self.blob_service_client:
-                file_content, ai_project_file = await download_and_process_file(self.blob_service_client, request.file)
+            execution_diagnostics = ExecutionDiagnostics()
+            if request.file and blob_storage.enabled:
+                with phase("chat", "file_transfer"):
+                    ai_project_file, transfer_step = await download_and_process_file(request.file)
+                if transfer_step:
+                    execution_diagnostics.steps.append(transfer_step)
 
-            # Define a list to hold callback message content
+            # Define a list to hold callback message content, and the events not yet sent to the caller
             intermediate_steps: list[str] = []
+            pending_events: list[StreamEvent] = []
             async def handle_intermediate_steps(message: ChatMessageContent) -> None:
-                print("handle_intermediate_steps")
+                record_token_usage("chat", (message.metadata or {}).get("usage"))
                 if any(isinstance(item, FunctionCallContent) for item in message.items):
                     for fcc in message.items:
                         if isinstance(fcc, FunctionCallContent):
                             intermediate_steps.append(f"Function Call: {fcc.name} with arguments: {fcc.arguments}")
+                            pending_events.append(StreamEvent(type="function_call", data={"name": fcc.name, "arguments": fcc.arguments}))
                         else:
-                            print(f"{message.role}: {message.content}")
+                            logger.debug("Intermediate %s message: %s", message.role, message.content)
                 else:
-                    print(f"{message.role}: {message.content}")
-
-            creds = DefaultAzureCredential()
-            async with (AzureAIAgent.create_client(credential=creds) as client,):
-                  # Create an agent on the Azure AI agent service. Create a Semantic Kernel agent for the Azure AI agent
-                agent_definition = await client.agents.get_agent(agent_id=self.agent_id)
-                agent = AzureAIAgent(client=client, definition=agent_definition)
-                thread: AzureAIAgentThread  = None
-                if request.thread_id:
-                    thread = AzureAIAgentThread(client=client, thread_id=request.thread_id)               
-                if ai_project_file:
+                    logger.debug("Intermediate %s message: %s", message.role, message.content)
+
+            client = agent_client_pool.get_client()
+            # Create a Semantic Kernel agent for the Azure AI agent
+            with phase("chat", "agent_definition"):
+                agent_definition = await agent_definition_cache.get(self.agent_id)
+            agent = AzureAIAgent(client=client, definition=agent_definition)
+            thread: AzureAIAgentThread  = None
+            if request.thread_id:
+                thread = AzureAIAgentThread(client=client, thread_id=request.thread_id)
+                document_registry.touch_thread(request.thread_id)
+            acquired_vector_store_id = None
+            if ai_project_file:
+                with phase("chat", "vector_store"):
                     try:
-                        project_client = AIProjectClient(credential=DefaultAzureCredential(), endpoint=os.environ["AZURE_AI_AGENT_ENDPOINT"])
-                        with project_client:
-                            # Check if we need to create a thread with vector store functionality
-                            thread_id = request.thread_id
-                            if not thread and not request.thread_id:
-                                # Create a vector store first
-                                print(f"Creating new vector store with file ID: {ai_project_file.id}")
-                                vector_store = project_client.agents.vector_stores.create_and_poll(file_ids=[ai_project_file.id], name=f"rutzsco_paif_vs_{uuid.uuid4()}")
-                                print(f"Created vector store with ID: {vector_store.id}")
-                                
-                                # Create file search tool with the vector store
-                                file_search_tool = FileSearchTool(vector_store_ids=[vector_store.id])
-                                
-                                # Create thread with the file search tool resources
-                                print("Creating new thread with vector store attachment")
-                                thread_response = project_client.agents.threads.create(tool_resources=file_search_tool.resources)
-                                thread_id = thread_response.id
-                                thread = AzureAIAgentThread(client=client, thread_id=thread_id)
-                                print(f"Created new thread with ID: {thread_id} and vector store {vector_store.id}")
-                            elif thread_id:
-                                # Check if the existing thread already has a vector store
-                                vector_store_id = None
+                        # Check if we need to create a thread with vector store functionality
+                        thread_id = request.thread_id
+                        if not thread and not request.thread_id:
+                            # Get a vector store for the file first, reusing a ready one when the file was seen before
+                            acquired_vector_store_id, reused = await document_registry.acquire_vector_store([ai_project_file.id], _create_vector_store)
+                            logger.info("Using vector store %s (reused: %s)", acquired_vector_store_id, reused, extra={"vector_store_id": acquired_vector_store_id})
+                        
+                            # Create file search tool with the vector store
+                            file_search_tool = FileSearchTool(vector_store_ids=[acquired_vector_store_id])
+                        
+                            # Create thread with the file search tool resources
+                            thread_response = await client.agents.threads.create(tool_resources=file_search_tool.resources)
+                            thread_id = thread_response.id
+                            thread = AzureAIAgentThread(client=client, thread_id=thread_id)
+                            document_registry.bind_thread(thread_id, acquired_vector_store_id)
+                            thread_vector_stores.set(thread_id, acquired_vector_store_id)
+                            logger.info("Created thread %s with vector store %s", thread_id, acquired_vector_store_id, extra={"thread_id": thread_id, "vector_store_id": acquired_vector_store_id})
+                        elif thread_id:
+                            # Check if the existing thread already has a vector store
+                            vector_store_id = await _get_thread_vector_store_id(thread_id)
+
+                            if vector_store_id and document_registry.is_shared(vector_store_id, thread_id):
+                                # Other requests or threads use this registry store, so move the thread to a store holding the previous files and the new one
+                                file_ids = document_registry.vector_store_file_ids(vector_store_id) + [ai_project_file.id]
+                                acquired_vector_store_id, reused = await document_registry.acquire_vector_store(file_ids, _create_vector_store)
+                                file_search_tool = FileSearchTool(vector_store_ids=[acquired_vector_store_id])
+                                await client.agents.threads.update(thread_id=thread_id, tool_resources=file_search_tool.resources)
+                                document_registry.bind_thread(thread_id, acquired_vector_store_id)
+                                thread_vector_stores.set(thread_id, acquired_vector_store_id)
+                                logger.info("Updated thread %s with vector store %s (reused: %s)", thread_id, acquired_vector_store_id, reused, extra={"thread_id": thread_id, "vector_store_id": acquired_vector_store_id})
+                            elif vector_store_id:
+                                # Add the file to the thread's own vector store, which indexes only the new file
                                 try:
-                                    thread_details = project_client.agents.threads.get(thread_id)
-                                    if (hasattr(thread_details, 'tool_resources') and 
-                                        thread_details.tool_resources and
-                                        hasattr(thread_details.tool_resources, 'file_search') and
-                                        thread_details.tool_resources.file_search and
-                                        hasattr(thread_details.tool_resources.file_search, 'vector_store_ids')):
-                                        vector_store_ids = thread_details.tool_resources.file_search.vector_store_ids
-                                        if vector_store_ids:
-                                            vector_store_id = vector_store_ids[0]
-                                            print(f"Found existing vector store ID: {vector_store_id}")
+                                    await document_registry.add_file(thread_id, vector_store_id, ai_project_file.id, _add_file_to_vector_store)
+                                    document_registry.touch_thread(thread_id)
+                                    logger.info("Added file %s to existing vector store %s", ai_project_file.id, vector_store_id, extra={"thread_id": thread_id, "vector_store_id": vector_store_id})
                                 except Exception as e:
-                                    print(f"Could not get thread details: {e}")
-                                
-                                if vector_store_id:
-                                    # Add the file to the existing vector store
-                                    print(f"Adding file {ai_project_file.id} to existing vector store {vector_store_id}")
-                                    project_client.agents.vector_store_files.create_and_poll(vector_store_id=vector_store_id, file_id=ai_project_file.id)
-                                    print(f"Added file to existing vector store {vector_store_id}")
-                                else:
-                                    # Create a new vector store and update the thread
-                                    print(f"Creating new vector store with file ID: {ai_project_file.id}")
-                                    vector_store = project_client.agents.vector_stores.create_and_poll(file_ids=[ai_project_file.id], name=f"rutzsco_paif_vs_{uuid.uuid4()}")
-                                    print(f"Created vector store with ID: {vector_store.id}")
-                                    
-                                    # Update the existing thread with file search tool resources
-                                    file_search_tool = FileSearchTool(vector_store_ids=[vector_store.id])
-                                    project_client.agents.threads.update(thread_id=thread_id, tool_resources=file_search_tool.resources)
-                                    print(f"Updated thread {thread_id} with vector store {vector_store.id}")
-                            
+                                    # The store may have been deleted; give the thread a new one below
+                                    logger.warning("Could not add file %s to vector store %s: %s", ai_project_file.id, vector_store_id, e, extra={"thread_id": thread_id})
+                                    vector_store_id = None
+
+                            if not vector_store_id:
+                                # Get a vector store for the file and update the thread
+                                acquired_vector_store_id, reused = await document_registry.acquire_vector_store([ai_project_file.id], _create_vector_store)
+                                logger.info("Using vector store %s (reused: %s)", acquired_vector_store_id, reused, extra={"vector_store_id": acquired_vector_store_id})
+
+                                # Update the existing thread with file search tool resources
+                                file_search_tool = FileSearchTool(vector_store_ids=[acquired_vector_store_id])
+                                await client.agents.threads.update(thread_id=thread_id, tool_resources=file_search_tool.resources)
+                                document_registry.bind_thread(thread_id, acquired_vector_store_id)
+                                thread_vector_stores.set(thread_id, acquired_vector_store_id)
+                                logger.info("Updated thread %s with vector store %s", thread_id, acquired_vector_store_id, extra={"thread_id": thread_id, "vector_store_id": acquired_vector_store_id})
+
                     except Exception as e:
-                        print(f"Error setting up vector store: {e}")
-
-                annotations: list[StreamingAnnotationContent] = []
-                files: list[StreamingFileReferenceContent] = []
-                sources = []
-                file_references = []
-                responseContent = ''
-                code_output_content = ''
-                try:
-                    # Create the appropriate ChatMessageContent based on whether we have a file
-                    cmc = create_chat_message_content(
-                        user_message=user_message, 
-                        #file_content=file_content, 
-                        #file_name=request.file, 
-                        #ai_project_file=ai_project_file
-                    )
-                    
+                        # The cached vector store may have been deleted; look the thread up again next time
+                        if thread_id:
+                            thread_vector_stores.invalidate(thread_id)
+                        logger.warning("Error setting up vector store: %s", e, extra={"thread_id": thread_id})
+
+            annotations: list[StreamingAnnotationContent] = []
+            files: list[StreamingFileReferenceContent] = []
+            sources = []
+            file_references = []
+            responseContent = ''
+            code_output_content = ''
+            try:
+                # Create the appropriate ChatMessageContent based on whether we have a file
+                cmc = create_chat_message_content(
+                    user_message=user_message, 
+                    #file_content=file_content, 
+                    #file_name=request.file, 
+                    #ai_project_file=ai_project_file
+                )
+                
+                first_token = FirstTokenTimer("chat")
+                with phase("chat", "invoke"):
                     async for result in agent.invoke_stream(messages=cmc, thread=thread, on_intermediate_message=handle_intermediate_steps):
                         response = result
-                        
-                        annotations.extend([item for item in result.items if isinstance(item, StreamingAnnotationContent)])
-                        files.extend([item for item in result.items if isinstance(item, StreamingFileReferenceContent)])
+                        for event in pending_events:
+                            yield event
+                        pending_events.clear()
+
+                        new_annotations = [item for item in result.items if isinstance(item, StreamingAnnotationContent)]
+                        new_files = [item for item in result.items if isinstance(item, StreamingFileReferenceContent)]
+                        annotations.extend(new_annotations)
+                        files.extend(new_files)
+                        is_code = hasattr(result, 'metadata') and result.metadata and result.metadata.get("code") is True
                         if isinstance(result.message, StreamingChatMessageContent):
                             responseContent += result.message.content
+                            if result.message.content:
+                                first_token.mark()
+                                yield StreamEvent(type="code" if is_code else "delta", data={"content": result.message.content})
                         else:
-                            print(f"{result}")
+                            logger.debug("Non-text agent content: %s", result)
 
                         # Check for code in metadata
-                        if hasattr(result, 'metadata') and result.metadata and result.metadata.get("code") is True:
+                        if is_code:
                             if isinstance(result.message, StreamingChatMessageContent) and result.message.content:
                                 code_output_content += result.message.content
 
+                        for item in new_annotations:
+                            yield StreamEvent(type="annotation", data={"source": _to_source(item)})
+                        for item in new_files:
+                            yield StreamEvent(type="file", data={"file": FileReference(id=item.file_id if hasattr(item, 'file_id') else '')})
+
                         thread = response.thread
-                    
-                    # Extract annotations from the ChatMessageContent response
-                    for item in annotations:
-                        source = Source(
-                            quote=item.quote if hasattr(item, 'quote') else '',
-                            title=item.title if hasattr(item, 'title') else '',
-                            url=item.url if hasattr(item, 'url') else '',
-                            start_index=item.start_index if hasattr(item, 'start_index') else '',
-                            end_index=item.end_index if hasattr(item, 'end_index') else ''
-                        )
-                        sources.append(source)
-
-                    for item in files:
-                        fr = FileReference(id=item.file_id if hasattr(item, 'file_id') else '')
-                        file_references.append(fr)
-                
-                finally:
-                    print("Completed agent invocation")  
+
+                for event in pending_events:
+                    yield event
+                pending_events.clear()
+
+                # Extract annotations from the ChatMessageContent response
+                for item in annotations:
+                    sources.append(_to_source(item))
+
+                for item in files:
+                    fr = FileReference(id=item.file_id if hasattr(item, 'file_id') else '')
+                    file_references.append(fr)
+            
+            finally:
+                if acquired_vector_store_id:
+                    document_registry.release(acquired_vector_store_id)
+                logger.debug("Completed agent invocation")
 
             request_result = RequestResult(
                 content=responseContent,
+                execution_diagnostics=execution_diagnostics,
                 sources=sources,
                 files=file_references,
                 intermediate_steps=intermediate_steps,
@@ -179,4 +229,52 @@ class ChatAgentService:
                 code_content=code_output_content.strip() # Add code_output_content to RequestResult
             )
 
-            return request_result
\ No newline at end of file
+            yield StreamEvent(type="done", data={"thread_id": thread.id, "result": request_result})
+
+
+async def _get_thread_vector_store_id(thread_id: str) -> str | None:
+    """Returns the thread's vector store id, asking the agent service only when the mapping is not cached."""
+    entry = thread_vector_stores.get_entry(thread_id)
+    if entry:
+        return entry.value
+
+    vector_store_id = None
+    try:
+        client = agent_client_pool.get_client()
+        thread_details = await client.agents.threads.get(thread_id)
+        if (hasattr(thread_details, 'tool_resources') and 
+            thread_details.tool_resources and
+            hasattr(thread_details.tool_resources, 'file_search') and
+            thread_details.tool_resources.file_search and
+            hasattr(thread_details.tool_resources.file_search, 'vector_store_ids')):
+            vector_store_ids = thread_details.tool_resources.file_search.vector_store_ids
+            if vector_store_ids:
+                vector_store_id = vector_store_ids[0]
+                logger.debug("Found vector store %s on thread %s", vector_store_id, thread_id)
+        if vector_store_id:
+            thread_vector_stores.set(thread_id, vector_store_id)
+    except Exception as e:
+        logger.warning("Could not get details of thread %s: %s", thread_id, e)
+    return vector_store_id
+
+
+async def _create_vector_store(file_ids: list[str]) -> str:
+    client = agent_client_pool.get_client()
+    vector_store = await client.agents.vector_stores.create_and_poll(file_ids=file_ids, name=f"rutzsco_paif_vs_{uuid.uuid4()}")
+    logger.info("Created vector store %s", vector_store.id, extra={"vector_store_id": vector_store.id})
+    return vector_store.id
+
+
+async def _add_file_to_vector_store(vector_store_id: str, file_id: str) -> None:
+    client = agent_client_pool.get_client()
+    await client.agents.vector_store_files.create_and_poll(vector_store_id=vector_store_id, file_id=file_id)
+
+
+def _to_source(item: StreamingAnnotationContent) -> Source:
+    return Source(
+        quote=item.quote if hasattr(item, 'quote') else '',
+        title=item.title if hasattr(item, 'title') else '',
+        url=item.url if hasattr(item, 'url') else '',
+        start_index=item.start_index if hasattr(item, 'start_index') else '',
+        end_index=item.end_index if hasattr(item, 'end_index') else ''
+    )
\ No newline at end of file
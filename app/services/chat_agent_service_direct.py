@@ -1,13 +1,11 @@
+import asyncio
+import logging
 import shutil
 import os, time
 from typing import List
 from dotenv import load_dotenv
 from opentelemetry import trace
-from azure.ai.projects import AIProjectClient
 from app.models.api_models import ChatThreadRequest, ExecutionDiagnostics, RequestResult, Source, FileReference
-from app.prompts.file_service import FileService
-
-from azure.storage.blob import BlobServiceClient
 
 from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
@@ -17,205 +15,200 @@ from semantic_kernel.contents import AnnotationContent
 from semantic_kernel.contents.chat_history import ChatHistory
 from semantic_kernel.functions.kernel_arguments import KernelArguments
 from semantic_kernel.contents import ChatMessageContent, FunctionCallContent, StreamingChatMessageContent, StreamingAnnotationContent, StreamingFileReferenceContent, ImageContent, FileReferenceContent
-from azure.identity.aio import DefaultAzureCredential
 from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings, AzureAIAgentThread
-from azure.ai.agents.models import CodeInterpreterTool, FileSearchTool, FilePurpose, FileSearchTool, CodeInterpreterTool
-
-from azure.identity import DefaultAzureCredential
+from azure.ai.agents.models import FileSearchTool, MessageRole
+
+from app.services.agent_client_pool import agent_client_pool
+from app.services.agent_pool import AgentTemplate, agent_pool
+from app.services.agent_runs import process_run
+from app.services.blob_storage import blob_storage
+from app.services.document_ingestion import IngestionResult, document_ingestion_pipeline
+from app.utils.blocking_executor import run_blocking
+from app.utils.telemetry import phase, record_token_usage
 from pathlib import Path
-import json
 import uuid  
 
+logger = logging.getLogger(__name__)
+
 class ChatAgentServiceDirect:
     def __init__(self):
         # Load environment variables from .env file
         load_dotenv()
 
         self.agent_id = os.getenv("AZURE_AI_AGENT_ID")
-        blob_connection_string = os.getenv("AZURE_BLOB_CONNECTION_STRING")
-        self.blob_service_client = None
-        if blob_connection_string:
-            self.blob_service_client = BlobServiceClient.from_connection_string(blob_connection_string)
+        model = os.getenv("AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME")
+        self.direct_agent_template = AgentTemplate(name="agent_run_chat_direct", model=model, instructions="You are helpful agent.", code_interpreter=True)
+        self.docs_agent_template = AgentTemplate(name="agent_run_chat_docs", model=model, instructions="You are helpful agent.")
+        agent_pool.register(self.direct_agent_template)
+        agent_pool.register(self.docs_agent_template)
         pass
 
     
     async def run_chat_direct(self, request: ChatThreadRequest) -> str:
 
-        project_client = AIProjectClient.from_connection_string(credential=DefaultAzureCredential(), conn_str=os.environ["AZURE_AI_AGENT_PROJECT_CONNECTION_STRING"],)
-        print(f"Created project client, project ID: {project_client}")
+        project_client = agent_client_pool.get_client()
         tracer = trace.get_tracer(__name__)
         with tracer.start_as_current_span("Agent: Chat") as current_span:
-            with project_client:
-                try:
-                    user_message = request.message + " Save the result to a file."
-                    print(f"User message: {user_message}")
-                    
-                    code_interpreter = CodeInterpreterTool()
-                    
-                    # create agent with code interpreter tool and tools_resources
-                    agent = project_client.agents.create_agent(
-                        model=os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"],
-                        name="agent_run_chat_direct",
-                        instructions="You are helpful agent.",
-                        tools=code_interpreter.definitions,
-                        tool_resources=code_interpreter.resources,
-                    )
-                    print(f"Created agent, agent ID: {agent.id}")
+            agent = None
+            error = None
+            try:
+                user_message = request.message + " Save the result to a file."
+                logger.debug("User message: %s", user_message)
+                
+                # lease a pre-provisioned agent with the code interpreter tool
+                with phase("chat_direct", "agent_lease"):
+                    agent = await agent_pool.acquire(self.direct_agent_template)
+                logger.debug("Leased agent %s", agent.id)
 
+                with phase("chat_direct", "thread_setup"):
                     # create a thread
-                    thread = project_client.agents.create_thread()
-                    print(f"Created thread, thread ID: {thread.id}")
+                    thread = await project_client.agents.threads.create()
+                    logger.debug("Created thread %s", thread.id)
 
                     # create a message
-                    message = project_client.agents.create_message(
+                    message = await project_client.agents.messages.create(
                         thread_id=thread.id,
                         role="user",
                         content=user_message,
                     )
-                    print(f"Created message, message ID: {message.id}")
-
-                    # create and execute a run
-                    run = project_client.agents.create_and_process_run(thread_id=thread.id, agent_id=agent.id)
-                    print(f"Run finished with status: {run.status}")
+                    logger.debug("Created message %s", message.id)
+
+                # create and execute a run; rate-limited runs are retried
+                with phase("chat_direct", "run"):
+                    run = await process_run(project_client, thread.id, agent.id)
+                    record_token_usage("chat_direct", run.usage)
+                logger.info("Run %s finished with status %s", run.id, run.status, extra={"thread_id": thread.id, "agent_id": agent.id})
+
+                if run.status == "failed":
+                    # Still "Rate limit is exceeded." after the retries means you want to get more quota
+                    logger.warning("Run %s failed: %s", run.id, run.last_error, extra={"thread_id": thread.id})
+                    return f"Run failed: {run.last_error}"
+
+                # get the most recent message from the assistant
+                with phase("chat_direct", "fetch_messages"):
+                    last_msg = await project_client.agents.messages.get_last_message_text_by_role(thread_id=thread.id, role=MessageRole.AGENT)
+                if last_msg:
+                    logger.debug("Last message: %s", last_msg.text.value)
 
-                    if run.status == "failed":
-                        # Check if you got "Rate limit is exceeded.", then you want to get more quota
-                        print(f"Run failed: {run.last_error}")
-                        return f"Run failed: {run.last_error}"
+                # Access the attributes of the annotation directly
+                try:
+                    annotation = last_msg.text.annotations[0]
+                except Exception as e:
+                    logger.warning("No file annotation in the agent's answer: %s", e, extra={"thread_id": thread.id})
+                    return f"annotation error: {e}"
+
+                # If you need to convert the annotation to a dictionary
+                annotation_dict = {
+                    "type": annotation.type,
+                    "text": annotation.text,
+                    "file_path": annotation.file_path.file_id if annotation.file_path else None,
+                }
+                logger.debug("Annotation: %s", annotation_dict)
+
+                root, extension = os.path.splitext(annotation_dict["text"])
+                file_name = str(uuid.uuid4()) + extension  # Convert UUID to string
+                file_id = annotation_dict["file_path"]
+                
+                with phase("chat_direct", "file_download"):
+                    await project_client.agents.files.save(file_id=file_id, file_name=file_name)
+                logger.debug("Saved file %s to %s", file_id, file_name)
 
-                    # print the messages from the agent
-                    messages = project_client.agents.list_messages(thread_id=thread.id)
-                    print(f"Messages: {messages}")
-                    
-                    # get the most recent message from the assistant
-                    last_msg = messages.get_last_text_message_by_role("assistant")
-                    if last_msg:
-                        print(f"Last Message: {last_msg.text.value}")
-    
-                    # Access the attributes of the annotation directly
+                # save the newly created file
+                
+                with phase("chat_direct", "blob_upload"):
+                    file = await run_blocking(open, file_name, "rb")
                     try:
-                        annotation = last_msg.text.annotations[0]
-                        print(annotation)
-                    except Exception as e:
-                        print(f"Error: {e}")
-                        return f"annotation error: {e}"
-
-                    # If you need to convert the annotation to a dictionary
-                    annotation_dict = {
-                        "type": annotation.type,
-                        "text": annotation.text,
-                        "file_path": annotation.file_path.file_id if annotation.file_path else None,
-                    }
-                    print(json.dumps(annotation_dict, indent=2))
-
-                    root, extension = os.path.splitext(annotation_dict["text"])
-                    file_name = str(uuid.uuid4()) + extension  # Convert UUID to string
-                    file_id = annotation_dict["file_path"]
-                    print(f"File name: {file_name}, File ID: {file_id}")
+                        # Upload through the shared blob client and get the full URL of the uploaded file
+                        file_url = await blob_storage.upload_from(file_name, file, length=await run_blocking(os.path.getsize, file_name))
+                    finally:
+                        await run_blocking(file.close)
+                
+                # delete local copies of the file
+                with phase("chat_direct", "cleanup"):
+                    await project_client.agents.files.delete(file_id)
+                    await run_blocking(os.remove, file_name)
                     
-                    project_client.agents.save_file(file_id=file_id, file_name=file_name)
-                    print(f"Saved the file to: {file_name}") 
+                logger.info("Uploaded the generated file to %s", file_url, extra={"thread_id": thread.id, "file_id": file_id})
+               
+                return(f"{last_msg.text.value} \nA copy in [cloud]({file_url})")
+                
+            except Exception as e:
+                error = e
+                logger.exception("Chat direct failed: %s", e)
+                return f"Error: {e}"
 
-                    # save the newly created file
-                    
-                    blob_connection_string = os.getenv("AZURE_BLOB_CONNECTION_STRING")
-                    blob_container_name = os.getenv("AZURE_BLOB_CONTAINER_NAME")
-                    if not blob_connection_string or not blob_container_name:
-                        raise ValueError("Missing required environment variables for Azure Blob Storage.")
-
-                    blob_service_client = BlobServiceClient.from_connection_string(blob_connection_string)
-                    blob_client = blob_service_client.get_blob_client(container=blob_container_name, blob=file_name)
-                    with open(file_name, "rb") as data:
-                        blob_client.upload_blob(data, overwrite=True)
-
-                    # Get the full URL of the uploaded file
-                    file_url = blob_client.url
-                    
-                    # delete local copies of the file
-                    project_client.agents.delete_file(file_id)
-                    os.remove(file_name)
-                    if agent:
-                        project_client.agents.delete_agent(agent.id)
-                        
-                    print("Done. You can now access the file from the following URL:")
-                    print(file_url)   
-                   
-                    return(f"{last_msg.text.value} \nA copy in [cloud]({file_url})")
-                    
-                except Exception as e:
-                    print(f"Error: {e}")
-                    return f"Error: {e}"
-                    
+            finally:
+                # return the agent to the pool, including on failure
+                if agent:
+                    await agent_pool.release(self.direct_agent_template, agent, error)
+                
 
-    async def run_chat_docs(self, query:str, temp_dir: str) -> str:
-        print(f"Query: {query}")    
-        print(f"Temp dir: {temp_dir}")
+    async def run_chat_docs(self, query:str, temp_dir: str) -> RequestResult:
+        logger.debug("Query: %s", query, extra={"temp_dir": temp_dir})
         
-        project_client = AIProjectClient.from_connection_string(credential=DefaultAzureCredential(), conn_str=os.environ["AZURE_AI_AGENT_PROJECT_CONNECTION_STRING"],)
-        print(f"Created project client, project ID: {project_client}")
-            
-        with project_client:
+        project_client = agent_client_pool.get_client()
+        ingestion = IngestionResult()
+        agent = None
+        error = None
+
+        async def lease_agent():
+            with phase("chat_docs", "agent_lease"):
+                return await agent_pool.acquire(self.docs_agent_template)
+
+        async def ingest():
+            with phase("chat_docs", "ingest"):
+                return await document_ingestion_pipeline.ingest(temp_dir, ingestion)
+
+        tracer = trace.get_tracer(__name__)
+        with tracer.start_as_current_span("Agent: Chat Docs"):
             try:
                 user_message = query
-                print(f"User message: {user_message}")
-                
-                # create agent with code interpreter tool and tools_resources
-                agent = project_client.agents.create_agent(
-                    model=os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"],
-                    name="agent_run_chat_docs",
-                    instructions="You are helpful agent.",
-                )
-                print(f"Created agent, agent ID: {agent.id}")
-
-                # read in files from the temp directory
-                file_ids=[]
-                for file in os.listdir(temp_dir):
-                    file_path = os.path.join(temp_dir, file)
-                    print(f"File path: {file_path}")
-                    # upload the file
-                    file = project_client.agents.upload_file_and_poll(file_path=file_path, purpose=FilePurpose.AGENTS)
-                    file_ids.append(file.id)
-                    print(f"Uploaded file, file ID: {file.id}")
-
-                # create a vector store with the file you uploaded
-                vector_store = project_client.agents.create_vector_store_and_poll(file_ids=[file.id], name="my_vectorstore")
-                print(f"Created vector store, vector store ID: {vector_store.id}")
                 
-                # create a file search tool
-                file_search_tool = FileSearchTool(vector_store_ids=[vector_store.id])
+                # create the agent while the documents are uploaded and indexed
+                created_agent, ingested = await asyncio.gather(lease_agent(), ingest(), return_exceptions=True)
+                # keep a leased agent for release even when ingestion failed
+                agent = None if isinstance(created_agent, BaseException) else created_agent
+                for outcome in (created_agent, ingested):
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                logger.info("Leased agent %s; vector store %s holds %d files", agent.id, ingestion.vector_store_id, len(ingestion.file_ids), extra={"agent_id": agent.id, "vector_store_id": ingestion.vector_store_id})
                 
-                thread = project_client.agents.create_thread(
-                    tool_resources=file_search_tool.resources
-                )
-                print(f"Created thread, thread ID: {thread.id}")
-
-                message = project_client.agents.create_message(
-                    thread_id=thread.id, role="user", content=user_message
-                )
-                print(f"Created message, message ID: {message.id}")
+                with phase("chat_docs", "thread_setup"):
+                    # create a file search tool
+                    file_search_tool = FileSearchTool(vector_store_ids=[ingestion.vector_store_id])
+                    
+                    thread = await project_client.agents.threads.create(
+                        tool_resources=file_search_tool.resources
+                    )
+                    logger.debug("Created thread %s", thread.id)
 
-                run = project_client.agents.create_and_process_run(thread_id=thread.id, agent_id=agent.id)
+                    message = await project_client.agents.messages.create(
+                        thread_id=thread.id, role="user", content=user_message
+                    )
+                    logger.debug("Created message %s", message.id)
 
-                messages = project_client.agents.list_messages(thread_id=thread.id)
-                print(f"Messages: {messages}")
-                
-                for file_id in file_ids:
-                    if file_id:
-                        project_client.agents.delete_file(file_id)
-                if vector_store:
-                    project_client.agents.delete_vector_store(vector_store.id)
-                if agent:
-                    project_client.agents.delete_agent(agent.id)
-                if os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
+                with phase("chat_docs", "run"):
+                    run = await process_run(project_client, thread.id, agent.id)
+                    record_token_usage("chat_docs", run.usage)
                     
-                last_msg = messages.get_last_text_message_by_role("assistant")
+                with phase("chat_docs", "fetch_messages"):
+                    last_msg = await project_client.agents.messages.get_last_message_text_by_role(thread_id=thread.id, role=MessageRole.AGENT)
                 if last_msg:
-                    print(f"Last Message: {last_msg.text.value}")
-                    return(f"{last_msg.text.value}")
+                    logger.debug("Last message: %s", last_msg.text.value)
+                    content = last_msg.text.value
                 else:
-                    return(f"No response from the assistant")
+                    content = "No response from the assistant"
+                return RequestResult(content=content, execution_diagnostics=ExecutionDiagnostics(steps=ingestion.steps), thread_id=thread.id)
             
             except Exception as e:
-                        print(f"Error: {e}")
-                        return f"Error: {e}"
\ No newline at end of file
+                error = e
+                logger.exception("Chat docs failed: %s", e)
+                return RequestResult(content=f"Error: {e}", execution_diagnostics=ExecutionDiagnostics(steps=ingestion.steps))
+
+            finally:
+                with phase("chat_docs", "cleanup"):
+                    await document_ingestion_pipeline.cleanup(ingestion)
+                    if agent:
+                        await agent_pool.release(self.docs_agent_template, agent, error)
+                    if os.path.exists(temp_dir):
+                        await run_blocking(shutil.rmtree, temp_dir)
@@ -0,0 +1,134 @@
+import asyncio
+import datetime
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from azure.ai.agents.models import FileInfo, FilePurpose
+from opentelemetry import trace
+
+from app.config.settings import settings
+from app.models.api_models import ExecutionStep
+from app.services.agent_client_pool import agent_client_pool
+from app.services.document_registry import document_registry, sha256_file
+from app.utils.blocking_executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionResult:
+    """The vector store acquired for one request, the agent file ids it holds and per-file timings."""
+    vector_store_id: Optional[str] = None
+    file_ids: list[str] = field(default_factory=list)
+    steps: list[ExecutionStep] = field(default_factory=list)
+
+
+class DocumentIngestionPipeline:
+    """
+    DocumentIngestionPipeline uploads every file in a directory to the agent service concurrently, bounded by
+    DOCUMENT_UPLOAD_CONCURRENCY, and indexes all uploaded ids into one vector store with a single file batch,
+    so a request takes roughly as long as its slowest file rather than the sum of all files.
+    Files and vector stores go through the document registry: unchanged documents are not uploaded again,
+    and a repeated set of documents reuses its ready vector store.
+    """
+    def __init__(self, concurrency: int, poll_interval_seconds: float):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval_seconds = poll_interval_seconds
+
+    async def ingest(self, directory: str, result: IngestionResult) -> IngestionResult:
+        """
+        Fills `result` as work completes, so the caller can release what was acquired if a later step fails.
+        Files that fail to upload are reported in the steps and left out of the vector store.
+        """
+        tracer = trace.get_tracer(__name__)
+        with tracer.start_as_current_span("Documents: Ingest") as current_span:
+            file_paths = [os.path.join(directory, name) for name in sorted(await run_blocking(os.listdir, directory))]
+            current_span.set_attribute("documents.count", len(file_paths))
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            uploads = await asyncio.gather(*(self._upload(semaphore, path, result) for path in file_paths))
+            uploaded = [(path, file_id) for path, file_id in zip(file_paths, uploads) if file_id]
+            if not uploaded:
+                raise RuntimeError("None of the documents could be uploaded.")
+
+            statuses: dict[str, str] = {}
+            start_time = datetime.datetime.now().isoformat()
+            vector_store_id, reused = await document_registry.acquire_vector_store(
+                [file_id for _, file_id in uploaded],
+                lambda file_ids: self._create_vector_store(file_ids, statuses),
+            )
+            end_time = datetime.datetime.now().isoformat()
+            result.vector_store_id = vector_store_id
+
+            for path, file_id in uploaded:
+                status = "reused" if reused else statuses.get(file_id, "completed")
+                result.steps.append(ExecutionStep(
+                    name=f"index: {os.path.basename(path)}",
+                    content=f"file_id={file_id} vector_store_id={vector_store_id} status={status}",
+                    start_time=start_time,
+                    end_time=end_time,
+                ))
+
+            current_span.set_attribute("documents.uploaded", len(uploaded))
+            current_span.set_attribute("documents.vector_store_reused", reused)
+            return result
+
+    async def cleanup(self, result: IngestionResult) -> None:
+        """Releases the vector store; the registry deletes it and its files once they have been idle for its TTL."""
+        if result.vector_store_id:
+            document_registry.release(result.vector_store_id)
+
+    async def _create_vector_store(self, file_ids: list[str], statuses: dict[str, str]) -> str:
+        client = agent_client_pool.get_client()
+        vector_store = await client.agents.vector_stores.create_and_poll(name=f"chat_docs_vs_{uuid.uuid4()}", polling_interval=self.poll_interval_seconds)
+        try:
+            batch = await client.agents.vector_store_file_batches.create_and_poll(
+                vector_store_id=vector_store.id,
+                file_ids=file_ids,
+                polling_interval=self.poll_interval_seconds,
+            )
+            # Files in a batch are indexed together, so each file shares the batch timing alongside its own status
+            async for vector_store_file in client.agents.vector_store_file_batches.list_files(vector_store_id=vector_store.id, batch_id=batch.id):
+                statuses[vector_store_file.id] = str(vector_store_file.status)
+        except Exception:
+            await client.agents.vector_stores.delete(vector_store.id)
+            raise
+        return vector_store.id
+
+    async def _upload_file(self, file_path: str) -> FileInfo:
+        # Pass an open file rather than file_path, which the SDK reads fully into memory; the transport streams it in chunks
+        client = agent_client_pool.get_client()
+        file = await run_blocking(open, file_path, "rb")
+        try:
+            return await client.agents.files.upload_and_poll(
+                file=(os.path.basename(file_path), file, "application/octet-stream"),
+                purpose=FilePurpose.AGENTS,
+                polling_interval=self.poll_interval_seconds,
+            )
+        finally:
+            await run_blocking(file.close)
+
+    async def _upload(self, semaphore: asyncio.Semaphore, file_path: str, result: IngestionResult) -> Optional[str]:
+        async with semaphore:
+            start_time = datetime.datetime.now().isoformat()
+            try:
+                content_key = await run_blocking(sha256_file, file_path)
+                file, reused = await document_registry.get_or_upload_file(content_key, lambda: self._upload_file(file_path))
+                result.file_ids.append(file.id)
+                content = f"file_id={file.id} reused={reused}"
+            except Exception as e:
+                logger.warning("Upload of '%s' failed: %s", file_path, e)
+                file = None
+                content = f"error: {e}"
+            end_time = datetime.datetime.now().isoformat()
+            result.steps.append(ExecutionStep(name=f"upload: {os.path.basename(file_path)}", content=content, start_time=start_time, end_time=end_time))
+            return file.id if file else None
+
+
+document_ingestion_pipeline = DocumentIngestionPipeline(
+    concurrency=settings.DOCUMENT_UPLOAD_CONCURRENCY,
+    poll_interval_seconds=settings.DOCUMENT_INDEX_POLL_INTERVAL_SECONDS,
+)
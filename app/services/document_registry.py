@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from azure.ai.agents.models import FileInfo
+from opentelemetry import metrics
+
+from app.config.settings import settings
+from app.services.agent_client_pool import agent_client_pool
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+
+registry_hits = meter.create_counter("app.document_registry.hits", description="Documents or vector stores reused from the registry")
+registry_misses = meter.create_counter("app.document_registry.misses", description="Documents uploaded or vector stores created because the registry had none")
+registry_deletions = meter.create_counter("app.document_registry.deletions", description="Registry files and vector stores deleted after expiring")
+
+
+def sha256_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hashes a file in chunks; run it through run_blocking from async code."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+@dataclass
+class RegisteredFile:
+    file: FileInfo
+    last_used: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class RegisteredVectorStore:
+    id: str
+    file_ids: tuple[str, ...]
+    refcount: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    # Adopted stores were created outside the registry and may hold files it does not know, so they are found by id only
+    adopted: bool = False
+
+
+@dataclass
+class ThreadBinding:
+    vector_store_id: str
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class DocumentRegistry:
+    """
+    DocumentRegistry maps document content to the agent file it was uploaded as, and a set of agent files to a
+    ready vector store, so a repeat request skips straight to the run.
+    - Files are keyed by a content key: the SHA-256 of the bytes, or a blob's ETag when the bytes come from storage.
+    - Vector stores are keyed by their sorted file ids and reference counted: one reference per request using the
+      store, and one per chat thread bound to it until the thread has been idle for DOCUMENT_REGISTRY_THREAD_TTL_SECONDS.
+    Once unreferenced and idle for DOCUMENT_REGISTRY_TTL_SECONDS, vector stores are deleted from the agent service,
+    followed by files no live vector store uses. Concurrent misses for the same key collapse into one upload or create.
+    """
+    def __init__(self, ttl_seconds: float, reap_interval_seconds: float, thread_ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.reap_interval_seconds = reap_interval_seconds
+        self.thread_ttl_seconds = thread_ttl_seconds
+        self._files: dict[str, RegisteredFile] = {}
+        self._vector_stores: dict[tuple[str, ...], RegisteredVectorStore] = {}
+        self._vector_stores_by_id: dict[str, RegisteredVectorStore] = {}
+        self._threads: dict[str, ThreadBinding] = {}
+        self._thread_released_callbacks: list[Callable[[str], None]] = []
+        self._pending: dict[object, asyncio.Task] = {}
+        self._last_reaped = time.monotonic()
+        self._reap_task: Optional[asyncio.Task] = None
+
+    async def get_or_upload_file(self, content_key: str, upload: Callable[[], Awaitable[FileInfo]]) -> tuple[FileInfo, bool]:
+        """Returns (file, reused) for `content_key`, calling `upload` only when no live upload of the content exists."""
+        self._maybe_reap()
+        registered = self._files.get(content_key)
+        if registered:
+            registered.last_used = time.monotonic()
+            registry_hits.add(1, {"kind": "file"})
+            return registered.file, True
+
+        registry_misses.add(1, {"kind": "file"})
+        file = await self._collapse(("file", content_key), upload)
+        self._files.setdefault(content_key, RegisteredFile(file=file))
+        return file, False
+
+    async def acquire_vector_store(self, file_ids: list[str], create: Callable[[list[str]], Awaitable[str]]) -> tuple[str, bool]:
+        """
+        Returns (vector_store_id, reused) for exactly these files, creating it with `create(file_ids)` on a miss.
+        The store is held until `release` is called with its id.
+        """
+        self._maybe_reap()
+        key = tuple(sorted(set(file_ids)))
+        registered = self._vector_stores.get(key)
+        reused = registered is not None
+        if registered:
+            registry_hits.add(1, {"kind": "vector_store"})
+        else:
+            registry_misses.add(1, {"kind": "vector_store"})
+            vector_store_id = await self._collapse(("vector_store", key), lambda: create(list(key)))
+            registered = self._vector_stores_by_id.get(vector_store_id)
+            if registered is None:
+                registered = RegisteredVectorStore(id=vector_store_id, file_ids=key)
+                self._vector_stores[key] = registered
+                self._vector_stores_by_id[vector_store_id] = registered
+        registered.refcount += 1
+        registered.last_used = time.monotonic()
+        return registered.id, reused
+
+    def release(self, vector_store_id: str) -> None:
+        registered = self._vector_stores_by_id.get(vector_store_id)
+        if registered:
+            registered.refcount = max(0, registered.refcount - 1)
+            registered.last_used = time.monotonic()
+
+    def bind_thread(self, thread_id: str, vector_store_id: str) -> None:
+        """Pins a registry vector store for as long as the thread uses it, replacing the thread's previous store."""
+        binding = self._threads.get(thread_id)
+        if binding and binding.vector_store_id == vector_store_id:
+            binding.last_used = time.monotonic()
+            return
+        if binding:
+            self._unbind_thread(thread_id, notify=False)
+        registered = self._vector_stores_by_id.get(vector_store_id)
+        if registered:
+            registered.refcount += 1
+            self._threads[thread_id] = ThreadBinding(vector_store_id=vector_store_id)
+
+    def touch_thread(self, thread_id: str) -> None:
+        binding = self._threads.get(thread_id)
+        if binding:
+            binding.last_used = time.monotonic()
+
+    def on_thread_released(self, callback: Callable[[str], None]) -> None:
+        """Registers `callback(thread_id)`, called when an idle thread's vector store is unpinned."""
+        self._thread_released_callbacks.append(callback)
+
+    def is_shared(self, vector_store_id: str, thread_id: str) -> bool:
+        """
+        Whether a registry vector store may be in use by anything but this thread, in which case files must not be
+        added to it. Stores the registry did not create belong to their thread alone.
+        """
+        registered = self._vector_stores_by_id.get(vector_store_id)
+        if registered is None or registered.adopted:
+            return False
+        binding = self._threads.get(thread_id)
+        return registered.refcount != 1 or binding is None or binding.vector_store_id != vector_store_id
+
+    def vector_store_file_ids(self, vector_store_id: str) -> list[str]:
+        registered = self._vector_stores_by_id.get(vector_store_id)
+        return list(registered.file_ids) if registered else []
+
+    async def add_file(self, thread_id: str, vector_store_id: str, file_id: str, add: Callable[[str, str], Awaitable]) -> None:
+        """
+        Indexes one more file into the thread's vector store with `add(vector_store_id, file_id)`, re-keying a registry
+        store by its new set of files. The store is unreachable by its old key meanwhile, so no request acquires it for
+        the old set; if `add` fails it stays reachable by id only. A store the registry did not create is adopted and
+        bound to the thread first, so the reaper keeps the file while the thread uses it.
+        """
+        registered = self._vector_stores_by_id.get(vector_store_id)
+        if registered is None:
+            registered = RegisteredVectorStore(id=vector_store_id, file_ids=(), adopted=True)
+            self._vector_stores_by_id[vector_store_id] = registered
+        if registered.adopted:
+            self.bind_thread(thread_id, vector_store_id)
+        elif self._vector_stores.get(registered.file_ids) is registered:
+            del self._vector_stores[registered.file_ids]
+        registered.file_ids = tuple(sorted(set(registered.file_ids) | {file_id}))
+        registered.last_used = time.monotonic()
+        await add(vector_store_id, file_id)
+        if not registered.adopted:
+            self._vector_stores.setdefault(registered.file_ids, registered)
+
+    async def reap(self) -> None:
+        """
+        Unpins the vector stores of idle threads, deletes idle unreferenced vector stores, then idle files no
+        remaining vector store uses.
+        """
+        self._last_reaped = time.monotonic()
+        cutoff = self._last_reaped - self.ttl_seconds
+        thread_cutoff = self._last_reaped - self.thread_ttl_seconds
+        client = agent_client_pool.get_client()
+
+        for thread_id in [thread_id for thread_id, binding in self._threads.items() if binding.last_used <= thread_cutoff]:
+            self._unbind_thread(thread_id)
+
+        expired_stores = [store for store in self._vector_stores_by_id.values() if store.refcount == 0 and store.last_used <= cutoff]
+        for store in expired_stores:
+            del self._vector_stores_by_id[store.id]
+            if self._vector_stores.get(store.file_ids) is store:
+                del self._vector_stores[store.file_ids]
+
+        in_use = {file_id for store in self._vector_stores_by_id.values() for file_id in store.file_ids}
+        expired_files = [key for key, registered in self._files.items() if registered.file.id not in in_use and registered.last_used <= cutoff]
+        expired_file_ids = [self._files.pop(key).file.id for key in expired_files]
+
+        operations = [client.agents.vector_stores.delete(store.id) for store in expired_stores]
+        operations += [client.agents.files.delete(file_id) for file_id in expired_file_ids]
+        for outcome in await asyncio.gather(*operations, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                logger.warning("Document registry cleanup failed: %s", outcome)
+        if expired_stores:
+            registry_deletions.add(len(expired_stores), {"kind": "vector_store"})
+        if expired_file_ids:
+            registry_deletions.add(len(expired_file_ids), {"kind": "file"})
+
+    async def close(self) -> None:
+        """
+        Stops the reaper. Vector stores and files are left in the agent service on shutdown, since chat threads
+        keep using them; only those already expired are deleted.
+        """
+        if self._reap_task:
+            self._reap_task.cancel()
+        if self._files or self._vector_stores_by_id:
+            await self.reap()
+
+    def _unbind_thread(self, thread_id: str, notify: bool = True) -> None:
+        binding = self._threads.pop(thread_id)
+        self.release(binding.vector_store_id)
+        if notify:
+            for callback in self._thread_released_callbacks:
+                callback(thread_id)
+
+    async def _collapse(self, key: object, operation: Callable[[], Awaitable]):
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(operation())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _maybe_reap(self) -> None:
+        if time.monotonic() - self._last_reaped < self.reap_interval_seconds:
+            return
+        if self._reap_task is None or self._reap_task.done():
+            self._last_reaped = time.monotonic()
+            self._reap_task = asyncio.create_task(self.reap())
+
+
+document_registry = DocumentRegistry(
+    ttl_seconds=settings.DOCUMENT_REGISTRY_TTL_SECONDS,
+    reap_interval_seconds=settings.DOCUMENT_REGISTRY_REAP_INTERVAL_SECONDS,
+    thread_ttl_seconds=settings.DOCUMENT_REGISTRY_THREAD_TTL_SECONDS,
+)
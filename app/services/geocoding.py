@@ -0,0 +1,110 @@
+import csv
+import logging
+import re
+from pathlib import Path
+from typing import Optional
+
+from app.config.settings import settings
+from app.utils.blocking_executor import run_blocking
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_PATH = Path(__file__).resolve().parent.parent / "data" / "us_gazetteer.csv"
+
+US_STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca", "colorado": "co",
+    "connecticut": "ct", "delaware": "de", "district of columbia": "dc", "florida": "fl", "georgia": "ga",
+    "hawaii": "hi", "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia", "kansas": "ks",
+    "kentucky": "ky", "louisiana": "la", "maine": "me", "maryland": "md", "massachusetts": "ma",
+    "michigan": "mi", "minnesota": "mn", "mississippi": "ms", "missouri": "mo", "montana": "mt",
+    "nebraska": "ne", "nevada": "nv", "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm",
+    "new york": "ny", "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok",
+    "oregon": "or", "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc", "south dakota": "sd",
+    "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va", "washington": "wa",
+    "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+COUNTRY_SUFFIXES = ["united states of america", "united states", "usa", "us"]
+TOKEN_ALIASES = {"saint": "st", "ft": "fort"}
+ZIP_PATTERN = re.compile(r"^(?:zip(?: code)?\s*)?(\d{5})(?:\s*\d{4})?$")
+
+
+def normalize_location(location: str) -> str:
+    """
+    Normalizes free-form location text to a lookup key: "Seattle, Washington, USA" -> "seattle wa",
+    "St. Louis MO" -> "st louis mo", "98101-1234" -> "98101".
+    """
+    text = re.sub(r"[^\w\s]", " ", location.lower())
+    text = " ".join(text.split())
+    for suffix in COUNTRY_SUFFIXES:
+        if text.endswith(" " + suffix):
+            text = text[: -len(suffix) - 1]
+            break
+
+    zip_match = ZIP_PATTERN.match(text)
+    if zip_match:
+        return zip_match.group(1)
+
+    for state_name in sorted(US_STATES, key=len, reverse=True):
+        if text.endswith(" " + state_name):
+            text = f"{text[: -len(state_name) - 1]} {US_STATES[state_name]}"
+            break
+
+    return " ".join(TOKEN_ALIASES.get(token, token) for token in text.split())
+
+
+class Geocoder:
+    """
+    Geocoder resolves location text to (latitude, longitude) without a model call where it can:
+    first from an LRU cache of earlier answers, then from a bundled offline gazetteer of US places (matched only
+    with their state) and ZIP code centroids. Callers fall back to the LLM on a miss and write the answer back with `remember`.
+    """
+    def __init__(self, gazetteer_path: Path, cache_max_size: int):
+        self.gazetteer_path = gazetteer_path
+        self.cache = TTLCache("geocoding", max_size=cache_max_size)
+        self._gazetteer: Optional[dict[str, tuple[float, float]]] = None
+
+    @property
+    def gazetteer(self) -> dict[str, tuple[float, float]]:
+        if self._gazetteer is None:
+            self._gazetteer = self._load_gazetteer()
+        return self._gazetteer
+
+    async def open(self) -> None:
+        """Loads the gazetteer on the blocking pool so the first lookup does not parse it on the event loop."""
+        if self._gazetteer is None:
+            self._gazetteer = await run_blocking(self._load_gazetteer)
+
+    def lookup(self, location: str) -> Optional[tuple[tuple[float, float], str]]:
+        """Returns ((latitude, longitude), source) where source is "cache" or "gazetteer", or None on a miss."""
+        key = normalize_location(location)
+        point = self.cache.get(key)
+        if point is not None:
+            return point, "cache"
+        point = self.gazetteer.get(key)
+        if point is not None:
+            self.cache.set(key, point)
+            return point, "gazetteer"
+        return None
+
+    def remember(self, location: str, latitude: float, longitude: float) -> None:
+        self.cache.set(normalize_location(location), (float(latitude), float(longitude)))
+
+    def _load_gazetteer(self) -> dict[str, tuple[float, float]]:
+        # Only "city st" and ZIP keys are indexed: a bare city name ("Springfield") is ambiguous however few rows
+        # the gazetteer has, so it goes to the LLM, which can use the rest of the conversation
+        gazetteer: dict[str, tuple[float, float]] = {}
+        try:
+            with open(self.gazetteer_path, newline="", encoding="utf-8") as file:
+                for row in csv.DictReader(file):
+                    gazetteer[normalize_location(row["place"])] = (float(row["latitude"]), float(row["longitude"]))
+        except FileNotFoundError:
+            logger.warning("Gazetteer file not found at '%s'; geocoding will use the cache and LLM only.", self.gazetteer_path)
+            return {}
+        return gazetteer
+
+
+geocoder = Geocoder(
+    gazetteer_path=Path(settings.GEOCODER_GAZETTEER_PATH) if settings.GEOCODER_GAZETTEER_PATH else DEFAULT_GAZETTEER_PATH,
+    cache_max_size=settings.GEOCODER_CACHE_MAX_SIZE,
+)
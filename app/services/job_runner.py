@@ -0,0 +1,258 @@
+import asyncio
+import datetime
+import ipaddress
+import logging
+import socket
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+from fastapi.encoders import jsonable_encoder
+from opentelemetry import metrics, trace
+
+from app.config.settings import settings
+from app.models.api_models import JobInfo, StreamEvent
+from app.services.job_store import TERMINAL_STATUSES, job_store
+from app.utils.blocking_executor import run_blocking
+from app.utils.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+
+jobs_queued = meter.create_up_down_counter("app.jobs.queued", description="Jobs waiting for a worker")
+jobs_running = meter.create_up_down_counter("app.jobs.running", description="Jobs being run by a worker")
+job_queue_wait = meter.create_histogram("app.jobs.queue_wait", unit="s", description="Time jobs waited for a worker")
+job_duration = meter.create_histogram("app.jobs.duration", unit="s", description="Time workers spent running jobs")
+webhook_failures = meter.create_counter("app.jobs.webhook_failures", description="Job callbacks that could not be delivered")
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while JOB_QUEUE_MAX_SIZE jobs are already waiting."""
+
+
+async def validate_callback_url(callback_url: Optional[str]) -> None:
+    """
+    Only http(s) callbacks are accepted, restricted to JOB_WEBHOOK_ALLOWED_HOSTS when that is set. The host must
+    resolve, and only to public addresses unless JOB_WEBHOOK_ALLOW_PRIVATE_ADDRESSES is set, so a callback cannot
+    reach loopback, the internal network or cloud metadata endpoints.
+    """
+    if not callback_url:
+        return
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an absolute http(s) URL.")
+    if settings.JOB_WEBHOOK_ALLOWED_HOSTS and parsed.hostname not in settings.JOB_WEBHOOK_ALLOWED_HOSTS:
+        raise ValueError(f"callback_url host '{parsed.hostname}' is not allowed.")
+    try:
+        addresses = await run_blocking(socket.getaddrinfo, parsed.hostname, None, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"callback_url host '{parsed.hostname}' could not be resolved.")
+    if settings.JOB_WEBHOOK_ALLOW_PRIVATE_ADDRESSES:
+        return
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host '{parsed.hostname}' resolves to a non-public address.")
+
+
+class JobRunner:
+    """
+    JobRunner runs long agent operations in the background so the submitting request can return immediately.
+    Jobs wait in a queue bounded by JOB_QUEUE_MAX_SIZE and are run by JOB_WORKERS workers; their state lives in
+    the job store, status changes are pushed to event subscribers, and an optional callback URL receives
+    the finished job as a JSON POST. While the job store is shared with other worker processes, the runner sends
+    heartbeats for its own unfinished jobs, fails jobs whose heartbeat has stopped, and event streams for jobs of
+    other processes follow the store.
+    """
+    def __init__(self, workers: int, queue_size: int, heartbeat_interval_seconds: float, stale_after_seconds: float, events_poll_interval_seconds: float):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.heartbeat_interval_seconds = heartbeat_interval_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.events_poll_interval_seconds = events_poll_interval_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._local_jobs: set[str] = set()
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._callback_tasks: set[asyncio.Task] = set()
+
+    async def submit(self, operation: str, run: Callable[[], Awaitable[Any]], callback_url: Optional[str] = None, api_key_name: Optional[str] = None) -> JobInfo:
+        """
+        Queues `run` as a job owned by the API key named `api_key_name`; raises JobQueueFullError instead of waiting
+        when the queue is full.
+        """
+        await validate_callback_url(callback_url)
+        self.start()
+        job = JobInfo(
+            id=str(uuid.uuid4()),
+            operation=operation,
+            status="queued",
+            created_at=datetime.datetime.now().isoformat(),
+            callback_url=callback_url,
+            api_key_name=api_key_name,
+        )
+        queue_full = f"The job queue is full ({self.queue_size} jobs waiting); retry later."
+        if self._queue.full():
+            raise JobQueueFullError(queue_full)
+        # Stored before a worker can see it, so the "queued" write never lands after the job has moved on
+        await job_store.put(job)
+        try:
+            self._queue.put_nowait((job, run, time.perf_counter()))
+        except asyncio.QueueFull:
+            await job_store.delete(job.id)
+            raise JobQueueFullError(queue_full)
+        jobs_queued.add(1, {"operation": operation})
+        self._local_jobs.add(job.id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        return await job_store.get(job_id)
+
+    async def events(self, job_id: str) -> AsyncIterator[StreamEvent]:
+        """Yields the job's current status, then each status change until the job has finished."""
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(updates)
+        try:
+            job = await job_store.get(job_id)
+            if job is None:
+                yield StreamEvent(type="error", data={"message": f"Job '{job_id}' not found."})
+                return
+            status = None
+            while True:
+                if job.status != status:
+                    yield StreamEvent(type=job.status, data={"job": job})
+                    status = job.status
+                if job.status in TERMINAL_STATUSES:
+                    return
+                # Jobs run by this process push their updates; those of other worker processes only change in the store
+                timeout = None if job_id in self._local_jobs else self.events_poll_interval_seconds
+                try:
+                    job = await asyncio.wait_for(updates.get(), timeout)
+                except asyncio.TimeoutError:
+                    job = await job_store.get(job_id)
+                    if job is None:
+                        yield StreamEvent(type="error", data={"message": f"Job '{job_id}' expired."})
+                        return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(updates)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if not self._worker_tasks:
+            self._worker_tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self._heartbeat_task is None and self.heartbeat_interval_seconds > 0:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        # Jobs still waiting cannot be resumed after shutdown
+        while self._queue is not None and not self._queue.empty():
+            job, _, _ = self._queue.get_nowait()
+            jobs_queued.add(-1, {"operation": job.operation})
+            try:
+                await self._finish(job, error="The server shut down before the job started.")
+            except Exception as e:
+                logger.warning("Job %s (%s) could not be recorded: %s", job.id, job.operation, e, extra={"job_id": job.id})
+
+    async def _work(self) -> None:
+        while True:
+            job, run, queued_at = await self._queue.get()
+            jobs_queued.add(-1, {"operation": job.operation})
+            job_queue_wait.record(time.perf_counter() - queued_at, {"operation": job.operation})
+            try:
+                await self._run(job, run)
+            except Exception as e:
+                # The job store failed; the worker moves on, and the job stops sending heartbeats so it goes stale
+                self._local_jobs.discard(job.id)
+                logger.warning("Job %s (%s) could not be recorded: %s", job.id, job.operation, e, extra={"job_id": job.id})
+
+    async def _run(self, job: JobInfo, run: Callable[[], Awaitable[Any]]) -> None:
+        job.status = "running"
+        job.started_at = datetime.datetime.now().isoformat()
+        await self._update(job)
+        jobs_running.add(1, {"operation": job.operation})
+        started_at = time.perf_counter()
+        with trace.get_tracer(__name__).start_as_current_span("Job: Run") as current_span:
+            current_span.set_attribute("job.id", job.id)
+            current_span.set_attribute("job.operation", job.operation)
+            try:
+                result = await run()
+            except asyncio.CancelledError:
+                # Not allowed to raise anything else, or the worker would outlive stop()
+                try:
+                    await self._finish(job, error="The server shut down before the job finished.")
+                except Exception as e:
+                    logger.warning("Job %s (%s) could not be recorded: %s", job.id, job.operation, e, extra={"job_id": job.id})
+                raise
+            except Exception as e:
+                logger.warning("Job %s (%s) failed: %s", job.id, job.operation, e)
+                await self._finish(job, error=str(e))
+            else:
+                await self._finish(job, result=result)
+            finally:
+                jobs_running.add(-1, {"operation": job.operation})
+                job_duration.record(time.perf_counter() - started_at, {"operation": job.operation})
+
+    async def _heartbeat_loop(self) -> None:
+        # The first pass runs at startup, failing the jobs of a process that stopped before this one started
+        while True:
+            try:
+                await job_store.heartbeat(list(self._local_jobs))
+                for job in await job_store.claim_stale(time.time() - self.stale_after_seconds):
+                    logger.warning("Job %s (%s) stopped sending heartbeats; marking it failed", job.id, job.operation, extra={"job_id": job.id})
+                    await self._finish(job, error="The worker running the job stopped before it finished.")
+            except Exception as e:
+                logger.warning("Job heartbeat failed: %s", e)
+            await asyncio.sleep(self.heartbeat_interval_seconds)
+
+    async def _finish(self, job: JobInfo, result: Any = None, error: Optional[str] = None) -> None:
+        job.status = "failed" if error else "completed"
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.datetime.now().isoformat()
+        self._local_jobs.discard(job.id)
+        await self._update(job)
+        await job_store.purge_expired()
+        if job.callback_url:
+            task = asyncio.create_task(self._deliver_callback(job))
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+
+    async def _update(self, job: JobInfo) -> None:
+        await job_store.put(job)
+        for updates in self._subscribers.get(job.id, ()):
+            updates.put_nowait(job)
+
+    async def _deliver_callback(self, job: JobInfo) -> None:
+        try:
+            # Checked again because the host may resolve elsewhere by now; redirects are not followed for the same reason
+            await validate_callback_url(job.callback_url)
+            await http_client.post_json(job.callback_url, jsonable_encoder(job), allow_redirects=False)
+        except Exception as e:
+            webhook_failures.add(1, {"operation": job.operation})
+            logger.warning("Callback for job %s to '%s' failed: %s", job.id, job.callback_url, e)
+
+
+job_runner = JobRunner(
+    workers=settings.JOB_WORKERS,
+    queue_size=settings.JOB_QUEUE_MAX_SIZE,
+    heartbeat_interval_seconds=settings.JOB_HEARTBEAT_INTERVAL_SECONDS,
+    stale_after_seconds=settings.JOB_STALE_AFTER_SECONDS,
+    events_poll_interval_seconds=settings.JOB_EVENTS_POLL_INTERVAL_SECONDS,
+)
@@ -0,0 +1,140 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config.settings import settings
+from app.models.api_models import JobInfo
+from app.utils.blocking_executor import run_blocking
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class InMemoryJobStore:
+    """
+    Keeps up to `max_jobs` jobs in memory. Finished jobs are dropped `result_ttl_seconds` after they finish,
+    and the oldest finished jobs make room when the store is full; jobs still queued or running are never evicted.
+    """
+    def __init__(self, max_jobs: int, result_ttl_seconds: float):
+        self.max_jobs = max_jobs
+        self.result_ttl_seconds = result_ttl_seconds
+        self._jobs: OrderedDict[str, tuple[JobInfo, Optional[float]]] = OrderedDict()
+
+    async def put(self, job: JobInfo) -> None:
+        expires_at = time.time() + self.result_ttl_seconds if job.status in TERMINAL_STATUSES else None
+        self._jobs[job.id] = (job, expires_at)
+        if len(self._jobs) > self.max_jobs:
+            self._purge(evict_finished=True)
+
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return None
+        job, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._jobs[job_id]
+            return None
+        return job
+
+    async def delete(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+
+    async def purge_expired(self) -> None:
+        self._purge(evict_finished=False)
+
+    async def heartbeat(self, job_ids: list[str]) -> None:
+        """Jobs in memory die with the process that runs them, so they never go stale."""
+
+    async def claim_stale(self, cutoff: float) -> list[JobInfo]:
+        return []
+
+    def _purge(self, evict_finished: bool) -> None:
+        now = time.time()
+        for job_id, (job, expires_at) in list(self._jobs.items()):
+            if expires_at is not None and expires_at <= now:
+                del self._jobs[job_id]
+        if evict_finished:
+            for job_id, (job, expires_at) in list(self._jobs.items()):
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                if expires_at is not None:
+                    del self._jobs[job_id]
+
+
+class SqliteJobStore:
+    """
+    Persists jobs to a SQLite database so they survive restarts and can be read by every worker process on the
+    host. Unfinished jobs carry the time of their last heartbeat from the process running them, so the jobs of a
+    process that stopped can be found and failed by another. Finished jobs expire `result_ttl_seconds` after they
+    finish; queries run on the blocking executor.
+    """
+    def __init__(self, path: str, result_ttl_seconds: float):
+        self.path = path
+        self.result_ttl_seconds = result_ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL, heartbeat_at REAL)")
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")]
+            if "heartbeat_at" not in columns:
+                self._connection.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    async def put(self, job: JobInfo) -> None:
+        finished = job.status in TERMINAL_STATUSES
+        expires_at = time.time() + self.result_ttl_seconds if finished else None
+        heartbeat_at = None if finished else time.time()
+        data = json.dumps(jsonable_encoder(job))
+        await run_blocking(self._execute, "INSERT OR REPLACE INTO jobs (id, data, expires_at, heartbeat_at) VALUES (?, ?, ?, ?)", (job.id, data, expires_at, heartbeat_at))
+
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        rows = await run_blocking(self._execute, "SELECT data FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)", (job_id, time.time()))
+        return JobInfo(**json.loads(rows[0][0])) if rows else None
+
+    async def delete(self, job_id: str) -> None:
+        await run_blocking(self._execute, "DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    async def purge_expired(self) -> None:
+        await run_blocking(self._execute, "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    async def heartbeat(self, job_ids: list[str]) -> None:
+        if job_ids:
+            placeholders = ", ".join("?" for _ in job_ids)
+            await run_blocking(self._execute, f"UPDATE jobs SET heartbeat_at = ? WHERE expires_at IS NULL AND id IN ({placeholders})", (time.time(), *job_ids))
+
+    async def claim_stale(self, cutoff: float) -> list[JobInfo]:
+        """
+        Returns the unfinished jobs whose last heartbeat is older than `cutoff`, refreshing their heartbeat so that
+        only one process claims each job; the caller is expected to finish them.
+        """
+        return await run_blocking(self._claim_stale, cutoff)
+
+    def _claim_stale(self, cutoff: float) -> list[JobInfo]:
+        claimed = []
+        with self._lock, self._connection:
+            rows = self._connection.execute("SELECT id, data FROM jobs WHERE expires_at IS NULL AND (heartbeat_at IS NULL OR heartbeat_at < ?)", (cutoff,)).fetchall()
+            for job_id, data in rows:
+                # Conditional, so a job another process claimed or finished meanwhile is skipped
+                cursor = self._connection.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND expires_at IS NULL AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                    (time.time(), job_id, cutoff),
+                )
+                if cursor.rowcount == 1:
+                    claimed.append(JobInfo(**json.loads(data)))
+        return claimed
+
+    def _execute(self, sql: str, parameters: tuple) -> list:
+        with self._lock, self._connection:
+            return self._connection.execute(sql, parameters).fetchall()
+
+
+def create_job_store():
+    if settings.JOB_STORE_SQLITE_PATH:
+        return SqliteJobStore(settings.JOB_STORE_SQLITE_PATH, result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS)
+    return InMemoryJobStore(max_jobs=settings.JOB_STORE_MAX_JOBS, result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS)
+
+
+job_store = create_job_store()
@@ -1,14 +1,19 @@
+import asyncio
 import os
-from typing import List
+from typing import AsyncIterator, List
 
 import semantic_kernel as sk
 from dotenv import load_dotenv
 from opentelemetry import trace
-from azure.identity import DefaultAzureCredential
 
-from app.models.api_models import ChatRequest, ExecutionDiagnostics, RequestResult, ChatThreadRequest
-from app.prompts.file_service import FileService
+from app.config.settings import settings as app_settings
+from app.models.api_models import ChatRequest, ExecutionDiagnostics, RequestResult, ChatThreadRequest, StreamEvent
+from app.prompts.prompt_registry import prompt_registry
+from app.services.agent_client_pool import agent_client_pool
 from app.services.weather_plugin import WeatherPlugin
+from app.services.weather_response_cache import weather_response_cache
+from app.utils.resilience import Dependency, RetryPolicy
+from app.utils.telemetry import phase, record_token_usage
 
 from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
@@ -21,6 +26,9 @@ from semantic_kernel.contents import ChatMessageContent, FunctionCallContent
 from semantic_kernel.connectors.ai.azure_ai_inference import AzureAIInferenceChatCompletion
 from azure.ai.inference.aio import ChatCompletionsClient
 
+# Calls to the chat model are retried on throttling and transient errors behind a shared circuit breaker
+chat_completion = Dependency("chat_completion", RetryPolicy(attempt_timeout_seconds=app_settings.CHAT_COMPLETION_TIMEOUT_SECONDS))
+
 class WeatherAgentService:
     def __init__(self):
         # Load environment variables from .env file
@@ -34,6 +42,7 @@ class WeatherAgentService:
         if not endpoint or not deployment_name:
             raise ValueError("Missing required environment variables for OpenAI configuration.")
     
+        self.deployment_name = deployment_name
         self.kernel = sk.Kernel()
         
         # If API key is present, use key-based authentication
@@ -44,24 +53,23 @@ class WeatherAgentService:
                 deployment_name=deployment_name,
                 service_id="azure-chat-completion"
             ))
-        # Otherwise use DefaultAzureCredential
+        # Otherwise use the shared cached DefaultAzureCredential
         else:
             self.kernel.add_service(AzureAIInferenceChatCompletion(
                 ai_model_id=deployment_name,
                 client=ChatCompletionsClient(
                      endpoint=f"{str(endpoint).strip('/')}/openai/deployments/{deployment_name}",
-                     credential=DefaultAzureCredential(),
+                     credential=agent_client_pool.credential,
                      credential_scopes=["https://cognitiveservices.azure.com/.default"],
                 )
             ))
 
         self.kernel.add_plugin(WeatherPlugin(self.kernel), plugin_name="weather")
-        self.file_service = FileService()
 
         pass
 
 
-    async def run_weather(self, request: ChatRequest) -> str:
+    async def run_weather(self, request: ChatRequest, bypass_cache: bool = False) -> str:
         tracer = trace.get_tracer(__name__)
         with tracer.start_as_current_span("Agent: Weather") as current_span:
             # Validate the request object
@@ -73,9 +81,11 @@ class WeatherAgentService:
                 function_choice_behavior=FunctionChoiceBehavior.Auto(filters={"included_plugins": ["weather"]}),
             )
             kernel_arguments = KernelArguments()
-            kernel_arguments ["diagnostics"] = []
 
-            system_message = self.file_service.read_file('WeatherSystemPrompt.txt')
+            system_prompt = prompt_registry.get('WeatherSystemPrompt.txt')
+            current_span.set_attribute("prompt.name", system_prompt.name)
+            current_span.set_attribute("prompt.version", system_prompt.version)
+            system_message = system_prompt.content
             chat_history_1 = ChatHistory()
             chat_history_1.add_system_message(system_message)
             for message in request.messages:
@@ -84,18 +94,72 @@ class WeatherAgentService:
                 elif message.role.lower() == "assistant":
                     chat_history_1.add_assistant_message(message.content)
             
-            chat_result = await chat_completion_service.get_chat_message_content(
-                chat_history=chat_history_1,
-                arguments=kernel_arguments, 
-                settings=settings,
-                kernel=self.kernel)  
-
-            request_result = RequestResult(
-                content=f"{chat_result}",
-                execution_diagnostics=ExecutionDiagnostics(steps=kernel_arguments ["diagnostics"]))
-
+            history_length = len(chat_history_1.messages)
+
+            async def complete():
+                # a retried attempt starts over from the request's history, dropping the tool calls and results an
+                # earlier attempt added (a tool call without its result is rejected), together with their diagnostics
+                del chat_history_1.messages[history_length:]
+                kernel_arguments ["diagnostics"] = []
+                chat_result = await chat_completion_service.get_chat_message_content(
+                    chat_history=chat_history_1,
+                    arguments=kernel_arguments, 
+                    settings=settings,
+                    kernel=self.kernel)
+                # tool-calling turns are added to the history; the final answer is not
+                for message in [*chat_history_1.messages[history_length:], chat_result]:
+                    record_token_usage("weather", message.metadata.get("usage"))
+                return chat_result
+
+            async def answer():
+                with phase("weather", "completion"):
+                    chat_result = await chat_completion.call(complete)
+                return RequestResult(
+                    content=f"{chat_result}",
+                    execution_diagnostics=ExecutionDiagnostics(steps=kernel_arguments ["diagnostics"]))
+
+            if not weather_response_cache.enabled:
+                return await answer()
+
+            # Serve repeated questions from the response cache; bypassing it still refreshes the entry
+            cache_key = weather_response_cache.key(
+                system_prompt.version,
+                request.messages,
+                {"deployment": self.deployment_name, "service": type(chat_completion_service).__name__, "function_choice": settings.function_choice_behavior.model_dump(mode="json")},
+            )
+            request_result, cached = await weather_response_cache.get_or_run(cache_key, answer, refresh=bypass_cache)
+            current_span.set_attribute("cache.status", "bypass" if bypass_cache else "hit" if cached else "miss")
             return request_result
         
+    async def run_weather_batch(self, requests: List[ChatRequest], bypass_cache: bool = False) -> AsyncIterator[StreamEvent]:
+        """
+        Runs `run_weather` for every request, at most WEATHER_BATCH_CONCURRENCY at a time on the shared kernel and
+        HTTP pools. Yields a "result" or "error" event per request in completion order (with the request's
+        `index`), then a "done" event with the counts; a failed request does not stop the others.
+        """
+        semaphore = asyncio.Semaphore(app_settings.WEATHER_BATCH_CONCURRENCY)
+
+        async def run(index: int, request: ChatRequest) -> StreamEvent:
+            async with semaphore:
+                try:
+                    result = await self.run_weather(request, bypass_cache=bypass_cache)
+                    return StreamEvent(type="result", data={"index": index, "result": result})
+                except Exception as e:
+                    return StreamEvent(type="error", data={"index": index, "message": str(e)})
+
+        tasks = [asyncio.create_task(run(index, request)) for index, request in enumerate(requests)]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                event = await next_done
+                failed += event.type == "error"
+                yield event
+            yield StreamEvent(type="done", data={"completed": len(tasks) - failed, "failed": failed})
+        finally:
+            # The client went away before the batch finished
+            for task in tasks:
+                task.cancel()
+
     async def run_weather_agent(self, request: ChatThreadRequest) -> str:
 
         # Define a list to hold callback message content
@@ -103,6 +167,7 @@ class WeatherAgentService:
 
         # Define an async method to handle the `on_intermediate_message` callback
         async def handle_intermediate_steps(message: ChatMessageContent) -> None:
+            record_token_usage("weather_agent", message.metadata.get("usage"))
             if any(isinstance(item, FunctionCallContent) for item in message.items):
                 for fcc in message.items:
                   if isinstance(fcc, FunctionCallContent):
@@ -114,7 +179,10 @@ class WeatherAgentService:
             if not request.message:
                 raise ValueError("No messages found in request.")
             user_message = request.message
-            system_message = self.file_service.read_file('WeatherSystemPrompt.txt')
+            system_prompt = prompt_registry.get('WeatherSystemPrompt.txt')
+            current_span.set_attribute("prompt.name", system_prompt.name)
+            current_span.set_attribute("prompt.version", system_prompt.version)
+            system_message = system_prompt.content
 
             settings=PromptExecutionSettings(
                 function_choice_behavior=FunctionChoiceBehavior.Auto(filters={"included_plugins": ["weather"]}),
@@ -129,16 +197,23 @@ class WeatherAgentService:
                 arguments=kernel_arguments
             )
             
-            # Iterate over the async generator to get the final response
-            response = None
-            thread = None
-            
-            async for result in agent.invoke(messages=user_message, thread=thread, on_intermediate_message=handle_intermediate_steps):
-                response = result
-                thread = response.thread
+            # Iterate over the async generator to get the final response; a retried attempt starts over
+            async def invoke():
+                response = None
+                thread = None
+                intermediate_steps.clear()
+                kernel_arguments ["diagnostics"].clear()
+                async for result in agent.invoke(messages=user_message, thread=thread, on_intermediate_message=handle_intermediate_steps):
+                    response = result
+                    thread = response.thread
+                return response
+
+            with phase("weather_agent", "invoke"):
+                response = await chat_completion.call(invoke)
 
             if response is None:
                 raise ValueError("No response received from the agent.")
+            record_token_usage("weather_agent", response.message.metadata.get("usage"))
 
             request_result = RequestResult(
                 content=f"{response}",
@@ -0,0 +1,98 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Mapping, Optional
+
+from app.config.settings import settings
+from app.utils.cache import TTLCache
+from app.utils.http_client import http_client
+
+# Remaining freshness (seconds) of every forecast read while tracking is on; see track_forecast_freshness
+_forecast_freshness: ContextVar[Optional[list[float]]] = ContextVar("forecast_freshness", default=None)
+
+
+@contextmanager
+def track_forecast_freshness() -> Iterator[list[float]]:
+    """Collects how much longer each forecast read inside the block stays fresh; 0 for uncacheable forecasts."""
+    freshness: list[float] = []
+    token = _forecast_freshness.set(freshness)
+    try:
+        yield freshness
+    finally:
+        _forecast_freshness.reset(token)
+
+
+def ttl_from_cache_headers(headers: Mapping[str, str], default_seconds: float) -> float:
+    """
+    Works out how long a response may be cached from its Cache-Control, Age, Expires and Date headers.
+    Returns 0 when the response must not be cached and `default_seconds` when no freshness is given.
+    """
+    directives: dict[str, Optional[str]] = {}
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+
+    if "no-store" in directives or "no-cache" in directives or "private" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        value = directives.get(name)
+        if value is not None and value.isdigit():
+            age = headers.get("Age", "0")
+            return max(0, int(value) - (int(age) if age.isdigit() else 0))
+
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+            date = headers.get("Date")
+            now = parsedate_to_datetime(date).timestamp() if date else time.time()
+            return max(0, expires_at - now)
+        except (TypeError, ValueError):
+            return 0
+    return default_seconds
+
+
+class WeatherForecastCache:
+    """
+    WeatherForecastCache fronts the two weather.gov calls made per tool invocation with in-memory LRU caches:
+    - points lookups (lat/lon -> forecast URL), keyed by coordinates rounded to WEATHER_POINTS_CACHE_PRECISION
+      decimals and kept for WEATHER_POINTS_CACHE_TTL_SECONDS, since a location's forecast office rarely changes;
+    - forecast bodies keyed by forecast URL, kept for as long as the upstream Cache-Control/Expires headers allow.
+    """
+    def __init__(self):
+        self.precision = settings.WEATHER_POINTS_CACHE_PRECISION
+        self.points = TTLCache("weather_points", max_size=settings.WEATHER_POINTS_CACHE_MAX_SIZE, ttl_seconds=settings.WEATHER_POINTS_CACHE_TTL_SECONDS)
+        self.forecasts = TTLCache("weather_forecasts", max_size=settings.WEATHER_FORECAST_CACHE_MAX_SIZE)
+
+    def points_key(self, latitude: str, longitude: str) -> tuple[str, str]:
+        return (f"{float(latitude):.{self.precision}f}", f"{float(longitude):.{self.precision}f}")
+
+    async def get_forecast_url(self, latitude: str, longitude: str) -> str:
+        key = self.points_key(latitude, longitude)
+        forecast_url = self.points.get(key)
+        if forecast_url is None:
+            json_response = await http_client.get_json(f"{settings.WEATHER_API_BASE_URL}/points/{key[0]},{key[1]}")
+            forecast_url = json_response["properties"]["forecast"]
+            self.points.set(key, forecast_url)
+        return forecast_url
+
+    async def get_forecast(self, forecast_url: str) -> str:
+        entry = self.forecasts.get_entry(forecast_url)
+        if entry is not None:
+            forecast = entry.value
+            ttl = entry.expires_at - time.monotonic()
+        else:
+            response = await http_client.get(forecast_url)
+            forecast = response.text
+            ttl = ttl_from_cache_headers(response.headers, settings.WEATHER_FORECAST_CACHE_DEFAULT_TTL_SECONDS)
+            if ttl > 0:
+                self.forecasts.set(forecast_url, forecast, ttl_seconds=ttl)
+        freshness = _forecast_freshness.get()
+        if freshness is not None:
+            freshness.append(max(0.0, ttl))
+        return forecast
+
+
+weather_forecast_cache = WeatherForecastCache()
@@ -1,5 +1,5 @@
-import requests
 import json
+import re
 import datetime
 from typing import Annotated
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
@@ -7,6 +7,9 @@ from dataclasses import dataclass
 from semantic_kernel.kernel import Kernel
 from semantic_kernel.functions.kernel_arguments import KernelArguments
 from app.models.api_models import ExecutionStep
+from app.services.geocoding import geocoder
+from app.services.weather_cache import weather_forecast_cache
+from app.utils.telemetry import phase, record_token_usage
 
 @dataclass
 class LocationPoint:
@@ -20,17 +23,10 @@ class WeatherPlugin:
     @kernel_function(name="get_weather_for_latitude_longitude", description="get the weather for a latitude and longitude GeoPoint")
     async def get_weather_for_latitude_longitude(self, arguments: Annotated[KernelArguments, {"include_in_function_choices": False}], latitude: Annotated[str, "The location GeoPoint latitude"], longitude: Annotated[str, "The location GeoPoint longitude"]) -> Annotated[str, "The output is a string"]:
         start_time = datetime.datetime.now().isoformat()
-        url = f"https://api.weather.gov/points/{latitude},{longitude}"
-        headers = {"User-Agent": "app"}
-
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        json_response = response.json()
-        forecast_url = json_response["properties"]["forecast"]
-
-        forecast_response = requests.get(forecast_url, headers=headers)
-        forecast_response.raise_for_status()
-        forecast_response_body = forecast_response.text
+        with phase("weather_plugin", "forecast_url"):
+            forecast_url = await weather_forecast_cache.get_forecast_url(latitude, longitude)
+        with phase("weather_plugin", "forecast"):
+            forecast_response_body = await weather_forecast_cache.get_forecast(forecast_url)
 
         end_time = datetime.datetime.now().isoformat()
         # Add the diagnostic result to the arguments
@@ -42,12 +38,24 @@ class WeatherPlugin:
     @kernel_function(name="get_lat_long", description="Get a latitude and longitude GeoPoint for the provided city or postal code.")
     async def determine_lat_long_async(self, arguments: Annotated[KernelArguments, {"include_in_function_choices": False}], location: Annotated[str, "A location string as a city and state or postal code"]) -> Annotated[LocationPoint, "The location GeoPoint"]:
         start_time = datetime.datetime.now().isoformat()
-        # Use the LLM get the latitude and longitude
-        result = await self.kernel.invoke_prompt(f"What is the geopoint for: {location}. Return the result as a JSON object with Latitude and Longitude properties: {{\"Latitude\": 0.0, \"Longitude\": 0.0}}. Only return the JSON.", max_tokens=100)
-        
-        # Parse the result to extract the JSON object
-        json_result  = f"{result}".strip("'")
-        json_data = json.loads(json_result)
+        # Answer from the geocoding cache or offline gazetteer when possible
+        match = geocoder.lookup(location)
+        if match:
+            (latitude, longitude), source = match
+            json_data = {"Latitude": latitude, "Longitude": longitude, "Source": source}
+        else:
+            # Use the LLM get the latitude and longitude
+            with phase("weather_plugin", "geocode_llm"):
+                result = await self.kernel.invoke_prompt(f"What is the geopoint for: {location}. Return the result as a JSON object with Latitude and Longitude properties: {{\"Latitude\": 0.0, \"Longitude\": 0.0}}. Only return the JSON.", max_tokens=100)
+                for completion_metadata in result.metadata.get("metadata", []):
+                    record_token_usage("weather_plugin", completion_metadata.get("usage"))
+
+            # Parse the result to extract the JSON object, tolerating code fences or text around it
+            json_match = re.search(r"\{.*\}", f"{result}", re.DOTALL)
+            json_data = json.loads(json_match.group(0) if json_match else f"{result}".strip("'"))
+            geocoder.remember(location, json_data["Latitude"], json_data["Longitude"])
+            json_data["Source"] = "llm"
+
         location = LocationPoint(
             Latitude=json_data["Latitude"],
             Longitude=json_data["Longitude"]
@@ -0,0 +1,68 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable
+
+from app.config.settings import settings
+from app.models.api_models import ChatMessage, RequestResult
+from app.services.weather_cache import track_forecast_freshness
+from app.utils.cache import TTLCache
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class WeatherResponseCache:
+    """
+    WeatherResponseCache answers repeated /weather questions without calling the model or weather.gov.
+    Entries are keyed on a hash of the system prompt version, the normalized conversation and the execution
+    settings, and live no longer than the freshest-expiring forecast the answer was built from (capped at
+    WEATHER_RESPONSE_CACHE_MAX_TTL_SECONDS); answers built from uncacheable forecasts are not stored.
+    Concurrent requests for the same key share a single model call. Hits and misses are exported by TTLCache.
+    """
+    def __init__(self, enabled: bool, max_size: int, max_ttl_seconds: float):
+        self.enabled = enabled
+        self.max_ttl_seconds = max_ttl_seconds
+        self.responses = TTLCache("weather_responses", max_size=max_size)
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def key(self, prompt_version: str, messages: list[ChatMessage], execution_settings: dict[str, Any]) -> str:
+        payload = {
+            "prompt_version": prompt_version,
+            "messages": [[message.role.lower(), _normalize(message.content)] for message in messages],
+            "settings": execution_settings,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def get_or_run(self, key: str, run: Callable[[], Awaitable[RequestResult]], refresh: bool = False) -> tuple[RequestResult, bool]:
+        """
+        Returns the cached result and True, or runs `run` (once for concurrent callers), caches it and returns
+        it with False. With `refresh` the cached result is ignored and replaced.
+        """
+        if not refresh:
+            result = self.responses.get(key)
+            if result is not None:
+                return result, True
+        task = self._pending.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.create_task(self._run_and_store(key, run))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task), shared
+
+    async def _run_and_store(self, key: str, run: Callable[[], Awaitable[RequestResult]]) -> RequestResult:
+        with track_forecast_freshness() as freshness:
+            result = await run()
+        ttl = min([self.max_ttl_seconds, *freshness])
+        if ttl > 0:
+            self.responses.set(key, result, ttl_seconds=ttl)
+        return result
+
+
+weather_response_cache = WeatherResponseCache(
+    enabled=settings.WEATHER_RESPONSE_CACHE_ENABLED,
+    max_size=settings.WEATHER_RESPONSE_CACHE_MAX_SIZE,
+    max_ttl_seconds=settings.WEATHER_RESPONSE_CACHE_MAX_TTL_SECONDS,
+)
@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from opentelemetry import metrics
+
+from app.config.settings import settings
+
+T = TypeVar("T")
+
+meter = metrics.get_meter(__name__)
+
+queue_wait = meter.create_histogram("app.blocking_executor.queue_wait", unit="s", description="Time a blocking call waited for a worker thread")
+call_duration = meter.create_histogram("app.blocking_executor.duration", unit="s", description="Time a blocking call ran on a worker thread")
+in_flight = meter.create_up_down_counter("app.blocking_executor.in_flight", description="Blocking calls queued or running")
+
+
+class BlockingExecutor:
+    """
+    BlockingExecutor runs calls that have no async SDK equivalent (file system work, blocking clients)
+    on a bounded thread pool so they never stall the event loop. The caller's context, including the
+    active OpenTelemetry span, is carried into the worker thread.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking")
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        attributes = {"operation": _operation_name(func)}
+        context = contextvars.copy_context()
+        submitted_at = time.perf_counter()
+
+        def call() -> T:
+            started_at = time.perf_counter()
+            queue_wait.record(started_at - submitted_at, attributes)
+            try:
+                return context.run(func, *args, **kwargs)
+            finally:
+                call_duration.record(time.perf_counter() - started_at, attributes)
+
+        in_flight.add(1, attributes)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            in_flight.add(-1, attributes)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _operation_name(func: Callable) -> str:
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, "__qualname__", type(func).__name__)
+
+
+blocking_executor = BlockingExecutor(max_workers=settings.BLOCKING_EXECUTOR_MAX_WORKERS)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs `func(*args, **kwargs)` on the shared bounded thread pool and awaits its result."""
+    return await blocking_executor.run(func, *args, **kwargs)
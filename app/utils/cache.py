@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+from opentelemetry import metrics
+
+meter = metrics.get_meter(__name__)
+
+cache_hits = meter.create_counter("app.cache.hits", description="Cache lookups answered from memory")
+cache_misses = meter.create_counter("app.cache.misses", description="Cache lookups that missed or found an expired entry")
+cache_evictions = meter.create_counter("app.cache.evictions", description="Entries evicted to keep a cache within its size bound")
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+    expires_at: Optional[float] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+class TTLCache:
+    """
+    TTLCache is a size-bounded, least-recently-used cache whose entries expire after a time to live.
+    The TTL can be set per cache and overridden per entry; `None` means the entry never expires.
+    Hit, miss and eviction counts are exported as metrics tagged with the cache name.
+    """
+    def __init__(self, name: str, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """Returns the live entry for `key` (refreshing its LRU position), or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.is_expired():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                cache_misses.add(1, {"cache": self.name})
+                return None
+            self._entries.move_to_end(key)
+        cache_hits.add(1, {"cache": self.name})
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        return entry.value if entry else default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.monotonic()
+        entry = CacheEntry(value=value, stored_at=now, expires_at=now + ttl if ttl is not None else None)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                cache_evictions.add(1, {"cache": self.name})
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
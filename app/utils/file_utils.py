@@ -1,63 +1,119 @@
+import logging
 import os
 import uuid
 import base64
+import shutil
+import datetime
 import mimetypes
-from typing import Tuple, Optional, Any
+from tempfile import SpooledTemporaryFile
+from typing import TYPE_CHECKING, List, Tuple, Optional, Any
+
+import aiofiles
+from fastapi import UploadFile
 
-from azure.storage.blob import BlobServiceClient
-from azure.ai.projects import AIProjectClient
 from azure.ai.agents.models import FilePurpose
-from azure.identity import DefaultAzureCredential
 
-from semantic_kernel.contents import ChatMessageContent, ImageContent
-from semantic_kernel.contents.utils.author_role import AuthorRole
+from opentelemetry import trace
+
+from app.config.settings import settings
+from app.models.api_models import ExecutionStep
+
+from app.services.agent_client_pool import agent_client_pool
+from app.services.blob_storage import blob_storage
+from app.services.document_registry import document_registry
+from app.utils.blocking_executor import run_blocking
+
+if TYPE_CHECKING:
+    from semantic_kernel.contents import ChatMessageContent
 
-async def download_and_process_file(blob_service_client: BlobServiceClient, file_name: str) -> Tuple[Optional[bytes], Any]:
+logger = logging.getLogger(__name__)
+
+async def download_and_process_file(file_name: str) -> Tuple[Any, Optional[ExecutionStep]]:
     """
-    Downloads a file from blob storage and processes it for AI Project service.
+    Transfers a file from blob storage to AI Project service.
+    Uploads are registered by the blob's ETag, so an unchanged blob is neither downloaded nor uploaded again.
+    Blob chunks are downloaded through the shared blob client into a SpooledTemporaryFile that only rolls over to an anonymous temp file above
+    BLOB_TRANSFER_SPOOL_MAX_BYTES, and the spool is streamed to the agent service, so memory stays bounded.
     
     Args:
-        blob_service_client: BlobServiceClient instance
         file_name: Name of the file to download and process
         
     Returns:
-        tuple: (file_content, ai_project_file) where file_content is the binary content
-              and ai_project_file is the reference to the uploaded file in AI Project service
+        tuple: (ai_project_file, transfer_step) where ai_project_file is the reference to the uploaded file
+              in AI Project service and transfer_step reports the bytes moved and an upper bound on the memory
+              buffered for them (None when the upload was reused from the document registry)
     """
-    file_content = None
     ai_project_file = None
-    temp_file_path = None
+    transfer_step = None
     
     try:
-        # Get the blob container name from environment variables
-        blob_container_name = os.getenv("AZURE_BLOB_CONTAINER_NAME")
-        blob_client = blob_service_client.get_blob_client(container=blob_container_name, blob=file_name)
-        download_stream = blob_client.download_blob()
-        file_content = download_stream.readall()
-        print(f"Downloaded file '{file_name}' from blob storage")
-        
-        # Create a temporary file to upload to AI Project service
-        temp_file_path = f"./temp_{uuid.uuid4()}{os.path.splitext(file_name)[1]}"
-        with open(temp_file_path, "wb") as f:
-            f.write(file_content)
-        
+        properties = await blob_storage.get_properties(file_name)
+        content_key = f"etag:{blob_storage.container_name}/{file_name}:{properties.etag}"
 
-        # Create an AI Project client and upload the file
-        project_client = AIProjectClient(credential=DefaultAzureCredential(), endpoint=os.environ["AZURE_AI_AGENT_ENDPOINT"])
-        ai_project_file = project_client.agents.files.upload_and_poll(file_path=temp_file_path, purpose=FilePurpose.AGENTS)
-        print(f"Uploaded file to AI Project service with ID: {ai_project_file.id}")
+        async def upload():
+            nonlocal transfer_step
+            start_time = datetime.datetime.now().isoformat()
+            spool = SpooledTemporaryFile(max_size=settings.BLOB_TRANSFER_SPOOL_MAX_BYTES)
+            try:
+                size = await blob_storage.download_to(file_name, spool, etag=properties.etag)
+                await run_blocking(spool.seek, 0)
+            except Exception:
+                spool.close()
+                raise
+            logger.debug("Downloaded file '%s' from blob storage", file_name, extra={"bytes": size})
+            try:
+                # Upload the spool using the shared AI Project client; the HTTP transport reads it in chunks
+                project_client = agent_client_pool.get_client()
+                uploaded_file = await project_client.agents.files.upload_and_poll(
+                    file=(os.path.basename(file_name), spool, "application/octet-stream"),
+                    purpose=FilePurpose.AGENTS,
+                )
+            finally:
+                await run_blocking(spool.close)
+            end_time = datetime.datetime.now().isoformat()
+
+            spilled_to_disk = size > settings.BLOB_TRANSFER_SPOOL_MAX_BYTES
+            # An estimate from the settings, not a measurement: the spool's in-memory part plus one chunk per parallel
+            # download, which the blob SDK buffers internally; the actual peak is at most this
+            buffered_bytes_upper_bound = min(size, settings.BLOB_TRANSFER_SPOOL_MAX_BYTES) + min(size, settings.BLOB_TRANSFER_CHUNK_SIZE_BYTES * settings.BLOB_TRANSFER_MAX_CONCURRENCY)
+            current_span = trace.get_current_span()
+            current_span.set_attribute("blob_transfer.bytes", size)
+            current_span.set_attribute("blob_transfer.buffered_bytes_upper_bound", buffered_bytes_upper_bound)
+            transfer_step = ExecutionStep(
+                name=f"transfer: {file_name}",
+                content=f"bytes={size} buffered_bytes_upper_bound={buffered_bytes_upper_bound} spilled_to_disk={spilled_to_disk}",
+                start_time=start_time,
+                end_time=end_time,
+            )
+            return uploaded_file
+
+        ai_project_file, reused = await document_registry.get_or_upload_file(content_key, upload)
+        logger.info("Uploaded file '%s' to the agent service as %s (reused: %s)", file_name, ai_project_file.id, reused, extra={"file_id": ai_project_file.id})
         
     except Exception as e:
-        print(f"Error processing file: {e}")
+        logger.warning("Error processing file '%s': %s", file_name, e)
         # Continue without the file if there's an error
-    finally:
-        # Clean up the temporary file if it was created
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
             
-    return file_content, ai_project_file
+    return ai_project_file, transfer_step
 
-def create_chat_message_content(user_message: str, file_content=None, file_name=None, ai_project_file=None) -> ChatMessageContent:
+async def save_uploaded_files(files: List[UploadFile]) -> str:
+    """
+    Writes uploaded files to a new directory under the working directory and returns its path.
+    The directory is removed again if any file cannot be written.
+    """
+    temp_dir = os.path.join(os.getcwd(), str(uuid.uuid4()))
+    await run_blocking(os.makedirs, temp_dir, exist_ok=True)
+    try:
+        for file in files:
+            async with aiofiles.open(os.path.join(temp_dir, os.path.basename(file.filename)), 'wb') as out_file:
+                while chunk := await file.read(1024 * 1024):
+                    await out_file.write(chunk)
+    except Exception:
+        await run_blocking(shutil.rmtree, temp_dir, ignore_errors=True)
+        raise
+    return temp_dir
+
+def create_chat_message_content(user_message: str, file_content=None, file_name=None, ai_project_file=None) -> "ChatMessageContent":
     """
     Creates a ChatMessageContent object based on the user message and optional file content.
     
@@ -70,6 +126,10 @@ def create_chat_message_content(user_message: str, file_content=None, file_name=
     Returns:
         ChatMessageContent: The formatted chat message content
     """
+    # Imported here so the routes that only save uploads do not load Semantic Kernel at startup
+    from semantic_kernel.contents import ChatMessageContent, ImageContent
+    from semantic_kernel.contents.utils.author_role import AuthorRole
+
     # If we have an image file, include it in the ChatMessageContent
     if file_content and file_name and any(file_name.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']):
         # When file is an image, create a chat message with image content
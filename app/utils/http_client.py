@@ -0,0 +1,102 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Optional
+
+import aiohttp
+from multidict import CIMultiDict
+from yarl import URL
+
+from app.config.settings import settings
+from app.utils.resilience import Dependency, RetryPolicy
+
+
+@dataclass
+class HttpResponse:
+    """A fully read HTTP response, so the pooled connection is released before the caller sees it."""
+    url: str
+    status: int
+    headers: Mapping[str, str] = field(default_factory=CIMultiDict)
+    text: str = ""
+    method: str = "GET"
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                request_info=aiohttp.RequestInfo(url=URL(self.url), method=self.method, headers=CIMultiDict(), real_url=URL(self.url)),
+                history=(),
+                status=self.status,
+                message=self.text[:200],
+                headers=self.headers,
+            )
+
+
+class PooledHttpClient:
+    """
+    PooledHttpClient wraps one application-lifetime aiohttp session with keep-alive connection pooling,
+    a per-host connection limit and request timeouts. Each host is a separate resilience Dependency, so transient
+    failures are retried with jittered backoff (honouring retry-after) and an unhealthy host trips its own circuit
+    breaker. The session is created on first use inside the running event loop and closed on shutdown.
+    """
+    def __init__(self, limit: int, limit_per_host: int, timeout_seconds: float, max_retries: int, backoff_seconds: float, user_agent: str):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.user_agent = user_agent
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._dependencies: dict[str, Dependency] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers={"User-Agent": self.user_agent},
+            )
+        return self._session
+
+    async def get(self, url: str, headers: Optional[dict[str, str]] = None) -> HttpResponse:
+        """GETs `url`, retrying connection errors, timeouts and retryable status codes; raises on a final error status."""
+        return await self._request("GET", url, headers=headers)
+
+    async def get_json(self, url: str, headers: Optional[dict[str, str]] = None) -> Any:
+        response = await self.get(url, headers=headers)
+        return json.loads(response.text)
+
+    async def post_json(self, url: str, payload: Any, headers: Optional[dict[str, str]] = None, allow_redirects: bool = True) -> HttpResponse:
+        """POSTs `payload` as JSON with the same retries as `get`; only use it for requests that are safe to repeat."""
+        return await self._request("POST", url, headers=headers, json_body=payload, allow_redirects=allow_redirects)
+
+    async def _request(self, method: str, url: str, headers: Optional[dict[str, str]] = None, json_body: Any = None, allow_redirects: bool = True) -> HttpResponse:
+        async def attempt() -> HttpResponse:
+            async with self._get_session().request(method, url, headers=headers, json=json_body, allow_redirects=allow_redirects) as response:
+                result = HttpResponse(url=url, status=response.status, headers=CIMultiDict(response.headers), text=await response.text(), method=method)
+            result.raise_for_status()
+            return result
+
+        return await self._dependency(url).call(attempt)
+
+    def _dependency(self, url: str) -> Dependency:
+        host = URL(url).host or ""
+        dependency = self._dependencies.get(host)
+        if dependency is None:
+            policy = RetryPolicy(max_attempts=self.max_retries + 1, base_delay_seconds=self.backoff_seconds)
+            dependency = self._dependencies[host] = Dependency(f"http:{host}", policy)
+        return dependency
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+http_client = PooledHttpClient(
+    limit=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+    limit_per_host=settings.HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST,
+    timeout_seconds=settings.HTTP_CLIENT_TIMEOUT_SECONDS,
+    max_retries=settings.HTTP_CLIENT_MAX_RETRIES,
+    backoff_seconds=settings.HTTP_CLIENT_BACKOFF_SECONDS,
+    user_agent=settings.HTTP_CLIENT_USER_AGENT,
+)
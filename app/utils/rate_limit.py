@@ -0,0 +1,23 @@
+import math
+import time
+
+
+class TokenBucket:
+    """Refills `rate_per_second` tokens per second up to `burst`; each admitted request takes one token."""
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+
+    def try_take(self) -> float:
+        """Takes a token and returns 0, or returns the seconds until a token will be available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        if self.rate_per_second <= 0:
+            return math.inf
+        return (1 - self.tokens) / self.rate_per_second
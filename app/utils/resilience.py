@@ -0,0 +1,230 @@
+import asyncio
+import email.utils
+import logging
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+import aiohttp
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from opentelemetry import metrics, trace
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_dependencies: list["Dependency"] = []
+
+
+def _observe_circuit_state(options: CallbackOptions) -> Iterator[Observation]:
+    for dependency in _dependencies:
+        yield Observation(_STATE_VALUES[dependency.breaker.state], {"dependency": dependency.name})
+
+
+meter = metrics.get_meter(__name__)
+
+dependency_retries = meter.create_counter("app.resilience.retries", description="Calls to a dependency that were retried")
+dependency_failures = meter.create_counter("app.resilience.failures", description="Calls to a dependency that failed after all attempts")
+dependency_short_circuits = meter.create_counter("app.resilience.short_circuits", description="Calls rejected because the dependency's circuit was open")
+meter.create_observable_gauge(
+    "app.resilience.circuit_state",
+    callbacks=[_observe_circuit_state],
+    description="Circuit breaker state per dependency: 0 closed, 1 half-open, 2 open",
+)
+
+
+class TransientError(Exception):
+    """Raised by an operation to mark a failure as worth retrying, optionally after `retry_after` seconds."""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the dependency while its circuit breaker is open."""
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"'{dependency}' is unavailable after repeated failures; retry in {retry_after:.0f}s.")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+def _causes(error: BaseException) -> Iterator[BaseException]:
+    # SDK wrappers (e.g. Semantic Kernel's ServiceResponseException) keep the transport error as the cause
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, connection failures and throttling or server-error statuses are worth retrying."""
+    # openai is only loaded with the services that call it (and nothing raised its errors before that)
+    openai = sys.modules.get("openai")
+    connection_errors = (openai.APIConnectionError,) if openai else ()
+    status_errors = (openai.APIStatusError,) if openai else ()
+    for cause in _causes(error):
+        if isinstance(cause, (TransientError, asyncio.TimeoutError, ConnectionError, aiohttp.ClientConnectionError,
+                              ServiceRequestError, ServiceResponseError, *connection_errors)):
+            return True
+        if isinstance(cause, aiohttp.ClientResponseError):
+            return cause.status in RETRYABLE_STATUS_CODES
+        if isinstance(cause, (HttpResponseError, *status_errors)):
+            return cause.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Reads the server's retry hint from retry-after-ms, x-ms-retry-after-ms or retry-after (seconds or HTTP date)."""
+    for cause in _causes(error):
+        if isinstance(cause, TransientError) and cause.retry_after is not None:
+            return cause.retry_after
+        headers = getattr(cause, "headers", None) or getattr(getattr(cause, "response", None), "headers", None)
+        if not headers:
+            continue
+        for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+            if headers.get(name):
+                try:
+                    return float(headers[name]) / 1000
+                except ValueError:
+                    pass
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                parsed = email.utils.parsedate_to_datetime(value) if re.search(r"[A-Za-z]", value) else None
+                if parsed is not None:
+                    return max(0.0, parsed.timestamp() - time.time())
+    return None
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures, so calls fail fast instead of piling onto an
+    unhealthy backend. After `reset_timeout_seconds` a single trial call is let through (half-open); its
+    success closes the circuit again and its failure re-opens it.
+    """
+    def __init__(self, name: str, failure_threshold: int, reset_timeout_seconds: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> None:
+        if self.state == OPEN:
+            remaining = self._opened_at + self.reset_timeout_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.name, self.reset_timeout_seconds)
+            self._trial_in_flight = True
+
+    def release_trial(self) -> None:
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_in_flight = False
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != OPEN:
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning("Circuit for '%s' changed from %s to %s", self.name, self.state, state)
+        trace.get_current_span().add_event("circuit_state_changed", {"dependency": self.name, "from": self.state, "to": state})
+        self.state = state
+
+
+@dataclass
+class RetryPolicy:
+    """`max_attempts` counts the first call; delays grow exponentially from `base_delay_seconds` with full jitter."""
+    max_attempts: int = settings.RESILIENCE_MAX_ATTEMPTS
+    base_delay_seconds: float = settings.RESILIENCE_BASE_DELAY_SECONDS
+    max_delay_seconds: float = settings.RESILIENCE_MAX_DELAY_SECONDS
+    max_retry_after_seconds: float = settings.RESILIENCE_MAX_RETRY_AFTER_SECONDS
+    attempt_timeout_seconds: Optional[float] = None
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when the server asks for a longer wait than allowed."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after_seconds else None
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * (2 ** (attempt - 1))))
+
+
+class Dependency:
+    """
+    One backend the application calls (the chat model, the agent service, blob storage, an HTTP host).
+    `call` runs an operation with a per-attempt timeout and retries transient failures with jittered exponential
+    backoff, waiting as long as the server's retry-after asks for. All calls share the dependency's circuit breaker.
+    """
+    def __init__(self, name: str, policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout_seconds=settings.CIRCUIT_BREAKER_RESET_SECONDS,
+        )
+        _dependencies.append(self)
+
+    async def call(self, operation: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                dependency_short_circuits.add(1, {"dependency": self.name})
+                raise
+            try:
+                if self.policy.attempt_timeout_seconds:
+                    result = await asyncio.wait_for(operation(), timeout=self.policy.attempt_timeout_seconds)
+                else:
+                    result = await operation()
+            except asyncio.CancelledError:
+                # The caller gave up; another call may try the half-open circuit
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # The backend answered; a client error says nothing about its health
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                retry = attempt < self.policy.max_attempts and self.breaker.state != OPEN
+                delay = self.policy.delay(attempt, e) if retry else None
+                if delay is None:
+                    dependency_failures.add(1, {"dependency": self.name})
+                    raise
+                dependency_retries.add(1, {"dependency": self.name, "error": type(e).__name__})
+                trace.get_current_span().add_event("retry", {"dependency": self.name, "attempt": attempt, "delay": delay, "error": str(e)[:200]})
+                logger.warning("Call to '%s' failed with %s (attempt %d), retrying in %.1fs", self.name, type(e).__name__, attempt, delay)
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
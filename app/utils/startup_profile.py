@@ -0,0 +1,32 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """
+    Durations, in seconds, of the app's startup steps (module imports, telemetry setup, lifespan startup, service
+    warm-up). Logged once the app is ready to serve and kept for inspection, e.g. by the benchmark.
+    """
+    def __init__(self):
+        self.steps: dict[str, float] = {}
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started_at)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.steps[name] = round(seconds, 4)
+
+    def report(self, message: str) -> None:
+        logger.info("%s: %s", message, ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.steps.items()), extra={f"startup_{name}": seconds for name, seconds in self.steps.items()})
+
+
+startup_profile = StartupProfile()
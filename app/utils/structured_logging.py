@@ -0,0 +1,145 @@
+import atexit
+import copy
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from opentelemetry import metrics, trace
+
+from app.config.settings import settings
+
+meter = metrics.get_meter(__name__)
+
+records_dropped = meter.create_counter("app.logging.dropped", description="Log records dropped because the log queue was full")
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is written as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+def _truncate(value: str, max_chars: int) -> str:
+    if len(value) <= max_chars:
+        return value
+    return f"{value[:max_chars]}... [{len(value) - max_chars} more chars]"
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds the current trace and span ids to records; runs where the record is logged, so the context is right."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = trace.get_current_span().get_span_context()
+        if context.is_valid:
+            record.trace_id = format(context.trace_id, "032x")
+            record.span_id = format(context.span_id, "016x")
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keeps `rate` of the records below INFO. Records in a trace are kept or dropped together (the decision is
+    taken from the trace id), so a sampled request's debug output is complete.
+    """
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.INFO or self.rate >= 1:
+            return True
+        trace_id = trace.get_current_span().get_span_context().trace_id
+        if trace_id:
+            return (trace_id & 0xFFFFFFFF) / 0x100000000 < self.rate
+        return random.random() < self.rate
+
+
+class TruncateMessageFilter(logging.Filter):
+    """
+    Truncates rendered messages to `max_chars`; any traceback is left in full. A long record is replaced by a
+    truncated copy for this handler only, so other handlers of the same record are unaffected.
+    """
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool | logging.LogRecord:
+        message = record.getMessage()
+        if len(message) <= self.max_chars:
+            return True
+        record = copy.copy(record)
+        record.msg = _truncate(message, self.max_chars)
+        record.args = None
+        return record
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking: the message is rendered here (any traceback appended),
+    and records are dropped (and counted) when the queue is full.
+    """
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            records_dropped.add(1, {"logger": record.name})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message (with any traceback), trace and span ids and `extra` fields."""
+    def __init__(self, max_field_chars: int):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value if isinstance(value, (int, float, bool)) or value is None else _truncate(str(value), self.max_field_chars)
+        return json.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        trace_id = getattr(record, "trace_id", None)
+        return f"{text} [trace_id={trace_id}]" if trace_id else text
+
+
+def configure_logging() -> None:
+    """
+    Sends log records through a bounded queue to a listener thread that writes them to stdout, so logging never
+    blocks the event loop on I/O. Levels come from LOG_LEVEL and per-logger LOG_LEVELS; records below INFO are
+    sampled at LOG_DEBUG_SAMPLE_RATE. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter(settings.LOG_MAX_MESSAGE_CHARS) if settings.LOG_FORMAT == "json" else TextFormatter())
+    queue_handler = BoundedQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE))
+    queue_handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+    queue_handler.addFilter(TraceContextFilter())
+    queue_handler.addFilter(TruncateMessageFilter(settings.LOG_MAX_MESSAGE_CHARS))
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from opentelemetry import metrics, trace
+from opentelemetry.trace import Span
+
+tracer = trace.get_tracer(__name__)
+meter = metrics.get_meter(__name__)
+
+# The SDK's default buckets are sized for milliseconds; phases run from milliseconds (cache lookups) to minutes (runs)
+SECONDS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]
+
+phase_duration = meter.create_histogram("app.phase.duration", unit="s", description="Duration of a phase of an agent run or tool call", explicit_bucket_boundaries_advisory=SECONDS_BUCKETS)
+time_to_first_token = meter.create_histogram("app.agent.time_to_first_token", unit="s", description="Time from starting a streamed agent run to its first text delta", explicit_bucket_boundaries_advisory=SECONDS_BUCKETS)
+token_usage = meter.create_counter("app.agent.tokens", unit="{token}", description="Prompt and completion tokens reported by the model or agent service")
+
+
+@contextmanager
+def phase(operation: str, name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Runs the block in a child span named "<operation>.<name>" and records its duration in app.phase.duration,
+    labelled with the operation, the phase and whether it raised.
+    """
+    started_at = time.perf_counter()
+    status = "ok"
+    with tracer.start_as_current_span(f"{operation}.{name}", attributes={"app.operation": operation, "app.phase": name, **attributes}) as span:
+        try:
+            yield span
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            phase_duration.record(time.perf_counter() - started_at, {"operation": operation, "phase": name, "status": status})
+
+
+class FirstTokenTimer:
+    """Records app.agent.time_to_first_token once, on the first text delta after it was created."""
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.started_at = time.perf_counter()
+        self.elapsed: Optional[float] = None
+
+    def mark(self) -> None:
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.started_at
+            time_to_first_token.record(self.elapsed, {"operation": self.operation})
+            trace.get_current_span().add_event("first_token", {"elapsed_seconds": self.elapsed})
+
+
+def record_token_usage(operation: str, usage: Any) -> None:
+    """
+    Adds a usage object's prompt and completion tokens to app.agent.tokens. Accepts the chat completion usage
+    Semantic Kernel puts in message metadata and the usage of agent service runs and run steps; None is ignored.
+    """
+    if usage is None:
+        return
+    counts = {}
+    for token_type in ("prompt", "completion"):
+        count = getattr(usage, f"{token_type}_tokens", None)
+        if count:
+            token_usage.add(count, {"operation": operation, "token.type": token_type})
+            counts[f"gen_ai.usage.{token_type}_tokens"] = count
+    if counts:
+        trace.get_current_span().add_event("token_usage", counts)
@@ -0,0 +1,209 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from opentelemetry._logs import set_logger_provider
+from opentelemetry.context import Context
+from opentelemetry.metrics import set_meter_provider
+from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
+from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.view import DropAggregation, View
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import Decision, Sampler, SamplingResult, TraceIdRatioBased
+from opentelemetry.semconv.resource import ResourceAttributes
+from opentelemetry.trace import Link, SpanContext, SpanKind, StatusCode, TraceFlags, TraceState, get_current_span, set_tracer_provider
+from opentelemetry.util.types import Attributes
+
+from app.config.settings import settings
+from app.utils.rate_limit import TokenBucket
+from app.utils.structured_logging import DebugSamplingFilter, TruncateMessageFilter
+
+logger = logging.getLogger(__name__)
+
+EXPORTERS = ("azure_monitor", "console", "none")
+
+
+class TraceSampler(Sampler):
+    """
+    Head sampling: a new trace is sampled with probability `ratio` (decided from its trace id), and at most
+    `max_per_second` new traces per second are sampled (0 for no limit); spans with a parent follow the parent's
+    decision. With `record_unsampled`, spans that are not sampled are still recorded (but not exported), so
+    ErrorTraceProcessor can export the traces that fail.
+    """
+    def __init__(self, ratio: float, max_per_second: float = 0, record_unsampled: bool = False):
+        self.ratio = TraceIdRatioBased(ratio)
+        self.bucket = TokenBucket(max_per_second, math.ceil(max_per_second)) if max_per_second > 0 else None
+        self.record_unsampled = record_unsampled
+        self._lock = threading.Lock()
+
+    def should_sample(self, parent_context: Optional[Context], trace_id: int, name: str, kind: Optional[SpanKind] = None,
+                      attributes: Attributes = None, links: Optional[Sequence[Link]] = None, trace_state: Optional[TraceState] = None) -> SamplingResult:
+        parent = get_current_span(parent_context).get_span_context()
+        if parent.is_valid:
+            sampled = parent.trace_flags.sampled
+        else:
+            sampled = self.ratio.should_sample(parent_context, trace_id, name).decision.is_sampled() and self._take()
+        if sampled:
+            decision = Decision.RECORD_AND_SAMPLE
+        else:
+            decision = Decision.RECORD_ONLY if self.record_unsampled else Decision.DROP
+        return SamplingResult(decision, attributes if decision.is_recording() else None, parent.trace_state if parent.is_valid else None)
+
+    def _take(self) -> bool:
+        if self.bucket is None:
+            return True
+        with self._lock:
+            return self.bucket.try_take() == 0
+
+    def get_description(self) -> str:
+        limit = f",max_per_second={self.bucket.rate_per_second}" if self.bucket else ""
+        return f"TraceSampler{{{self.ratio.get_description()}{limit}}}"
+
+
+class ErrorTraceProcessor(SpanProcessor):
+    """
+    Passes sampled spans on to `processor`, and holds the spans of recorded but unsampled traces until the trace's
+    local root span ends: if any of them ended with an error status, the whole trace is passed on as sampled,
+    otherwise it is discarded. At most `max_traces` unsampled traces are held; the oldest are discarded first.
+    """
+    def __init__(self, processor: SpanProcessor, max_traces: int):
+        self.processor = processor
+        self.max_traces = max_traces
+        self._traces: OrderedDict[int, tuple[list[ReadableSpan], bool]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        self.processor.on_start(span, parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context.trace_flags.sampled:
+            self.processor.on_end(span)
+            return
+        trace_id = span.context.trace_id
+        failed = span.status.status_code is StatusCode.ERROR
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans, trace_failed = self._traces.pop(trace_id, ([], False))
+            spans.append(span)
+            failed = failed or trace_failed
+            if not is_local_root:
+                self._traces[trace_id] = (spans, failed)
+                if len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+                return
+        if failed:
+            for pending in spans:
+                self.processor.on_end(_as_sampled(pending))
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.processor.force_flush(timeout_millis)
+
+
+def _as_sampled(span: ReadableSpan) -> ReadableSpan:
+    context = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(context.trace_id, context.span_id, context.is_remote, TraceFlags(TraceFlags.SAMPLED), context.trace_state),
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+def configure_tracer(resource: Resource, exporter: SpanExporter) -> None:
+    processor = BatchSpanProcessor(
+        exporter,
+        max_queue_size=settings.TRACE_EXPORT_MAX_QUEUE_SIZE,
+        schedule_delay_millis=settings.TRACE_EXPORT_DELAY_MILLIS,
+        max_export_batch_size=settings.TRACE_EXPORT_BATCH_SIZE,
+        export_timeout_millis=settings.TRACE_EXPORT_TIMEOUT_MILLIS,
+    )
+    sampler = TraceSampler(settings.TRACE_SAMPLE_RATE, settings.TRACE_MAX_PER_SECOND, record_unsampled=settings.TRACE_EXPORT_ERRORS)
+    tracer_provider = TracerProvider(resource=resource, sampler=sampler)
+    tracer_provider.add_span_processor(ErrorTraceProcessor(processor, settings.TRACE_ERROR_BUFFER_MAX_TRACES) if sampler.record_unsampled else processor)
+    set_tracer_provider(tracer_provider)
+
+
+def configure_logger(resource: Resource, exporter) -> None:
+    logger_provider = LoggerProvider(resource=resource)
+    logger_provider.add_log_record_processor(BatchLogRecordProcessor(
+        exporter,
+        max_queue_size=settings.LOG_EXPORT_MAX_QUEUE_SIZE,
+        schedule_delay_millis=settings.LOG_EXPORT_DELAY_MILLIS,
+        max_export_batch_size=settings.LOG_EXPORT_BATCH_SIZE,
+        export_timeout_millis=settings.LOG_EXPORT_TIMEOUT_MILLIS,
+    ))
+    set_logger_provider(logger_provider)
+
+    # Levels are set by configure_logging; this handler needs the caller's context for trace ids, so it is not queued
+    handler = LoggingHandler()
+    handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+    handler.addFilter(TruncateMessageFilter(settings.LOG_MAX_MESSAGE_CHARS))
+    logging.getLogger().addHandler(handler)
+
+
+def configure_metric(resource: Resource, exporter) -> None:
+    # Drop every instrument except those matching METRICS_INCLUDE (semantic_kernel* and app.* by default)
+    meter_provider = MeterProvider(
+        metric_readers=[PeriodicExportingMetricReader(exporter, export_interval_millis=settings.METRICS_EXPORT_INTERVAL_MILLIS)],
+        resource=resource,
+        views=[
+            View(instrument_name="*", aggregation=DropAggregation()),
+            *[View(instrument_name=pattern) for pattern in settings.METRICS_INCLUDE],
+        ],
+    )
+    set_meter_provider(meter_provider)
+
+
+def configure_telemetry(connection_string: Optional[str]) -> bool:
+    """
+    Sets up tracing, log export and metrics for TELEMETRY_EXPORTER, which defaults to "azure_monitor" when an
+    Application Insights connection string is given and to "none" otherwise. "console" prints spans to stdout.
+    With "none" no SDK providers are installed and no libraries are instrumented, so spans, log export and metrics
+    cost (next to) nothing. Returns whether telemetry is enabled, i.e. whether the app should be instrumented.
+    """
+    exporter = settings.TELEMETRY_EXPORTER or ("azure_monitor" if connection_string else "none")
+    if exporter not in EXPORTERS:
+        raise ValueError(f"TELEMETRY_EXPORTER must be one of {', '.join(EXPORTERS)}, not '{exporter}'.")
+    if exporter == "azure_monitor" and not connection_string:
+        raise ValueError("TELEMETRY_EXPORTER=azure_monitor needs APPLICATIONINSIGHTS_CONNECTION_STRING.")
+    logger.info("Telemetry export: %s", exporter, extra={"trace_sample_rate": settings.TRACE_SAMPLE_RATE, "trace_max_per_second": settings.TRACE_MAX_PER_SECOND})
+    if exporter == "none":
+        return False
+
+    from opentelemetry.instrumentation.aiohttp_client import AioHttpClientInstrumentor
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+
+    resource = Resource.create({ResourceAttributes.SERVICE_NAME: "demo-ai-flows-python"})
+    # Instrumenting the requests and aiohttp client libraries for OpenTelemetry tracing
+    RequestsInstrumentor().instrument()
+    AioHttpClientInstrumentor().instrument()
+    if exporter == "azure_monitor":
+        # The Azure Monitor exporters are only imported when they are used
+        from azure.monitor.opentelemetry.exporter import (
+            AzureMonitorLogExporter,
+            AzureMonitorMetricExporter,
+            AzureMonitorTraceExporter,
+        )
+        configure_tracer(resource, AzureMonitorTraceExporter(connection_string=connection_string))
+        configure_logger(resource, AzureMonitorLogExporter(connection_string=connection_string))
+        configure_metric(resource, AzureMonitorMetricExporter(connection_string=connection_string))
+    else:
+        configure_tracer(resource, ConsoleSpanExporter())
+    return True
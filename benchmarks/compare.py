@@ -0,0 +1,53 @@
+"""
+Compares two benchmark reports from benchmarks.run, e.g. the same commit with telemetry off and on, per scenario and
+concurrency level: throughput, p50 and p99 latency and p99 event-loop lag, with the change relative to the baseline.
+
+    python -m benchmarks.compare bench-none.json bench-azure.json
+"""
+import argparse
+import json
+from typing import Optional
+
+
+def change(baseline: Optional[float], candidate: Optional[float]) -> str:
+    if baseline is None or candidate is None:
+        return "n/a"
+    if not baseline:
+        return f"{candidate:.1f}"
+    return f"{candidate:.1f} ({(candidate - baseline) / baseline * 100:+.1f}%)"
+
+
+def compare(baseline: dict, candidate: dict) -> list[str]:
+    lines = [f"{'scenario':<18} {'c':>4}  {'req/s':<22} {'p50 ms':<22} {'p99 ms':<22} {'loop lag p99 ms':<22}"]
+    results = {(result["scenario"], result["concurrency"]): result for result in baseline["results"]}
+    for result in candidate["results"]:
+        before = results.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        lines.append(
+            f"{result['scenario']:<18} {result['concurrency']:>4}  "
+            f"{change(before['throughput_rps'], result['throughput_rps']):<22} "
+            f"{change(before['latency_ms']['p50'], result['latency_ms']['p50']):<22} "
+            f"{change(before['latency_ms']['p99'], result['latency_ms']['p99']):<22} "
+            f"{change(before['loop_lag_ms'].get('p99_ms'), result['loop_lag_ms'].get('p99_ms')):<22}"
+        )
+    if baseline.get("cold_start") and candidate.get("cold_start"):
+        lines.append(f"{'cold_start':<18} {'':>4}  p50 s {change(baseline['cold_start']['p50_s'], candidate['cold_start']['p50_s'])}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmarks.run reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.candidate, encoding="utf-8") as file:
+        candidate = json.load(file)
+    for line in compare(baseline, candidate):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Offline benchmark: starts the stand-in servers (benchmarks.stubs) and the app (benchmarks.serve) as subprocesses,
+drives each scenario with a closed loop of N concurrent clients per concurrency level, and reports latency
+percentiles, throughput, errors and the app's event-loop lag as JSON. Before the scenarios it measures the app's cold
+start (process start to the first /status response) against a target, with a startup and import-time profile.
+
+    python -m benchmarks.run --scenarios weather,agent_chat --concurrency 1,8,32 --duration 10 --output bench.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import ssl
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import aiohttp
+
+from benchmarks.stubs import create_certificate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTION = "What is the weather in Mankato MN?"
+DOCUMENTS = (("forecast.txt", b"Mankato forecast: sunny, high near 75F.\n" * 200), ("climate.txt", b"Mankato climate normals for May.\n" * 200))
+# The direct chat service answers with these instead of failing the request
+ERROR_ANSWERS = ("Error: ", "Run failed: ", "annotation error: ")
+
+
+@dataclass
+class Scenario:
+    """
+    One request to drive. With `files`, `body` holds the form fields and the files are sent as multipart `files`
+    parts. With `follow_job`, the request submits a job and the sample lasts until the job's event stream ends,
+    failing unless the job completed. Responses containing one of `error_answers` count as errors.
+    """
+    name: str
+    method: str
+    path: str
+    body: object
+    streaming: bool = False
+    files: tuple[tuple[str, bytes], ...] = ()
+    follow_job: bool = False
+    error_answers: tuple[str, ...] = ()
+
+
+SCENARIOS = {scenario.name: scenario for scenario in [
+    Scenario("status", "GET", "/status", None),
+    Scenario("weather", "POST", "/weather", {"messages": [{"role": "user", "content": QUESTION}]}),
+    Scenario("weather_batch", "POST", "/weather/batch", [{"messages": [{"role": "user", "content": f"{QUESTION} ({i})"}]} for i in range(10)], streaming=True),
+    Scenario("agent_weather", "POST", "/agent/weather", {"message": QUESTION, "thread_id": ""}),
+    Scenario("agent_chat", "POST", "/agent/chat", {"message": QUESTION, "thread_id": ""}),
+    Scenario("agent_chat_stream", "POST", "/agent/chat/stream?format=ndjson", {"message": QUESTION, "thread_id": ""}, streaming=True),
+    Scenario("agent_chat_file", "POST", "/agent/chat", {"message": "Summarize the attached report.", "thread_id": "", "file": "reports/quarterly.pdf"}),
+    Scenario("agent_chat_direct", "POST", "/agent/chat-direct", {"message": "Chart the week's forecast for Mankato MN.", "thread_id": ""}, error_answers=ERROR_ANSWERS),
+    Scenario("agent_chat_docs", "POST", "/agent/chat-docs/", {"query": "What is the forecast?"}, files=DOCUMENTS, error_answers=ERROR_ANSWERS),
+    Scenario("agent_create", "POST", "/agent/chat/create", {"name": "bench-agent", "model": "gpt-4o", "instructions": "You are a helpful agent."}),
+    Scenario("job_chat_direct", "POST", "/jobs/agent/chat-direct", {"message": "Chart the week's forecast for Mankato MN.", "thread_id": ""}, follow_job=True),
+    Scenario("job_chat_docs", "POST", "/jobs/agent/chat-docs", {"query": "What is the forecast?"}, files=DOCUMENTS, follow_job=True),
+]}
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int
+    time_to_first_byte: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class LevelResult:
+    samples: list[Sample] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def percentile(values: list[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def summarize(scenario: Scenario, concurrency: int, level: LevelResult, loop_lag: dict) -> dict:
+    ok = [sample for sample in level.samples if 200 <= sample.status < 300 and not sample.error]
+    latencies = [sample.latency * 1000 for sample in ok]
+    statuses: dict[str, int] = {}
+    for sample in level.samples:
+        key = sample.error or str(sample.status)
+        statuses[key] = statuses.get(key, 0) + 1
+    result = {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "requests": len(level.samples),
+        "errors": len(level.samples) - len(ok),
+        "statuses": statuses,
+        "duration_s": round(level.elapsed, 3),
+        "throughput_rps": round(len(ok) / level.elapsed, 3) if level.elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else None,
+            **{f"p{p}": round(percentile(latencies, p), 3) if latencies else None for p in (50, 95, 99)},
+            "max": round(max(latencies), 3) if latencies else None,
+        },
+        "loop_lag_ms": {key: round(value, 3) for key, value in loop_lag.items() if key != "samples"},
+    }
+    if scenario.streaming:
+        ttfb = [sample.time_to_first_byte * 1000 for sample in ok if sample.time_to_first_byte is not None]
+        result["time_to_first_byte_ms"] = {f"p{p}": round(percentile(ttfb, p), 3) if ttfb else None for p in (50, 95, 99)}
+    return result
+
+
+def request_body(scenario: Scenario) -> dict:
+    if not scenario.files:
+        return {"json": scenario.body} if scenario.body is not None else {}
+    # FormData can be sent only once, so it is built per request
+    form = aiohttp.FormData()
+    for name, value in scenario.body.items():
+        form.add_field(name, value)
+    for filename, content in scenario.files:
+        form.add_field("files", content, filename=filename, content_type="text/plain")
+    return {"data": form}
+
+
+async def follow_job(session: aiohttp.ClientSession, base_url: str, submitted: dict) -> Optional[str]:
+    """Reads the job's event stream to the end; returns None when the job completed, otherwise the reason."""
+    last_event = None
+    async with session.get(f"{base_url}{submitted['events_url']}?format=ndjson") as response:
+        if response.status != 200:
+            return f"events_{response.status}"
+        async for line in response.content:
+            if line.strip():
+                last_event = json.loads(line)["type"]
+    return None if last_event == "completed" else f"job_{last_event}"
+
+
+async def send(session: aiohttp.ClientSession, base_url: str, scenario: Scenario) -> Sample:
+    started_at = time.perf_counter()
+    try:
+        async with session.request(scenario.method, base_url + scenario.path, **request_body(scenario)) as response:
+            first_byte = None
+            content = bytearray()
+            async for chunk in response.content.iter_any():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started_at
+                content += chunk
+            status = response.status
+        error = None
+        if scenario.error_answers and any(answer.encode() in content for answer in scenario.error_answers):
+            error = "error_answer"
+        elif scenario.follow_job and status == 202:
+            error = await follow_job(session, base_url, json.loads(content))
+        return Sample(latency=time.perf_counter() - started_at, status=status, time_to_first_byte=first_byte, error=error)
+    except Exception as e:
+        return Sample(latency=time.perf_counter() - started_at, status=0, error=type(e).__name__)
+
+
+async def run_level(session: aiohttp.ClientSession, base_url: str, scenario: Scenario, concurrency: int, duration: float, max_requests: Optional[int]) -> LevelResult:
+    level = LevelResult()
+    deadline = time.perf_counter() + duration
+    started_at = time.perf_counter()
+
+    async def client() -> None:
+        while time.perf_counter() < deadline and (max_requests is None or len(level.samples) < max_requests):
+            level.samples.append(await send(session, base_url, scenario))
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    level.elapsed = time.perf_counter() - started_at
+    return level
+
+
+async def wait_until_ready(session: aiohttp.ClientSession, url: str, process: subprocess.Popen, timeout: float = 60, ssl_context: Optional[ssl.SSLContext] = None, interval: float = 0.2) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with code {process.returncode}")
+        try:
+            async with session.get(url, ssl=ssl_context) as response:
+                if response.status < 500:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(interval)
+    raise TimeoutError(f"{url} did not become ready within {timeout}s")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start(module: str, *args: str, verbose: bool) -> subprocess.Popen:
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, "-m", module, *args], cwd=ROOT, stdout=output, stderr=output)
+
+
+def stop(processes: list[subprocess.Popen]) -> None:
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def import_profile(top: int = 10) -> dict:
+    """Seconds `import app.main` spends in each top-level package (summed self time from `python -X importtime`)."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT, capture_output=True, text=True)
+    totals: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            package = name.strip().split(".")[0]
+            totals[package] = totals.get(package, 0) + int(self_us)
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: round(microseconds / 1e6, 3) for package, microseconds in ranked}
+
+
+async def startup_steps(session: aiohttp.ClientSession, app_url: str, timeout: float = 30) -> dict:
+    """The app's startup profile, once its background warm-up has finished (or `timeout` passed)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        async with session.get(f"{app_url}/__bench/startup") as response:
+            steps = await response.json()
+        if "warmup" in steps or time.monotonic() > deadline:
+            return steps
+        await asyncio.sleep(0.1)
+
+
+async def measure_cold_starts(session: aiohttp.ClientSession, args: argparse.Namespace, app_args: list[str], app_url: str) -> dict:
+    """Starts the app `args.cold_starts` times, timing process start to the first /status response."""
+    runs = []
+    steps: dict = {}
+    for _ in range(args.cold_starts):
+        started_at = time.perf_counter()
+        process = start("benchmarks.serve", *app_args, verbose=args.verbose)
+        try:
+            await wait_until_ready(session, f"{app_url}/status", process, interval=0.01)
+            runs.append(time.perf_counter() - started_at)
+            steps = await startup_steps(session, app_url)
+        finally:
+            stop([process])
+    p50 = statistics.median(runs)
+    return {
+        "runs_s": [round(run, 3) for run in runs],
+        "p50_s": round(p50, 3),
+        "max_s": round(max(runs), 3),
+        "target_s": args.cold_start_target_seconds,
+        "within_target": p50 <= args.cold_start_target_seconds,
+        "startup_steps_s": steps,
+        "imports_s": import_profile(),
+    }
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        return await _benchmark(args, *create_certificate(directory))
+
+
+async def _benchmark(args: argparse.Namespace, certfile: str, keyfile: str) -> dict:
+    stubs_url = f"https://localhost:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    stubs_ssl = ssl.create_default_context(cafile=certfile)
+    stub_args = ["--port", str(args.stub_port), "--certfile", certfile, "--keyfile", keyfile, "--forecast-max-age-seconds", str(args.forecast_max_age_seconds)]
+    for latency in args.latency or []:
+        stub_args += ["--latency", latency]
+    app_args = ["--port", str(args.app_port), "--stubs", stubs_url, "--cafile", certfile, "--telemetry", args.telemetry]
+    for value in args.app_env or []:
+        app_args += ["--env", value]
+    processes = [start("benchmarks.stubs", *stub_args, verbose=args.verbose)]
+    results = []
+    cold_start = None
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await wait_until_ready(session, f"{stubs_url}/__stubs/requests", processes[0], ssl_context=stubs_ssl)
+            if args.cold_starts > 0:
+                cold_start = await measure_cold_starts(session, args, app_args, app_url)
+                print(f"{'cold_start':<18} p50={cold_start['p50_s']}s max={cold_start['max_s']}s target={cold_start['target_s']}s", file=sys.stderr)
+            processes.append(start("benchmarks.serve", *app_args, verbose=args.verbose))
+            await wait_until_ready(session, f"{app_url}/status", processes[1])
+
+            for name in [name.strip() for name in args.scenarios.split(",") if name.strip()]:
+                scenario = SCENARIOS[name]
+                if args.warmup > 0:
+                    await run_level(session, app_url, scenario, concurrency=1, duration=args.warmup, max_requests=None)
+                for concurrency in [int(value) for value in args.concurrency.split(",")]:
+                    async with session.get(f"{app_url}/__bench/loop_lag?reset=true"):
+                        pass
+                    level = await run_level(session, app_url, scenario, concurrency, args.duration, args.requests)
+                    async with session.get(f"{app_url}/__bench/loop_lag?reset=true") as response:
+                        loop_lag = await response.json()
+                    result = summarize(scenario, concurrency, level, loop_lag)
+                    results.append(result)
+                    print(f"{scenario.name:<18} c={concurrency:<4} {result['throughput_rps']:>8.2f} req/s  "
+                          f"p50={result['latency_ms']['p50']}ms p99={result['latency_ms']['p99']}ms errors={result['errors']}", file=sys.stderr)
+            async with session.get(f"{stubs_url}/__stubs/requests", ssl=stubs_ssl) as response:
+                upstream_requests = await response.json()
+    finally:
+        stop(processes)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "latency_ms": args.latency or [],
+            "forecast_max_age_seconds": args.forecast_max_age_seconds,
+            "telemetry": args.telemetry,
+            "app_env": args.app_env or [],
+        },
+        "cold_start": cold_start,
+        "results": results,
+        "upstream_requests": upstream_requests,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the app's endpoints against local stand-in servers.")
+    parser.add_argument("--scenarios", default="weather,agent_weather,agent_chat,agent_chat_stream", help=f"Comma-separated; available: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario and concurrency level")
+    parser.add_argument("--requests", type=int, default=None, help="Stop a level after this many requests")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds of single-client warm-up per scenario")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=MS", help="Injected latency per stand-in service: chat, agents, weather, blob, telemetry")
+    parser.add_argument("--forecast-max-age-seconds", type=int, default=0)
+    parser.add_argument("--cold-starts", type=int, default=3, help="Times to start the app to measure its cold start (0 to skip)")
+    parser.add_argument("--cold-start-target-seconds", type=float, default=3.0, help="Fail the run if the median cold start is slower")
+    parser.add_argument("--telemetry", choices=["none", "console", "azure_monitor"], default="none", help="Where the app sends telemetry; azure_monitor uses the ingestion stand-in")
+    parser.add_argument("--app-env", action="append", metavar="NAME=VALUE", help="App setting to run with, e.g. TRACE_SAMPLE_RATE=0.1 (repeatable)")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's and stand-ins' output")
+    args = parser.parse_args()
+
+    report = asyncio.run(benchmark(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if report["cold_start"] and not report["cold_start"]["within_target"]:
+        print(f"Cold start p50 {report['cold_start']['p50_s']}s exceeds the {args.cold_start_target_seconds}s target", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
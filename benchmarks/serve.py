@@ -0,0 +1,134 @@
+"""
+Boots `app.main:app` under uvicorn for benchmarking, wired to the stand-in servers from benchmarks/stubs.py:
+every backend setting points at the stub base URL given with --stubs, the stand-ins' certificate is trusted via
+--cafile, agent-service calls use a static token instead of DefaultAzureCredential, telemetry goes to the
+Application Insights stand-in (--telemetry azure_monitor), the console or nowhere (the default), and an event-loop
+lag monitor runs inside the app process. Lag statistics are served at GET /__bench/loop_lag (?reset=true clears them), and
+the app's startup profile (durations of its startup steps, in seconds) at GET /__bench/startup.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import deque
+
+
+def configure_environment(stubs_url: str, cafile: str, telemetry: str = "none", env: list[str] = ()) -> None:
+    # Read by OpenSSL (aiohttp, azure-core) and httpx (openai) when building their default SSL contexts; aiohttp
+    # builds its context on import, so this must be set before anything imports it
+    os.environ["SSL_CERT_FILE"] = cafile
+    from benchmarks.stubs import AGENTS_PREFIX, BLOB_ACCOUNT, BLOB_ACCOUNT_KEY
+
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": stubs_url,
+        "AZURE_OPENAI_API_KEY": "bench",
+        "AZURE_OPENAI_CHAT_DEPLOYMENT_NAME": "gpt-4o",
+        "AZURE_AI_AGENT_ENDPOINT": f"{stubs_url}{AGENTS_PREFIX}",
+        "AZURE_AI_AGENT_ID": "asst_bench",
+        "AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME": "gpt-4o",
+        "WEATHER_API_BASE_URL": f"{stubs_url}/weather",
+        "AZURE_BLOB_CONNECTION_STRING": f"DefaultEndpointsProtocol=https;AccountName={BLOB_ACCOUNT};AccountKey={BLOB_ACCOUNT_KEY};BlobEndpoint={stubs_url}/{BLOB_ACCOUNT};",
+        "AZURE_BLOB_CONTAINER_NAME": "bench",
+    })
+    # Keep results comparable: no telemetry export to Azure and no per-developer keys from .env
+    os.environ.pop("APPLICATIONINSIGHTS_CONNECTION_STRING", None)
+    os.environ.pop("API_KEY", None)
+    os.environ["TELEMETRY_EXPORTER"] = telemetry
+    if telemetry == "azure_monitor":
+        os.environ.update({
+            "APPLICATIONINSIGHTS_CONNECTION_STRING": f"InstrumentationKey=00000000-0000-0000-0000-000000000000;IngestionEndpoint={stubs_url}/appinsights",
+            "APPLICATIONINSIGHTS_STATSBEAT_DISABLED_ALL": "true",
+            # The exporters send with requests, which trusts REQUESTS_CA_BUNDLE rather than SSL_CERT_FILE
+            "REQUESTS_CA_BUNDLE": cafile,
+        })
+    # App settings to benchmark, e.g. TRACE_SAMPLE_RATE=0.1
+    for value in env:
+        name, _, setting = value.partition("=")
+        os.environ[name] = setting
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a task that sleeps `interval_seconds`, i.e. how long callbacks wait to run."""
+    def __init__(self, interval_seconds: float = 0.01, max_samples: int = 100_000):
+        self.interval_seconds = interval_seconds
+        self.samples: deque[float] = deque(maxlen=max_samples)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            await asyncio.sleep(self.interval_seconds)
+            self.samples.append(max(0.0, loop.time() - started_at - self.interval_seconds))
+
+    def stats(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0}
+
+        def percentile(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000
+
+        return {"samples": len(samples), "mean_ms": statistics.fmean(samples) * 1000, "p50_ms": percentile(50),
+                "p99_ms": percentile(99), "max_ms": samples[-1] * 1000}
+
+
+class StaticTokenCredential:
+    async def get_token(self, *scopes, **kwargs):
+        from azure.core.credentials import AccessToken
+        return AccessToken("bench", int(time.time()) + 3600)
+
+    async def close(self) -> None:
+        pass
+
+
+def use_static_credential(app_settings) -> None:
+    from app.services.agent_client_pool import CachedTokenCredential, agent_client_pool
+
+    agent_client_pool._credential = CachedTokenCredential(StaticTokenCredential(), app_settings.AGENT_TOKEN_REFRESH_MARGIN_SECONDS)
+
+
+async def serve(host: str, port: int) -> None:
+    import uvicorn
+
+    from app.config.settings import settings as app_settings
+    from app.main import app
+    from app.utils.startup_profile import startup_profile
+
+    use_static_credential(app_settings)
+    monitor = LoopLagMonitor()
+
+    @app.get("/__bench/loop_lag", include_in_schema=False)
+    async def loop_lag(reset: bool = False) -> dict:
+        stats = monitor.stats()
+        if reset:
+            monitor.samples.clear()
+        return stats
+
+    @app.get("/__bench/startup", include_in_schema=False)
+    async def startup() -> dict:
+        return startup_profile.steps
+
+    monitor_task = asyncio.create_task(monitor.run())
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False))
+    try:
+        await server.serve()
+    finally:
+        monitor_task.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve app.main:app against the benchmark stand-in servers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--stubs", default="https://localhost:8900", help="Base URL of benchmarks.stubs")
+    parser.add_argument("--cafile", required=True, help="Certificate the stand-ins serve, to trust")
+    parser.add_argument("--telemetry", choices=["none", "console", "azure_monitor"], default="none", help="Where the app sends telemetry (TELEMETRY_EXPORTER)")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="App setting to set, e.g. TRACE_SAMPLE_RATE=0.1 (repeatable)")
+    args = parser.parse_args()
+    configure_environment(args.stubs.rstrip("/"), args.cafile, args.telemetry, args.env)
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+"""
+Local stand-ins for the services the app calls, served from one aiohttp application:
+
+- Azure OpenAI chat completions  /openai/deployments/{deployment}/chat/completions
+- weather.gov                    /weather/points/{lat},{lon} and /weather/gridpoints/{office}/{xy}/forecast
+- Azure AI agent service         /api/projects/bench/... (agents, threads, messages, runs incl. streaming, files, vector stores);
+                                 runs of code interpreter agents write a file and link it from the answer
+- Azure Blob Storage             /devstoreaccount1/{container}/{blob}
+- Application Insights ingestion /appinsights/v2.1/track (accepts everything; items received are counted)
+
+Every response is delayed by the latency configured for its service (milliseconds, with +/- jitter), so runs can
+model a slow model or a slow storage account. The stand-ins are served over TLS with a self-signed certificate,
+because the SDKs insist on https endpoints; clients trust it through SSL_CERT_FILE.
+Run standalone with `python -m benchmarks.stubs --port 8900 --certfile cert.pem --keyfile key.pem`.
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import ipaddress
+import itertools
+import json
+import os
+import random
+import ssl
+import time
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+AGENTS_PREFIX = "/api/projects/bench"
+BLOB_ACCOUNT = "devstoreaccount1"
+# Azurite's published development account key; the stand-in accepts any signature
+BLOB_ACCOUNT_KEY = "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="
+
+ANSWER = "Expect sunshine with a high near 75F and a light breeze from the northwest this afternoon."
+RUN_USAGE = {"prompt_tokens": 400, "completion_tokens": len(ANSWER) // 4, "total_tokens": 400 + len(ANSWER) // 4}
+
+
+@dataclass
+class StubConfig:
+    """Per-service latency in milliseconds, plus the shape of streamed and stored content."""
+    latency_ms: dict[str, float] = field(default_factory=lambda: {"chat": 300, "agents": 50, "weather": 100, "blob": 20, "telemetry": 20})
+    jitter: float = 0.1
+    stream_deltas: int = 20
+    stream_delta_interval_ms: float = 15
+    blob_size_bytes: int = 256 * 1024
+    forecast_max_age_seconds: int = 0
+
+    async def delay(self, service: str) -> None:
+        latency = self.latency_ms.get(service, 0) / 1000
+        if latency > 0:
+            await asyncio.sleep(latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+_ids = itertools.count(1)
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{next(_ids):08d}"
+
+
+def _now() -> int:
+    return int(time.time())
+
+
+class Stubs:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.agents: dict[str, dict] = {}
+        self.threads: dict[str, dict] = {}
+        self.messages: dict[str, list[dict]] = {}
+        self.runs: dict[str, dict] = {}
+        self.files: dict[str, dict] = {}
+        self.vector_stores: dict[str, dict] = {}
+        self.blobs: dict[str, bytes] = {}
+        self.requests: dict[str, int] = {}
+        self.telemetry_items = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3, middlewares=[self._count])
+        app.router.add_post("/openai/deployments/{deployment}/chat/completions", self.chat_completions)
+        app.router.add_get("/weather/points/{coordinates}", self.weather_points)
+        app.router.add_get("/weather/gridpoints/{office}/{xy}/forecast", self.weather_forecast)
+        app.router.add_post("/appinsights/v2.1/track", self.track_telemetry)
+        app.router.add_get("/__stubs/requests", self.request_counts)
+
+        p = AGENTS_PREFIX
+        app.router.add_post(f"{p}/assistants", self.create_agent)
+        app.router.add_get(f"{p}/assistants", self.list_agents)
+        app.router.add_get(f"{p}/assistants/{{agent_id}}", self.get_agent)
+        app.router.add_delete(f"{p}/assistants/{{agent_id}}", self.delete_agent)
+        app.router.add_post(f"{p}/threads", self.create_thread)
+        app.router.add_get(f"{p}/threads/{{thread_id}}", self.get_thread)
+        app.router.add_post(f"{p}/threads/{{thread_id}}", self.update_thread)
+        app.router.add_post(f"{p}/threads/{{thread_id}}/messages", self.create_message)
+        app.router.add_get(f"{p}/threads/{{thread_id}}/messages", self.list_messages)
+        app.router.add_get(f"{p}/threads/{{thread_id}}/messages/{{message_id}}", self.get_message)
+        app.router.add_post(f"{p}/threads/{{thread_id}}/runs", self.create_run)
+        app.router.add_get(f"{p}/threads/{{thread_id}}/runs/{{run_id}}", self.get_run)
+        app.router.add_post(f"{p}/files", self.upload_file)
+        app.router.add_get(f"{p}/files/{{file_id}}", self.get_file)
+        app.router.add_get(f"{p}/files/{{file_id}}/content", self.get_file_content)
+        app.router.add_delete(f"{p}/files/{{file_id}}", self.delete_file)
+        app.router.add_post(f"{p}/vector_stores", self.create_vector_store)
+        app.router.add_get(f"{p}/vector_stores/{{vector_store_id}}", self.get_vector_store)
+        app.router.add_delete(f"{p}/vector_stores/{{vector_store_id}}", self.delete_vector_store)
+        app.router.add_post(f"{p}/vector_stores/{{vector_store_id}}/file_batches", self.create_file_batch)
+        app.router.add_get(f"{p}/vector_stores/{{vector_store_id}}/file_batches/{{batch_id}}", self.get_file_batch)
+        app.router.add_get(f"{p}/vector_stores/{{vector_store_id}}/file_batches/{{batch_id}}/files", self.list_batch_files)
+        app.router.add_post(f"{p}/vector_stores/{{vector_store_id}}/files", self.create_vector_store_file)
+
+        app.router.add_route("HEAD", f"/{BLOB_ACCOUNT}/{{container}}/{{blob:.+}}", self.blob_properties)
+        app.router.add_get(f"/{BLOB_ACCOUNT}/{{container}}/{{blob:.+}}", self.blob_download, allow_head=False)
+        app.router.add_put(f"/{BLOB_ACCOUNT}/{{container}}/{{blob:.+}}", self.blob_upload)
+        return app
+
+    @web.middleware
+    async def _count(self, request: web.Request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else "unmatched"
+        key = f"{request.method} {route}"
+        self.requests[key] = self.requests.get(key, 0) + 1
+        return await handler(request)
+
+    async def request_counts(self, request: web.Request) -> web.Response:
+        counts = dict(self.requests)
+        if self.telemetry_items:
+            counts["telemetry items"] = self.telemetry_items
+        return web.json_response(counts)
+
+    # Chat completions: the first turn asks for the weather tool when it is offered, the next turn answers
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.config.delay("chat")
+        messages = body.get("messages", [])
+        tools = [tool["function"]["name"] for tool in body.get("tools") or []]
+        weather_tool = next((name for name in tools if name.endswith("get_weather_for_latitude_longitude")), None)
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+        if weather_tool and not any(message.get("role") == "tool" for message in messages):
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": _new_id("call"),
+                    "type": "function",
+                    "function": {"name": weather_tool, "arguments": json.dumps({"latitude": "44.16", "longitude": "-94.00"})},
+                }],
+            }
+            finish_reason, completion_tokens = "tool_calls", 20
+        else:
+            message = {"role": "assistant", "content": ANSWER}
+            finish_reason, completion_tokens = "stop", len(ANSWER) // 4
+        return web.json_response({
+            "id": _new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": _now(),
+            "model": request.match_info["deployment"],
+            "choices": [{"index": 0, "finish_reason": finish_reason, "message": message}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    # weather.gov
+
+    async def weather_points(self, request: web.Request) -> web.Response:
+        await self.config.delay("weather")
+        base = f"{request.scheme}://{request.host}/weather"
+        return web.json_response({"properties": {"forecast": f"{base}/gridpoints/MPX/{abs(hash(request.match_info['coordinates'])) % 100},50/forecast"}})
+
+    async def weather_forecast(self, request: web.Request) -> web.Response:
+        await self.config.delay("weather")
+        periods = [{"number": i + 1, "name": f"Period {i + 1}", "temperature": 70 + i, "temperatureUnit": "F", "shortForecast": "Sunny"} for i in range(14)]
+        max_age = self.config.forecast_max_age_seconds
+        cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-store"
+        return web.json_response({"properties": {"periods": periods}}, headers={"Cache-Control": cache_control})
+
+    # Application Insights ingestion
+
+    async def track_telemetry(self, request: web.Request) -> web.Response:
+        await self.config.delay("telemetry")
+        items = await request.json()
+        self.telemetry_items += len(items)
+        return web.json_response({"itemsReceived": len(items), "itemsAccepted": len(items), "errors": []})
+
+    # Agent service
+
+    async def create_agent(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.config.delay("agents")
+        agent = {"id": _new_id("asst"), "object": "assistant", "created_at": _now(), "name": body.get("name"), "description": None,
+                 "model": body.get("model") or "gpt-4o", "instructions": body.get("instructions"), "tools": body.get("tools") or [],
+                 "tool_resources": body.get("tool_resources") or {}, "temperature": 1.0, "top_p": 1.0, "metadata": {}}
+        self.agents[agent["id"]] = agent
+        return web.json_response(agent)
+
+    async def list_agents(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        agents = list(self.agents.values())
+        # The SDK pages on while last_id is set, so the page after the last agent is empty
+        after = request.query.get("after")
+        if after:
+            ids = [agent["id"] for agent in agents]
+            agents = agents[ids.index(after) + 1:] if after in ids else []
+        return web.json_response({"object": "list", "data": agents, "first_id": agents[0]["id"] if agents else None,
+                                  "last_id": agents[-1]["id"] if agents else None, "has_more": False})
+
+    async def get_agent(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        agent_id = request.match_info["agent_id"]
+        agent = self.agents.setdefault(agent_id, {
+            "id": agent_id, "object": "assistant", "created_at": _now(), "name": "BenchAgent", "description": None, "model": "gpt-4o",
+            "instructions": "You are a helpful agent.", "tools": [], "tool_resources": {}, "temperature": 1.0, "top_p": 1.0, "metadata": {},
+        })
+        return web.json_response(agent)
+
+    async def delete_agent(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        agent_id = request.match_info["agent_id"]
+        self.agents.pop(agent_id, None)
+        return web.json_response({"id": agent_id, "object": "assistant.deleted", "deleted": True})
+
+    async def create_thread(self, request: web.Request) -> web.Response:
+        body = await request.json() if request.can_read_body else {}
+        await self.config.delay("agents")
+        thread = {"id": _new_id("thread"), "object": "thread", "created_at": _now(), "metadata": {}, "tool_resources": body.get("tool_resources")}
+        self.threads[thread["id"]] = thread
+        self.messages[thread["id"]] = []
+        for message in body.get("messages") or []:
+            self._add_message(thread["id"], message.get("role", "user"), str(message.get("content", "")))
+        return web.json_response(thread)
+
+    async def get_thread(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        return web.json_response(self._thread(request.match_info["thread_id"]))
+
+    async def update_thread(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.config.delay("agents")
+        thread = self._thread(request.match_info["thread_id"])
+        if "tool_resources" in body:
+            thread["tool_resources"] = body["tool_resources"]
+        return web.json_response(thread)
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.config.delay("agents")
+        content = body.get("content")
+        if isinstance(content, list):
+            content = " ".join(str(block.get("text", "")) for block in content if isinstance(block, dict))
+        return web.json_response(self._add_message(request.match_info["thread_id"], body.get("role", "user"), str(content)))
+
+    async def list_messages(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        messages = list(reversed(self.messages.get(request.match_info["thread_id"], [])))
+        if request.query.get("order") == "asc":
+            messages.reverse()
+        return web.json_response({"object": "list", "data": messages, "first_id": messages[0]["id"] if messages else None,
+                                  "last_id": messages[-1]["id"] if messages else None, "has_more": False})
+
+    async def get_message(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        for message in self.messages.get(request.match_info["thread_id"], []):
+            if message["id"] == request.match_info["message_id"]:
+                return web.json_response(message)
+        raise web.HTTPNotFound()
+
+    async def create_run(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        thread_id = request.match_info["thread_id"]
+        self._thread(thread_id)
+        await self.config.delay("agents")
+        run = {"id": _new_id("run"), "object": "thread.run", "created_at": _now(), "thread_id": thread_id,
+               "assistant_id": body.get("assistant_id"), "status": "queued", "instructions": "", "model": "gpt-4o", "tools": [],
+               "metadata": {}, "last_error": None, "usage": None, "parallel_tool_calls": True,
+               "completes_at": time.monotonic() + self.config.latency_ms.get("chat", 0) / 1000}
+        self.runs[run["id"]] = run
+        if not body.get("stream"):
+            return web.json_response(self._public_run(run))
+        return await self._stream_run(request, run)
+
+    async def get_run(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        run = self.runs.get(request.match_info["run_id"])
+        if run is None:
+            raise web.HTTPNotFound()
+        if run["status"] in ("queued", "in_progress") and time.monotonic() >= run["completes_at"]:
+            self._add_answer(run)
+            run["status"], run["usage"] = "completed", RUN_USAGE
+        elif run["status"] == "queued":
+            run["status"] = "in_progress"
+        return web.json_response(self._public_run(run))
+
+    async def _stream_run(self, request: web.Request, run: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(event: str, data: dict) -> None:
+            await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+
+        await send("thread.run.created", self._public_run(run))
+        run["status"] = "in_progress"
+        await send("thread.run.in_progress", self._public_run(run))
+        # Time to first token models the model's prompt processing; deltas then arrive at a steady rate
+        await self.config.delay("chat")
+        message = self._add_message(run["thread_id"], "assistant", ANSWER, run_id=run["id"], agent_id=run["assistant_id"])
+        words = ANSWER.split(" ")
+        per_delta = max(1, len(words) // max(1, self.config.stream_deltas))
+        for index in range(0, len(words), per_delta):
+            chunk = " ".join(words[index:index + per_delta]) + (" " if index + per_delta < len(words) else "")
+            await send("thread.message.delta", {"id": message["id"], "object": "thread.message.delta",
+                                                "delta": {"role": "assistant", "content": [{"index": 0, "type": "text", "text": {"value": chunk, "annotations": []}}]}})
+            await asyncio.sleep(self.config.stream_delta_interval_ms / 1000)
+        await send("thread.run.step.completed", {"id": _new_id("step"), "object": "thread.run.step", "type": "message_creation", "status": "completed",
+                                                 "created_at": _now(), "run_id": run["id"], "thread_id": run["thread_id"], "assistant_id": run["assistant_id"],
+                                                 "step_details": {"type": "message_creation", "message_creation": {"message_id": message["id"]}},
+                                                 "usage": RUN_USAGE})
+        run["status"], run["usage"] = "completed", RUN_USAGE
+        await send("thread.run.completed", self._public_run(run))
+        await response.write(b"event: done\ndata: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def upload_file(self, request: web.Request) -> web.Response:
+        size, filename = 0, "upload"
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "file":
+                filename = part.filename or filename
+                while chunk := await part.read_chunk():
+                    size += len(chunk)
+            else:
+                await part.release()
+        await self.config.delay("agents")
+        file = {"id": _new_id("assistant-file"), "object": "file", "bytes": size, "filename": filename, "created_at": _now(),
+                "purpose": "assistants", "status": "processed"}
+        self.files[file["id"]] = file
+        return web.json_response(file)
+
+    async def get_file(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        file = self.files.get(request.match_info["file_id"])
+        if file is None:
+            raise web.HTTPNotFound()
+        return web.json_response({key: value for key, value in file.items() if key != "content"})
+
+    async def get_file_content(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        file = self.files.get(request.match_info["file_id"])
+        if file is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=file.get("content", b""), content_type="application/octet-stream")
+
+    async def delete_file(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        file_id = request.match_info["file_id"]
+        self.files.pop(file_id, None)
+        return web.json_response({"id": file_id, "object": "file", "deleted": True})
+
+    async def create_vector_store(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.config.delay("agents")
+        file_ids = body.get("file_ids") or []
+        store = {"id": _new_id("vs"), "object": "vector_store", "created_at": _now(), "name": body.get("name"), "usage_bytes": 0,
+                 "status": "completed", "metadata": {}, "last_active_at": _now(), "file_ids": file_ids,
+                 "file_counts": {"in_progress": 0, "completed": len(file_ids), "failed": 0, "cancelled": 0, "total": len(file_ids)}}
+        self.vector_stores[store["id"]] = store
+        return web.json_response(store)
+
+    async def get_vector_store(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        store = self.vector_stores.get(request.match_info["vector_store_id"])
+        if store is None:
+            raise web.HTTPNotFound()
+        return web.json_response(store)
+
+    async def delete_vector_store(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        vector_store_id = request.match_info["vector_store_id"]
+        self.vector_stores.pop(vector_store_id, None)
+        return web.json_response({"id": vector_store_id, "object": "vector_store.deleted", "deleted": True})
+
+    async def create_file_batch(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.config.delay("agents")
+        store = self.vector_stores.get(request.match_info["vector_store_id"])
+        if store is None:
+            raise web.HTTPNotFound()
+        file_ids = body.get("file_ids") or [entry["file_id"] for entry in body.get("data_sources") or [] if "file_id" in entry]
+        store["file_ids"] = store["file_ids"] + file_ids
+        batch = {"id": _new_id("vsfb"), "object": "vector_store.file_batch", "created_at": _now(), "vector_store_id": store["id"],
+                 "status": "completed", "file_ids": file_ids,
+                 "file_counts": {"in_progress": 0, "completed": len(file_ids), "failed": 0, "cancelled": 0, "total": len(file_ids)}}
+        store.setdefault("batches", {})[batch["id"]] = batch
+        return web.json_response({key: value for key, value in batch.items() if key != "file_ids"})
+
+    async def get_file_batch(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        batch = self.vector_stores.get(request.match_info["vector_store_id"], {}).get("batches", {}).get(request.match_info["batch_id"])
+        if batch is None:
+            raise web.HTTPNotFound()
+        return web.json_response({key: value for key, value in batch.items() if key != "file_ids"})
+
+    async def list_batch_files(self, request: web.Request) -> web.Response:
+        await self.config.delay("agents")
+        vector_store_id = request.match_info["vector_store_id"]
+        batch = self.vector_stores.get(vector_store_id, {}).get("batches", {}).get(request.match_info["batch_id"])
+        if batch is None:
+            raise web.HTTPNotFound()
+        data = [self._vector_store_file(vector_store_id, file_id) for file_id in batch["file_ids"]]
+        return web.json_response({"object": "list", "data": data, "first_id": None, "last_id": None, "has_more": False})
+
+    async def create_vector_store_file(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.config.delay("agents")
+        vector_store_id = request.match_info["vector_store_id"]
+        return web.json_response(self._vector_store_file(vector_store_id, body.get("file_id")))
+
+    # Blob storage
+
+    def _blob(self, request: web.Request) -> tuple[bytes, str]:
+        name = f"{request.match_info['container']}/{request.match_info['blob']}"
+        content = self.blobs.get(name)
+        if content is None:
+            # Any blob that was never uploaded exists with deterministic content of the configured size
+            seed = hashlib.sha256(name.encode()).digest()
+            content = (seed * (self.config.blob_size_bytes // len(seed) + 1))[:self.config.blob_size_bytes]
+            self.blobs[name] = content
+        return content, f'"0x{hashlib.md5(content).hexdigest()[:16].upper()}"'
+
+    def _blob_headers(self, content: bytes, etag: str) -> dict[str, str]:
+        return {"ETag": etag, "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT", "x-ms-blob-type": "BlockBlob",
+                "x-ms-creation-time": "Mon, 01 Jan 2024 00:00:00 GMT", "x-ms-lease-state": "available", "x-ms-lease-status": "unlocked",
+                "x-ms-server-encrypted": "true", "Accept-Ranges": "bytes", "Content-Type": "application/octet-stream", "x-ms-version": "2025-05-05"}
+
+    async def blob_properties(self, request: web.Request) -> web.Response:
+        await self.config.delay("blob")
+        content, etag = self._blob(request)
+        return web.Response(headers={**self._blob_headers(content, etag), "Content-Length": str(len(content))})
+
+    async def blob_download(self, request: web.Request) -> web.Response:
+        await self.config.delay("blob")
+        content, etag = self._blob(request)
+        headers = self._blob_headers(content, etag)
+        requested = request.headers.get("x-ms-range") or request.headers.get("Range")
+        if requested:
+            start, _, end = requested.removeprefix("bytes=").partition("-")
+            start, end = int(start), min(int(end) if end else len(content) - 1, len(content) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+            return web.Response(status=206, body=content[start:end + 1], headers=headers)
+        return web.Response(body=content, headers=headers)
+
+    async def blob_upload(self, request: web.Request) -> web.Response:
+        content = await request.read()
+        await self.config.delay("blob")
+        name = f"{request.match_info['container']}/{request.match_info['blob']}"
+        if request.query.get("comp") not in ("block", "blocklist"):
+            self.blobs[name] = content
+        return web.Response(status=201, headers={"ETag": f'"0x{hashlib.md5(content).hexdigest()[:16].upper()}"',
+                                                 "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT", "x-ms-request-server-encrypted": "true"})
+
+    # Helpers
+
+    def _thread(self, thread_id: str) -> dict:
+        thread = self.threads.get(thread_id)
+        if thread is None:
+            raise web.HTTPNotFound()
+        return thread
+
+    def _add_answer(self, run: dict) -> dict:
+        """The run's answer; agents with the code interpreter also write a file, linked from the answer like the service does."""
+        tools = self.agents.get(run["assistant_id"], {}).get("tools") or []
+        if not any(tool.get("type") == "code_interpreter" for tool in tools):
+            return self._add_message(run["thread_id"], "assistant", ANSWER, run_id=run["id"], agent_id=run["assistant_id"])
+        content = b"day,high_f\nMon,75\nTue,73\n"
+        file = {"id": _new_id("assistant-file"), "object": "file", "bytes": len(content), "filename": "forecast.csv", "created_at": _now(),
+                "purpose": "assistants_output", "status": "processed", "content": content}
+        self.files[file["id"]] = file
+        link = "sandbox:/mnt/data/forecast.csv"
+        text = f"{ANSWER} [Download the forecast]({link})"
+        annotation = {"type": "file_path", "text": link, "file_path": {"file_id": file["id"]}, "start_index": text.index(link), "end_index": text.index(link) + len(link)}
+        return self._add_message(run["thread_id"], "assistant", text, run_id=run["id"], agent_id=run["assistant_id"], annotations=[annotation])
+
+    def _add_message(self, thread_id: str, role: str, text: str, run_id: str = None, agent_id: str = None, annotations: list = None) -> dict:
+        message = {"id": _new_id("msg"), "object": "thread.message", "created_at": _now(), "thread_id": thread_id, "status": "completed",
+                   "role": role, "content": [{"type": "text", "text": {"value": text, "annotations": annotations or []}}], "attachments": [],
+                   "assistant_id": agent_id, "run_id": run_id, "metadata": {}}
+        self.messages.setdefault(thread_id, []).append(message)
+        return message
+
+    def _vector_store_file(self, vector_store_id: str, file_id: str) -> dict:
+        return {"id": file_id, "object": "vector_store.file", "usage_bytes": self.files.get(file_id, {}).get("bytes", 0),
+                "created_at": _now(), "vector_store_id": vector_store_id, "status": "completed", "last_error": None}
+
+    @staticmethod
+    def _public_run(run: dict) -> dict:
+        return {key: value for key, value in run.items() if key != "completes_at"}
+
+
+def create_certificate(directory: str) -> tuple[str, str]:
+    """Writes a self-signed certificate for localhost and 127.0.0.1 to `directory`; returns (certfile, keyfile)."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    certfile, keyfile = os.path.join(directory, "stubs-cert.pem"), os.path.join(directory, "stubs-key.pem")
+    with open(certfile, "wb") as file:
+        file.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(keyfile, "wb") as file:
+        file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return certfile, keyfile
+
+
+def parse_latency(values: list[str]) -> dict[str, float]:
+    latency = StubConfig().latency_ms
+    for value in values or []:
+        service, _, milliseconds = value.partition("=")
+        latency[service] = float(milliseconds)
+    return latency
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the app's backend services.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", action="append", metavar="SERVICE=MS", help="Injected latency per service: chat, agents, weather, blob, telemetry")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Relative latency jitter, e.g. 0.1 for +/-10%%")
+    parser.add_argument("--stream-deltas", type=int, default=20)
+    parser.add_argument("--stream-delta-interval-ms", type=float, default=15)
+    parser.add_argument("--blob-size-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--forecast-max-age-seconds", type=int, default=0, help="Cache-Control max-age of forecasts; 0 sends no-store")
+    parser.add_argument("--certfile", required=True, help="TLS certificate, e.g. from create_certificate")
+    parser.add_argument("--keyfile", required=True)
+    args = parser.parse_args()
+    config = StubConfig(
+        latency_ms=parse_latency(args.latency),
+        jitter=args.jitter,
+        stream_deltas=args.stream_deltas,
+        stream_delta_interval_ms=args.stream_delta_interval_ms,
+        blob_size_bytes=args.blob_size_bytes,
+        forecast_max_age_seconds=args.forecast_max_age_seconds,
+    )
+    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_context.load_cert_chain(args.certfile, args.keyfile)
+    web.run_app(Stubs(config).app(), host=args.host, port=args.port, ssl_context=ssl_context, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
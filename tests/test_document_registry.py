@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import document_registry as document_registry_module
+from app.services.document_registry import DocumentRegistry
+
+
+class FakeDeleter:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete(self, id):
+        self.deleted.append(id)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = SimpleNamespace(agents=SimpleNamespace(vector_stores=FakeDeleter(), files=FakeDeleter()))
+    monkeypatch.setattr(document_registry_module.agent_client_pool, "get_client", lambda: client)
+    return client
+
+
+def test_file_added_to_unregistered_store_survives_reap(client):
+    async def scenario():
+        registry = DocumentRegistry(ttl_seconds=0, reap_interval_seconds=3600, thread_ttl_seconds=3600)
+
+        async def upload():
+            return SimpleNamespace(id="file-1")
+
+        added = []
+
+        async def add(vector_store_id, file_id):
+            added.append((vector_store_id, file_id))
+
+        file, _ = await registry.get_or_upload_file("sha256:abc", upload)
+        await registry.add_file("thread-1", "vs-outside", file.id, add)
+        await registry.reap()
+
+        assert added == [("vs-outside", "file-1")]
+        assert client.agents.files.deleted == []
+        assert client.agents.vector_stores.deleted == []
+        assert not registry.is_shared("vs-outside", "thread-1")
+
+        # Once the thread goes idle the adopted store and its file expire like any other
+        registry.thread_ttl_seconds = 0
+        await registry.reap()
+        await registry.reap()
+        assert client.agents.vector_stores.deleted == ["vs-outside"]
+        assert client.agents.files.deleted == ["file-1"]
+
+    asyncio.run(scenario())
+
+
+def test_adopted_store_is_not_acquired_by_file_ids(client):
+    async def scenario():
+        registry = DocumentRegistry(ttl_seconds=3600, reap_interval_seconds=3600, thread_ttl_seconds=3600)
+
+        async def add(vector_store_id, file_id):
+            pass
+
+        async def create(file_ids):
+            return "vs-new"
+
+        await registry.add_file("thread-1", "vs-outside", "file-1", add)
+        vector_store_id, reused = await registry.acquire_vector_store(["file-1"], create)
+
+        assert (vector_store_id, reused) == ("vs-new", False)
+
+    asyncio.run(scenario())